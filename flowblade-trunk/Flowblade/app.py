@@ -81,6 +81,7 @@ import keyframeeditcanvas
 import kftoolmode
 import medialog
 import mediaplugin
+import memorycache
 import mltenv
 import mltfilters
 import mltplayer
@@ -93,8 +94,10 @@ import persistance
 import positionbar
 import preferenceswindow
 import processutils
+import producercache
 import projectaction
 import projectdata
+import projectjournal
 import projectdatavault
 import projectinfogui
 import propertyeditorbuilder
@@ -111,6 +114,7 @@ import shortcutsquickeffects
 import snapping
 import threading
 import titler
+import tlinerender
 import tlinewidgets
 import toolsintegration
 import trimmodes
@@ -135,6 +139,10 @@ recovery_dialog_id = -1
 disk_cache_timeout_id = -1
 sdl2_timeout_id = -1
 loaded_autosave_file = None
+autosave_writer_thread = None
+
+MAX_BUILT_INACTIVE_SEQUENCES = 3 # MLT objects of sequences not among most recently edited are released.
+recently_edited_sequences = []
 
 splash_screen = None
 splash_timeout_id = -1
@@ -189,6 +197,10 @@ def main(root_path):
 
     # Load editor prefs and list of recent projects.
     editorpersistance.load()
+    memorycache.set_budget_mb(editorpersistance.prefs.memory_cache_budget_mb)
+    undo.set_memory_budget_mb(editorpersistance.prefs.undo_memory_budget_mb)
+    editorstate.tline_render_mode = editorpersistance.prefs.tline_render_mode
+
     # Force custom theme. NOTE: See if possible to use Adwaita Dark after GTK 4 port.
     editorpersistance.prefs.theme = appconsts.FLOWBLADE_THEME_NEUTRAL
 
@@ -662,6 +674,10 @@ def open_project(new_project):
 
     audiomonitoring.close_audio_monitor()
     audiowaveformrenderer.clear_cache()
+    memorycache.clear()
+    tlinewidgets.clip_thumbnails = {}
+    producercache.clear()
+    tlinerender.clear()
 
     editorstate.project = new_project
     editorstate.media_view_filter = appconsts.SHOW_ALL_FILES
@@ -686,6 +702,7 @@ def open_project(new_project):
     if loaded_autosave_file != None:
         print("Deleting", loaded_autosave_file)
         os.remove(loaded_autosave_file)
+        projectjournal.delete_journal(loaded_autosave_file)
         loaded_autosave_file = None
 
     editorstate.update_current_proxy_paths()
@@ -694,6 +711,10 @@ def open_project(new_project):
     editorstate.clear_trim_clip_cache()
     audiomonitoring.init_for_project_load()
 
+    global recently_edited_sequences
+    recently_edited_sequences = [new_project.c_seq]
+
+    projectjournal.reset()
     start_autosave()
 
     if new_project.update_media_lengths_on_load == True:
@@ -723,6 +744,17 @@ def change_current_sequence(index):
     edit.do_gui_update = False  # This should not be necessary but we are doing this signal intention that GUI updates are disabled
     
     stop_autosave()
+
+    # Sequences other than the one open on load are built when first activated.
+    try:
+        persistance.build_sequence_mlt(editorstate.project.sequences[index])
+    except persistance.FileProducerNotFoundError as e:
+        edit.do_gui_update = True
+        start_autosave()
+        projectaction.show_sequence_media_missing_dialog(e)
+        return
+
+    tlinerender.clear()
     editorstate.project.c_seq = editorstate.project.sequences[index]
 
     # Inits widgets with current sequence data
@@ -737,6 +769,8 @@ def change_current_sequence(index):
     # Editor and modules needs to do some initializing
     init_editor_state()
 
+    _release_inactive_sequences()
+
     # Display current sequence selected in gui.
     gui.sequence_list_view.fill_data_model()
     selection = gui.sequence_list_view.treeview.get_selection()
@@ -750,6 +784,18 @@ def change_current_sequence(index):
     updater.set_timeline_height()
     updater.init_tline_view()
 
+def _release_inactive_sequences():
+    global recently_edited_sequences
+    c_seq = editorstate.project.c_seq
+    if c_seq in recently_edited_sequences:
+        recently_edited_sequences.remove(c_seq)
+    recently_edited_sequences.insert(0, c_seq)
+
+    for seq in recently_edited_sequences[MAX_BUILT_INACTIVE_SEQUENCES + 1:]:
+        if seq in editorstate.project.sequences:
+            persistance.unload_sequence_mlt(editorstate.project, seq)
+    recently_edited_sequences = recently_edited_sequences[0:MAX_BUILT_INACTIVE_SEQUENCES + 1]
+
 def display_current_sequence():
     # Get shorter alias.
     player = editorstate.player
@@ -777,6 +823,7 @@ def autosave_dialog_callback(dialog, response):
         projectaction.actually_load_project(autosave_file, True, False, True)
     else:
         os.remove(autosave_file)
+        projectjournal.delete_journal(autosave_file)
         start_autosave()
 
 def autosaves_many_recovery_dialog():
@@ -828,15 +875,14 @@ def start_autosave():
     if autosave_delay_millis > 0:
         print("Autosave started...")
         autosave_timeout_id = GLib.timeout_add(autosave_delay_millis, do_autosave)
-        autosave_file = userfolders.get_cache_dir() + get_instance_autosave_file()
-        persistance.save_project(editorstate.PROJECT(), autosave_file)
+        _write_autosave(True)
     else:
         print("Autosave disabled...")
         stop_autosave()
 
 def get_autosave_files():
     autosave_dir = userfolders.get_cache_dir() + AUTOSAVE_DIR
-    return os.listdir(autosave_dir)
+    return [f for f in os.listdir(autosave_dir) if not projectjournal.is_journal_file(f)]
 
 def stop_autosave():
     global autosave_timeout_id
@@ -846,10 +892,45 @@ def stop_autosave():
     autosave_timeout_id = -1
 
 def do_autosave():
-    autosave_file = userfolders.get_cache_dir() + get_instance_autosave_file()
-    persistance.save_project(editorstate.PROJECT(), autosave_file)
+    _write_autosave()
     return True
 
+def _write_autosave(full_save=False):
+    # Writes full snapshot when needed, otherwise appends changed sequences to autosave journal.
+    # Project data is pickled here on GTK thread, writing happens in writer thread.
+    global autosave_writer_thread
+    if autosave_writer_thread != None and autosave_writer_thread.is_alive():
+        if full_save == False:
+            return # Previous write still in progress, changes stay tracked for next autosave.
+        autosave_writer_thread.join()
+
+    autosave_file = userfolders.get_cache_dir() + get_instance_autosave_file()
+    project = editorstate.PROJECT()
+    if full_save == False and projectjournal.has_changes() == False:
+        return
+
+    if full_save == True or projectjournal.full_save_needed(project) == True:
+        snapshot_id = projectjournal.create_snapshot_id()
+        s_proj = persistance.get_autosave_snapshot(project, snapshot_id)
+        projectjournal.snapshot_saved(project, snapshot_id)
+        is_journal_record = False
+    else:
+        sequence_indexes = projectjournal.get_changed_sequence_indexes(project)
+        s_proj = persistance.get_autosave_snapshot(project, projectjournal.get_snapshot_id(), sequence_indexes)
+        projectjournal.record_saved()
+        is_journal_record = True
+
+    autosave_writer_thread = persistance.AutosaveWriterThread(s_proj, autosave_file, is_journal_record, _autosave_write_completed)
+    autosave_writer_thread.start()
+
+def _autosave_write_completed(succeeded):
+    if succeeded == False:
+        projectjournal.save_failed()
+
+def _wait_for_autosave_write():
+    if autosave_writer_thread != None:
+        autosave_writer_thread.join()
+
 # ------------------------------------------------- splash screen
 def show_splash_screen():
     global splash_screen
@@ -1086,8 +1167,10 @@ def _app_destroy():
     audiomonitoring.close()
 
     # Delete autosave file
+    _wait_for_autosave_write()
     try:
         os.remove(userfolders.get_cache_dir() + get_instance_autosave_file())
+        projectjournal.delete_journal(userfolders.get_cache_dir() + get_instance_autosave_file())
     except:
         print("Delete autosave file FAILED!")
 
@@ -0,0 +1,202 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module handles writing and reading binary audio levels files.
+
+File layout, all values little endian:
+
+    header:     magic b"FBAL", uint16 version, uint16 levels count, uint32 frames count
+    level info: uint32 bucket size, uint32 buckets count, uint64 data offset   (for each level)
+    data:       level 0 is uint8 value per frame, other levels are uint8 (min, max) pairs per bucket.
+
+Level values are audio levels 0.0 - 1.0 quantized to 0 - 255.
+Data is read with numpy.memmap so only the pages for the drawn frame
+window and zoom level are loaded in memory.
+"""
+
+import numpy as np
+import os
+import struct
+
+import atomicfile
+
+MAGIC = b"FBAL"
+VERSION = 1
+
+BUCKET_SIZES = [1, 4, 16, 64] # Frames per min/max bucket for each level.
+
+LEVEL_MAX = 255.0
+
+_HEADER_FORMAT = "<4sHHI"
+_LEVEL_INFO_FORMAT = "<IIQ"
+
+
+class AudioLevelsFileError(Exception):
+    def __init__(self, value):
+        self.value = value
+    def __str__(self):
+        return repr(self.value)
+
+
+# ------------------------------------------------------- writing
+def write_levels_file(file_path, frame_levels):
+    """
+    Writes list of float audio levels, one per frame, into a levels file.
+    """
+    base = np.clip(np.asarray(frame_levels, dtype=np.float32), 0.0, 1.0)
+    base = np.rint(base * LEVEL_MAX).astype(np.uint8)
+    frames_count = len(base)
+
+    # Create min/max data for levels.
+    levels_data = [base]
+    for bucket_size in BUCKET_SIZES[1:]:
+        if frames_count == 0:
+            levels_data.append(np.zeros((0, 2), dtype=np.uint8))
+            continue
+        starts = np.arange(0, frames_count, bucket_size)
+        min_max = np.empty((len(starts), 2), dtype=np.uint8)
+        min_max[:, 0] = np.minimum.reduceat(base, starts)
+        min_max[:, 1] = np.maximum.reduceat(base, starts)
+        levels_data.append(min_max)
+
+    header_size = struct.calcsize(_HEADER_FORMAT) + len(BUCKET_SIZES) * struct.calcsize(_LEVEL_INFO_FORMAT)
+    header = struct.pack(_HEADER_FORMAT, MAGIC, VERSION, len(BUCKET_SIZES), frames_count)
+    offset = header_size
+    for i in range(0, len(BUCKET_SIZES)):
+        header += struct.pack(_LEVEL_INFO_FORMAT, BUCKET_SIZES[i], len(levels_data[i]), offset)
+        offset += levels_data[i].nbytes
+
+    with atomicfile.AtomicFileWriter(file_path, "wb") as afw:
+        write_file = afw.get_file()
+        write_file.write(header)
+        for level_data in levels_data:
+            write_file.write(level_data.tobytes())
+
+
+# ------------------------------------------------------- reading
+def load_levels_file(file_path):
+    """
+    Returns AudioLevels object for levels file, raises AudioLevelsFileError if file is not valid.
+    """
+    with open(file_path, "rb") as f:
+        header_data = f.read(struct.calcsize(_HEADER_FORMAT))
+        try:
+            magic, version, levels_count, frames_count = struct.unpack(_HEADER_FORMAT, header_data)
+        except struct.error:
+            raise AudioLevelsFileError("Audio levels file header too short: " + file_path)
+        if magic != MAGIC:
+            raise AudioLevelsFileError("Not an audio levels file: " + file_path)
+        if version > VERSION:
+            raise AudioLevelsFileError("Unsupported audio levels file version " + str(version) + ": " + file_path)
+        if levels_count == 0:
+            raise AudioLevelsFileError("Audio levels file has no levels: " + file_path)
+
+        levels_info = []
+        info_size = struct.calcsize(_LEVEL_INFO_FORMAT)
+        for i in range(0, levels_count):
+            try:
+                levels_info.append(struct.unpack(_LEVEL_INFO_FORMAT, f.read(info_size)))
+            except struct.error:
+                raise AudioLevelsFileError("Audio levels file levels info too short: " + file_path)
+
+    if os.path.getsize(file_path) < levels_info[-1][2] + _level_data_size(levels_info[-1]):
+        raise AudioLevelsFileError("Audio levels file truncated: " + file_path)
+
+    return AudioLevels(file_path, frames_count, levels_info)
+
+def _level_data_size(level_info):
+    bucket_size, buckets_count, offset = level_info
+    if bucket_size == 1:
+        return buckets_count
+    return buckets_count * 2
+
+
+class AudioLevels:
+    """
+    Memory mapped audio levels data for a media file.
+
+    Indexing with a frame number gives level value 0.0 - 1.0 for that frame
+    so that object can be used in place of a list of frame levels.
+    """
+    def __init__(self, file_path, frames_count, levels_info):
+        self.file_path = file_path
+        self.frames_count = frames_count
+        self.bucket_sizes = []
+        self.levels = []
+
+        for bucket_size, buckets_count, offset in levels_info:
+            if buckets_count == 0:
+                data = np.zeros((0, 2), dtype=np.uint8)
+            elif bucket_size == 1:
+                data = np.memmap(file_path, dtype=np.uint8, mode="r", offset=offset, shape=(buckets_count,))
+            else:
+                data = np.memmap(file_path, dtype=np.uint8, mode="r", offset=offset, shape=(buckets_count, 2))
+            self.bucket_sizes.append(bucket_size)
+            self.levels.append(data)
+
+    def __len__(self):
+        return self.frames_count
+
+    def __getitem__(self, frame):
+        if frame < 0 or frame >= self.frames_count:
+            raise IndexError("audio levels frame out of range")
+        return self.levels[0][frame] / LEVEL_MAX
+
+    def get_bucket_size_for_frames_per_pixel(self, frames_per_pixel):
+        """
+        Returns largest bucket size that still has at least one bucket per pixel.
+        """
+        selected = self.bucket_sizes[0]
+        for bucket_size in self.bucket_sizes:
+            if bucket_size <= frames_per_pixel:
+                selected = bucket_size
+        return selected
+
+    def get_values(self, first_frame, last_frame):
+        """
+        Returns level values 0.0 - 1.0 for frames in range first_frame - last_frame (exclusive) as float array.
+        """
+        first_frame = max(0, first_frame)
+        last_frame = min(self.frames_count, last_frame)
+        if last_frame <= first_frame:
+            return np.zeros(0, dtype=np.float32)
+        return self.levels[0][first_frame:last_frame].astype(np.float32) / LEVEL_MAX
+
+    def get_peaks(self, bucket_size, first_frame, last_frame):
+        """
+        Returns tuple (first bucket frame, mins array, maxs array) with 0.0 - 1.0 values
+        for buckets of given size that cover frame range first_frame - last_frame (exclusive).
+        """
+        level_index = self.bucket_sizes.index(bucket_size)
+        first_bucket = max(0, first_frame) // bucket_size
+        last_bucket = -(-min(self.frames_count, last_frame) // bucket_size) # ceil division
+        if last_bucket <= first_bucket:
+            empty = np.zeros(0, dtype=np.float32)
+            return (first_bucket * bucket_size, empty, empty)
+
+        data = self.levels[level_index][first_bucket:last_bucket]
+        if bucket_size == 1:
+            values = data.astype(np.float32) / LEVEL_MAX
+            return (first_bucket, values, values)
+
+        mins = data[:, 0].astype(np.float32) / LEVEL_MAX
+        maxs = data[:, 1].astype(np.float32) / LEVEL_MAX
+        return (first_bucket * bucket_size, mins, maxs)
@@ -47,6 +47,7 @@ import editorpersistance
 import editorstate
 import mltrefhold
 import guiutils
+import projectjournal
 import utils
 import utilsgtk
 
@@ -632,6 +633,7 @@ class GainControl(Gtk.Frame):
             self.seq.add_track_pan_filter(self.producer, 0.5)
             if self.is_master:
                 self.seq.master_audio_pan = 0.5
+            projectjournal.sequence_changed(self.seq)
         else:
             self.pan_slider.set_sensitive(False)
             self.seq.remove_track_pan_filter(self.producer)
@@ -36,16 +36,17 @@ try:
     import mlt7 as mlt
 except:
     import mlt
+import multiprocessing
 import os
-import pickle
 import subprocess
 import sys
 import threading
 
 import appconsts
-import atomicfile
+import audiolevelsfile
 import editorpersistance
 import editorstate
+import memorycache
 import mltinit
 import mltprofiles
 import processutils
@@ -62,35 +63,40 @@ RIGHT_CHANNEL = "_audio_level.1"
 
 FILE_SEPARATOR = "#&#file:"
 
-_waveforms = {} # Memory cache for waveform data
+LEVELS_FILE_EXTENSION = ".fblevels"
+
+MIN_LEVELS_CHUNK_LENGTH = 4500 # frames, files shorter then 2 * this are rendered as single range
+
 _queued_waveform_renders = [] # Media queued for render during one timeline repaint
 _render_already_requested = [] # Files that have been sent to rendering since last project load
 
 
 # ------------------------------------------------- waveform cache
 def clear_cache():
-    global _waveforms, _queued_waveform_renders, _render_already_requested
+    global _queued_waveform_renders, _render_already_requested
 
-    _waveforms = {}
+    memorycache.clear(memorycache.WAVEFORMS)
     _queued_waveform_renders = []
     _render_already_requested = []
 
 def get_waveform_data(clip):
     # Return from memory if present
-    global _waveforms
-    try:
-        waveform = _waveforms[clip.path]
+    waveform = memorycache.get(memorycache.WAVEFORMS, clip.path)
+    if waveform != None:
         return waveform
-    except:
-        pass
         
     # Load from disk if found, otherwise queue for levels render
-    levels_file_path = _get_levels_file_path(clip.path, editorstate.PROJECT().profile)
+    profile = editorstate.PROJECT().profile
+    levels_file_path = _get_levels_file_path(clip.path, profile)
+    if not os.path.isfile(levels_file_path):
+        _convert_legacy_levels_file(clip.path, profile)
     if os.path.isfile(levels_file_path):
-        if os.path.getsize(levels_file_path) == 0:
-             print( "Size zero Audio levels file, this is error!", levels_file_path)
-        waveform = utils.unpickle(levels_file_path)
-        _waveforms[clip.path] = waveform
+        try:
+            waveform = audiolevelsfile.load_levels_file(levels_file_path)
+        except audiolevelsfile.AudioLevelsFileError as e:
+            print("Audio levels file load failed, this is error!", str(e))
+            return None
+        memorycache.put(memorycache.WAVEFORMS, clip.path, waveform, os.path.getsize(levels_file_path))
         return waveform
     else:
         # We keep queueing everything that does not have waveform data.
@@ -100,7 +106,20 @@ def get_waveform_data(clip):
         _queued_waveform_renders.append(clip.path)
 
         return None
-    
+
+def _convert_legacy_levels_file(media_file_path, profile):
+    # Levels files were pickled lists of floats before binary format was added,
+    # we convert those instead of rendering data again.
+    legacy_file_path = _get_legacy_levels_file_path(media_file_path, profile)
+    if not os.path.isfile(legacy_file_path):
+        return
+    try:
+        frame_levels = utils.unpickle(legacy_file_path)
+        audiolevelsfile.write_levels_file(_get_levels_file_path(media_file_path, profile), frame_levels)
+        os.remove(legacy_file_path)
+    except Exception as e:
+        print("Converting legacy audio levels file failed:", legacy_file_path, str(e))
+
 # ------------------------------------------------- launching render
 def launch_queued_renders():
     # Render files that were not found when timeline was displayed
@@ -117,8 +136,9 @@ def launch_audio_levels_rendering(file_names):
     rendered_media = ""
 
     for media_file in file_names:
-        levels_file_path = _get_levels_file_path(media_file, editorstate.PROJECT().profile)
-        if os.path.isfile(levels_file_path):
+        profile = editorstate.PROJECT().profile
+        if os.path.isfile(_get_levels_file_path(media_file, profile)) \
+            or os.path.isfile(_get_legacy_levels_file_path(media_file, profile)):
             continue
         else:
             global _render_already_requested
@@ -139,6 +159,9 @@ def launch_audio_levels_rendering(file_names):
     single_render_launch_thread.start()
 
 def _get_levels_file_path(media_file_path, profile):
+    return _get_legacy_levels_file_path(media_file_path, profile) + LEVELS_FILE_EXTENSION
+
+def _get_legacy_levels_file_path(media_file_path, profile):
     return userfolders.get_audio_levels_dir() + utils.get_unique_name_for_audio_levels_file(media_file_path, profile)
  
 
@@ -194,50 +217,117 @@ def main():
     
     files = files_paths.split(FILE_SEPARATOR)
 
-    for f in files:
-       t = WaveformCreator(f, profile_desc)
-       t.start()
-       t.join()
-
-
-class WaveformCreator(threading.Thread):    
-    def __init__(self, clip_path, profile_desc):
-        threading.Thread.__init__(self)
-        self.clip_path = clip_path
-        profile = mltprofiles.get_profile(profile_desc)
-        self.temp_clip = self._get_temp_producer(clip_path, profile)
-        self.file_cache_path =_get_levels_file_path(clip_path, profile)
-        self.last_rendered_frame = 0
-
-    def run(self):
-        frame_levels = [None] * self.clip_media_length 
-
-        for frame in range(0, len(frame_levels)):
-            self.temp_clip.seek(frame)
-            mlt.frame_get_waveform(self.temp_clip.get_frame(), 10, 50)
-            val = self.levels.get(RIGHT_CHANNEL)
-            if val == None:
-                val = 0.0
-            frame_levels[frame] = float(val)
-            self.last_rendered_frame = frame
-
-        with atomicfile.AtomicFileWriter(self.file_cache_path, "wb") as afw:
-            write_file = afw.get_file()
-            pickle.dump(frame_levels, write_file)
-
-    def _get_temp_producer(self, clip_path, profile):
-        temp_producer = mlt.Producer(profile, str(clip_path))
-        channels = mlt.Filter(profile, "audiochannels")
-        converter = mlt.Filter(profile, "audioconvert")
-        self.levels = mlt.Filter(profile, "audiolevel")
-        temp_producer.attach(channels)
-        temp_producer.attach(converter)
-        temp_producer.attach(self.levels)
-        temp_producer.path = clip_path
-        self.clip_media_length = temp_producer.get_length()
-
-        return temp_producer
-
-
-
+    render_levels_files(files, profile_desc, get_render_processes_count())
+
+def get_render_processes_count():
+    processes = editorpersistance.prefs.audio_levels_render_processes
+    return max(1, min(processes, multiprocessing.cpu_count()))
+
+def render_levels_files(files, profile_desc, processes_count):
+    """
+    Renders levels files for all files using a pool of worker processes.
+
+    Long files are split into frame ranges that are rendered concurrently and
+    stitched back together in order before the levels file is written.
+    """
+    if processes_count == 1:
+        # No point forking workers, render files in this process one after another.
+        for clip_path in files:
+            length = _get_media_length((clip_path, profile_desc))
+            frame_levels = _render_levels_range((clip_path, profile_desc, 0, length))
+            _write_levels_file(clip_path, profile_desc, frame_levels)
+        return
 
+    pool = multiprocessing.Pool(processes_count)
+    try:
+        lengths = pool.map(_get_media_length, [(clip_path, profile_desc) for clip_path in files])
+        
+        # Create render tasks with frame ranges and collect chunks as they complete.
+        tasks = []
+        chunks = {}
+        for file_index in range(0, len(files)):
+            ranges = _get_frame_ranges(lengths[file_index], processes_count)
+            chunks[file_index] = [None] * len(ranges)
+            for chunk_index in range(0, len(ranges)):
+                range_start, range_end = ranges[chunk_index]
+                tasks.append((file_index, chunk_index, files[file_index], profile_desc, range_start, range_end))
+
+        for file_index, chunk_index, frame_levels in pool.imap_unordered(_render_levels_task, tasks):
+            file_chunks = chunks[file_index]
+            file_chunks[chunk_index] = frame_levels
+            if not (None in file_chunks):
+                # All ranges of file are done, write levels file so it can be displayed right away.
+                all_levels = []
+                for chunk in file_chunks:
+                    all_levels.extend(chunk)
+                _write_levels_file(files[file_index], profile_desc, all_levels)
+                del chunks[file_index]
+    finally:
+        pool.close()
+        pool.join()
+
+def _get_frame_ranges(length, processes_count):
+    # Short files are rendered as a single range, long files are split in chunks
+    # so that all worker processes get work even when rendering a single file.
+    if length <= 0:
+        return [(0, 0)]
+    chunks_count = max(1, min(processes_count, length // MIN_LEVELS_CHUNK_LENGTH))
+    chunk_length = -(-length // chunks_count) # ceil division
+    ranges = []
+    for range_start in range(0, length, chunk_length):
+        ranges.append((range_start, min(range_start + chunk_length, length)))
+    return ranges
+
+def _write_levels_file(clip_path, profile_desc, frame_levels):
+    profile = mltprofiles.get_profile(profile_desc)
+    file_cache_path = _get_levels_file_path(clip_path, profile)
+    audiolevelsfile.write_levels_file(file_cache_path, frame_levels)
+
+
+# --------------------------------------------------------- worker processes
+_worker_producer = None # (clip_path, producer, levels filter) for last file rendered in process
+
+def _get_media_length(render_data):
+    clip_path, profile_desc = render_data
+    temp_clip, levels = _get_levels_producer(clip_path, profile_desc)
+    return temp_clip.get_length()
+
+def _render_levels_task(task):
+    file_index, chunk_index, clip_path, profile_desc, range_start, range_end = task
+    frame_levels = _render_levels_range((clip_path, profile_desc, range_start, range_end))
+    return (file_index, chunk_index, frame_levels)
+
+def _render_levels_range(render_data):
+    clip_path, profile_desc, range_start, range_end = render_data
+    temp_clip, levels = _get_levels_producer(clip_path, profile_desc)
+
+    frame_levels = [None] * (range_end - range_start)
+    for frame in range(range_start, range_end):
+        temp_clip.seek(frame)
+        mlt.frame_get_waveform(temp_clip.get_frame(), 10, 50)
+        val = levels.get(RIGHT_CHANNEL)
+        if val == None:
+            val = 0.0
+        frame_levels[frame - range_start] = float(val)
+
+    return frame_levels
+
+def _get_levels_producer(clip_path, profile_desc):
+    # Consecutive chunks of same file usually end up in same process, 
+    # so we keep last producer around to avoid reopening file.
+    global _worker_producer
+    if _worker_producer != None and _worker_producer[0] == clip_path:
+        return _worker_producer[1], _worker_producer[2]
+
+    profile = mltprofiles.get_profile(profile_desc)
+    temp_producer = mlt.Producer(profile, str(clip_path))
+    channels = mlt.Filter(profile, "audiochannels")
+    converter = mlt.Filter(profile, "audioconvert")
+    levels = mlt.Filter(profile, "audiolevel")
+    temp_producer.attach(channels)
+    temp_producer.attach(converter)
+    temp_producer.attach(levels)
+    temp_producer.path = clip_path
+
+    _worker_producer = (clip_path, temp_producer, levels)
+    return temp_producer, levels
@@ -56,6 +56,7 @@ import mlttransitions
 import modesetting
 import movemodes
 import projectaction
+import projectjournal
 import syncsplitevent
 import tlinewidgets
 import tlineaction
@@ -160,8 +161,10 @@ def _open_clip_in_clip_monitor(data):
 def _show_clip_info(data):
     clip, track, item_id, x = data
 
-    width = clip.get("width")
-    height = clip.get("height")
+    # Timeline clips are cuts, media properties are in parent producer.
+    producer = clip.parent()
+    width = producer.get("width")
+    height = producer.get("height")
     if clip.media_type == appconsts.IMAGE:
         graphic_img = Image.open(clip.path)
         width, height = graphic_img.size
@@ -171,12 +174,12 @@ def _show_clip_info(data):
     mark_in = utils.get_tc_string(clip.clip_in)
     mark_out = utils.get_tc_string(clip.clip_out + 1) # +1 out inclusive
 
-    video_index = clip.get_int("video_index")
-    audio_index = clip.get_int("audio_index")
+    video_index = producer.get_int("video_index")
+    audio_index = producer.get_int("audio_index")
     long_video_property = "meta.media." + str(video_index) + ".codec.long_name"
     long_audio_property = "meta.media." + str(audio_index) + ".codec.long_name"
-    vcodec = clip.get(str(long_video_property))
-    acodec = clip.get(str(long_audio_property))    
+    vcodec = producer.get(str(long_video_property))
+    acodec = producer.get(str(long_audio_property))    
     if vcodec == None:
         vcodec = _("N/A")
     if acodec == None:
@@ -687,6 +690,7 @@ def _clip_marker_add_dialog_callback(dialog, response_id, name_entry, data):
 
     clip.markers.append((name, clip_frame))
     clip.markers = sorted(clip.markers, key=itemgetter(1))
+    projectjournal.sequence_changed(current_sequence())
     updater.repaint_tline()
 
 def _go_to_clip_marker(data):
@@ -713,11 +717,13 @@ def _delete_clip_marker(data):
             mrk_index = i
     if mrk_index != -1:
         clip.markers.pop(mrk_index)
+        projectjournal.sequence_changed(current_sequence())
         updater.repaint_tline()
 
 def _delete_all_clip_markers(data):
     clip, track, item_id, item_data = data
     clip.markers = []
+    projectjournal.sequence_changed(current_sequence())
     updater.repaint_tline()
 
 def _volume_keyframes(data):
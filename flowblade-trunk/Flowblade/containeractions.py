@@ -533,6 +533,18 @@ class GMicContainerActions(AbstractContainerActionObject):
                     
         if gmicheadless.session_render_complete(self.parent_folder, self.get_container_program_id()) == True:
             
+            error = gmicheadless.get_session_error(self.parent_folder, self.get_container_program_id())
+            if error != None:
+                # Failed render did not produce a complete media file, clip is not updated.
+                job_msg = self.get_job_queue_message()
+                job_msg.status = jobs.CANCELLED
+                job_msg.text = _("Render failed") + " - " + self.get_job_name()
+                jobs.update_job_queue(job_msg)
+                
+                primary_txt = _("G'MIC Container Clip render failed!")
+                dialogutils.warning_message(primary_txt, error, gui.editor_window.window)
+                return
+
             job_msg = self.get_completed_job_message()
             jobs.update_job_queue(job_msg)
             
@@ -39,6 +39,8 @@ from editorstate import auto_follow_active
 import mltfilters
 import movemodes
 import mediaplugin
+import producercache
+import projectjournal
 import resync
 import tlinewidgets
 import trackaction
@@ -54,26 +56,42 @@ do_gui_update = False
 # Flag for doing edits since last save
 edit_done_since_last_save = False
 
+# track id -> earliest changed clip index, collected by track primitives during undo/redo.
+_changed_tracks = {}
+
+# Set when clips are added to tracks during undo/redo, overlapping cuts of shared producers may need optimising then.
+_clips_added = False
+
 
 # ---------------------------------- atomic edit ops
 def append_clip(track, clip, clip_in, clip_out):
     """
     Affects MLT c-struct and python obj values.
     """
+    global _clips_added
     clip.clip_in = clip_in
     clip.clip_out = clip_out
     track.clips.append(clip) # py
+    producercache.set_cut_range(clip, clip_in, clip_out)
     track.append(clip, clip_in, clip_out) # mlt
+    _clips_added = True
+    track.sequence.clip_added(track, clip)
+    _track_changed(track, len(track.clips) - 1)
     resync.clip_added_to_timeline(clip, track)
 
 def _insert_clip(track, clip, index, clip_in, clip_out):
     """
     Affects MLT c-struct and python obj values.
     """
+    global _clips_added
     clip.clip_in = clip_in
     clip.clip_out = clip_out
     track.clips.insert(index, clip) # py
+    producercache.set_cut_range(clip, clip_in, clip_out)
     track.insert(clip, index, clip_in, clip_out) # mlt
+    _clips_added = True
+    track.sequence.clip_added(track, clip)
+    _track_changed(track, index)
     resync.clip_added_to_timeline(clip, track)
 
 def _insert_blank(track, index, length):
@@ -84,6 +102,8 @@ def _insert_blank(track, index, length):
     blank_clip.clip_out = length - 1 # -1, end inclusive
     blank_clip.is_blanck_clip = True
     track.clips.insert(index, blank_clip)
+    track.sequence.clip_added(track, blank_clip)
+    _track_changed(track, index)
     
 def _remove_clip(track, index):
     """
@@ -91,6 +111,8 @@ def _remove_clip(track, index):
     """
     track.remove(index)
     clip = track.clips.pop(index)
+    track.sequence.clip_removed(track, clip)
+    _track_changed(track, index)
     resync.clip_removed_from_timeline(clip)
     
     return clip
@@ -131,9 +153,20 @@ def _add_blank_to_py(track, index, length):
     blank_clip.clip_out = length - 1 # -1, end inclusive
     blank_clip.is_blanck_clip = True
     track.clips.insert(index, blank_clip)
+    track.sequence.clip_added(track, blank_clip)
+    _track_changed(track, index)
     return blank_clip
 
 # --------------------------------- util methods
+def _track_changed(track, index):
+    # Clip start frames change on track from index onwards.
+    try:
+        if _changed_tracks[track.id] <= index:
+            return
+    except KeyError:
+        pass
+    _changed_tracks[track.id] = index
+
 def _set_in_out(clip, c_in, c_out):
     """
     Affects MLT c-struct and python obj values.
@@ -159,13 +192,17 @@ def _remove_trailing_blanks_undo(self):
         track = current_sequence().tracks[track_index]
         _insert_blank(track, track.count(), length)
 
-def _remove_trailing_blanks_redo(self):
-    _remove_all_trailing_blanks(self)
+def _remove_trailing_blanks_redo(self, track_ids):
+    self.trailing_blanks = _remove_trailing_blanks(track_ids)
 
 def _remove_all_trailing_blanks(self=None):
+    trailing_blanks = _remove_trailing_blanks(range(1, len(current_sequence().tracks) - 1)) # -1 because hidden track, 1 because black track
     if self != None:
-        self.trailing_blanks = []
-    for i in range(1, len(current_sequence().tracks) - 1): # -1 because hidden track, 1 because black track
+        self.trailing_blanks = trailing_blanks
+
+def _remove_trailing_blanks(track_ids):
+    trailing_blanks = []
+    for i in track_ids:
         try:
             track = current_sequence().tracks[i]
             last_clip_index = track.count() - 1
@@ -173,10 +210,44 @@ def _remove_all_trailing_blanks(self=None):
             if clip.is_blanck_clip:
                 length = clip.clip_length()
                 _remove_clip(track, last_clip_index)
-                if self != None:
-                    self.trailing_blanks.append((i, length))
+                trailing_blanks.append((i, length))
         except:
             pass
+    return trailing_blanks
+
+def _get_edited_track_ids():
+    # Edits only leave unconsolidated and trailing blanks on tracks they changed.
+    hidden_track_index = len(current_sequence().tracks) - 1
+    return [i for i in sorted(_changed_tracks) if i > 0 and i < hidden_track_index]
+
+def _consolidate_blanks(track_ids):
+    """
+    Replaces all runs of consecutive blanks on tracks with single blanks.
+    Returns list of (track index, blank index, removed blank lengths) tuples for undo.
+    """
+    consolidations = []
+    for track_index in track_ids:
+        track = current_sequence().tracks[track_index]
+        # Runs are consolidated from track end so that indexes of runs before are not changed.
+        i = len(track.clips) - 1
+        while i > 0:
+            if track.clips[i].is_blanck_clip == False or track.clips[i - 1].is_blanck_clip == False:
+                i -= 1
+                continue
+            while i > 0 and track.clips[i - 1].is_blanck_clip:
+                i -= 1
+            removed_lengths = _remove_consecutive_blanks(track, i)
+            _insert_blank(track, i, sum(removed_lengths))
+            consolidations.append((track_index, i, tuple(removed_lengths)))
+            i -= 1
+    return consolidations
+
+def _undo_blanks_consolidation(consolidations):
+    for track_index, index, removed_lengths in reversed(consolidations):
+        track = current_sequence().tracks[track_index]
+        _remove_clip(track, index)
+        for i in range(0, len(removed_lengths)):
+            _insert_blank(track, index + i, removed_lengths[i])
 
 def _create_clip_clone(clip):
     if clip.container_data != None:
@@ -356,6 +427,7 @@ class EditAction:
         trackaction.maybe_do_auto_expand(tracks_clips_count_before)
         
     def undo(self):
+        global _clips_added
         PLAYER().stop_playback()
 
         # HACK, see above in __init()__
@@ -363,14 +435,20 @@ class EditAction:
             PLAYER().consumer.stop()
 
         movemodes.clear_selected_clips()  # selection not valid after change in sequence
+        _changed_tracks.clear()
+        _clips_added = False
         _remove_trailing_blanks_undo(self)
-        _consolidate_all_blanks_undo(self)
+        _undo_blanks_consolidation(self.blank_consolidations)
     
         self.undo_func(self)
 
-        _remove_all_trailing_blanks(None)
+        _remove_trailing_blanks(_get_edited_track_ids())
+
+        if _clips_added == True:
+            current_sequence().optimise_shared_producers()
+        projectjournal.sequence_changed(current_sequence())
 
-        resync.calculate_and_set_child_clip_sync_states()
+        resync.calculate_and_set_child_clip_sync_states(_changed_tracks)
     
         # HACK, see above.
         if self.stop_for_edit:
@@ -381,6 +459,7 @@ class EditAction:
             self._update_gui()
             
     def redo(self):
+        global _clips_added
         PLAYER().stop_playback()
 
         # HACK, see above in __init()__
@@ -389,12 +468,19 @@ class EditAction:
 
         movemodes.clear_selected_clips() # selection is not valid after a change in sequence
 
+        _changed_tracks.clear()
+        _clips_added = False
         self.redo_func(self)
 
-        _consolidate_all_blanks_redo(self)
-        _remove_trailing_blanks_redo(self)
+        edited_track_ids = _get_edited_track_ids()
+        self.blank_consolidations = _consolidate_blanks(edited_track_ids)
+        _remove_trailing_blanks_redo(self, edited_track_ids)
 
-        resync.calculate_and_set_child_clip_sync_states()
+        if _clips_added == True:
+            current_sequence().optimise_shared_producers()
+        projectjournal.sequence_changed(current_sequence())
+
+        resync.calculate_and_set_child_clip_sync_states(_changed_tracks)
 
         # HACK, see above.
         if self.stop_for_edit and self.is_part_of_consolidated_group == False:
@@ -2603,44 +2689,10 @@ def consolidate_all_blanks(data):
     return action     
 
 def _consolidate_all_blanks_undo(self):
-    self.consolidate_actions.reverse()
-    for c_action in  self.consolidate_actions:
-        track, index, removed_lengths = c_action
-        _remove_clip(track, index)
-        for i in range(0, len(removed_lengths)):
-            length = removed_lengths[i]
-            _insert_blank(track, index + i, length)
+    _undo_blanks_consolidation(self.consolidate_actions)
         
 def _consolidate_all_blanks_redo(self):
-    self.consolidate_actions = []
-    for i in range(1, len(current_sequence().tracks) - 1): # -1 because hidden track, 1 because black track
-        track = current_sequence().tracks[i]
-        consolidaded_indexes = []
-        try_do_next = True
-        while(try_do_next == True):
-            if len(track.clips) == 0:
-                try_do_next = False
-            for i in range(0, len(track.clips)):
-                if i == len(track.clips) - 1:
-                    try_do_next = False
-                clip = track.clips[i]
-                if clip.is_blanck_clip == False:
-                    continue
-                try:
-                    consolidaded_indexes.index(i)
-                    continue
-                except:
-                    pass
-
-                # Now consolidate from clip in index i
-                consolidaded_indexes.append(i)
-                removed_lengths = _remove_consecutive_blanks(track, i)
-                total_length = 0
-                for length in removed_lengths:
-                    total_length = total_length + length
-                _insert_blank(track, i, total_length)
-                self.consolidate_actions.append((track, i, removed_lengths))
-                break
+    self.consolidate_actions = _consolidate_blanks(range(1, len(current_sequence().tracks) - 1)) # -1 because hidden track, 1 because black track
 
 #----------------- RANGE OVERWRITE 
 # "track","clip","clip_in","clip_out","mark_in_frame","mark_out_frame"
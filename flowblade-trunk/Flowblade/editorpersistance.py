@@ -36,8 +36,9 @@ RECENT_DOC = "recent"
 
 MAX_RECENT_PROJS = 15
 UNDO_STACK_DEFAULT = 30
-UNDO_STACK_MIN = 10
-UNDO_STACK_MAX = 100
+UNDO_MEMORY_DEFAULT = 128
+UNDO_MEMORY_MIN = 16
+UNDO_MEMORY_MAX = 4096
 
 GLASS_STYLE = 0
 SIMPLE_STYLE = 1
@@ -178,7 +179,7 @@ def update_prefs_from_widgets(widgets_tuples_tuple):
     # End of Toolbar preferences panel for free elements and order
 
     # Aug-2019 - SvdB - AS - added autosave_combo
-    default_profile_combo, open_in_last_opened_check, open_in_last_rendered_check, undo_max_spin, load_order_combo, \
+    default_profile_combo, open_in_last_opened_check, open_in_last_rendered_check, undo_memory_spin, load_order_combo, \
         autosave_combo, render_folder_select, disk_cache_warning_combo = gen_opts_widgets
 
     # Jul-2016 - SvdB - Added play_pause_button
@@ -193,13 +194,13 @@ def update_prefs_from_widgets(widgets_tuples_tuple):
     top_row_layout, layout_monitor = view_prefs_widgets
 
     # Jan-2017 - SvdB
-    perf_render_threads, perf_drop_frames = performance_widgets
+    perf_render_threads, perf_drop_frames, audio_levels_processes, memory_cache_budget, tline_render_mode_combo, segmented_render_processes, batch_render_slots, max_concurrent_jobs, generator_render_processes = performance_widgets
 
     global prefs
     prefs.open_in_last_opended_media_dir = open_in_last_opened_check.get_active()
     prefs.remember_last_render_dir = open_in_last_rendered_check.get_active()
     prefs.default_profile_name = mltprofiles.get_profile_name_for_index(default_profile_combo.get_active())
-    prefs.undos_max = undo_max_spin.get_adjustment().get_value()
+    prefs.undo_memory_budget_mb = int(undo_memory_spin.get_adjustment().get_value())
     prefs.media_load_order = load_order_combo.get_active()
 
     prefs.auto_center_on_play_stop = auto_center_check.get_active()
@@ -229,6 +230,13 @@ def update_prefs_from_widgets(widgets_tuples_tuple):
     # Jan-2017 - SvdB
     prefs.perf_render_threads = int(perf_render_threads.get_adjustment().get_value())
     prefs.perf_drop_frames = perf_drop_frames.get_active()
+    prefs.audio_levels_render_processes = int(audio_levels_processes.get_adjustment().get_value())
+    prefs.memory_cache_budget_mb = int(memory_cache_budget.get_adjustment().get_value())
+    prefs.tline_render_mode = tline_render_mode_combo.get_active() # combo indexes are TLINE_RENDERING_OFF, TLINE_RENDERING_AUTO
+    prefs.segmented_render_processes = int(segmented_render_processes.get_adjustment().get_value())
+    prefs.batch_render_slots = int(batch_render_slots.get_adjustment().get_value())
+    prefs.max_concurrent_jobs = int(max_concurrent_jobs.get_adjustment().get_value())
+    prefs.generator_render_processes = int(generator_render_processes.get_adjustment().get_value())
     # Feb-2017 - SvdB - for full file names
     prefs.show_full_file_names = full_names.get_active()
     prefs.center_on_arrow_move = auto_center_on_updown.get_active()
@@ -263,7 +271,7 @@ class EditorPreferences:
         self.last_opened_media_dir = None
         self.img_length = 2000
         self.auto_save_delay_value_index = 1 # value is index of AUTO_SAVE_OPTS in preferenceswindow._general_options_panel()
-        self.undos_max = UNDO_STACK_DEFAULT
+        self.undos_max = UNDO_STACK_DEFAULT # Not used, undo stack is limited by self.undo_memory_budget_mb.
         self.default_profile_name = 10 # index of default profile
         self.auto_play_in_clip_monitor = False  # DEPRECATED, NOT USER SETTABLE ANYMORE
         self.auto_center_on_play_stop = True
@@ -347,7 +355,7 @@ class EditorPreferences:
         self.tline_render_encoding = 0 # index of available proxy encodings, timeline rendering uses same encodings.
         self.tline_render_size = appconsts.PROXY_SIZE_FULL
         self.open_jobs_panel_on_add = True
-        self.render_jobs_sequentially = True
+        self.render_jobs_sequentially = True # DEPRECATED, replaced by max_concurrent_jobs
         self.disk_space_warning = 1 #  [off, 500MB,1GB, 2GB], see preferenceswindow.py
         # Toolbar preferences panel for free elements and order
         self.groups_tools =  [  appconsts.WORKFLOW_LAUNCH, appconsts.TOOL_SELECT, appconsts.BUTTON_GROUP_ZOOM, \
@@ -365,3 +373,11 @@ class EditorPreferences:
         self.quick_effects = None
         self.auto_render_media_plugins = True
         self.zoom_to_playhead = True
+        self.audio_levels_render_processes = max(1, (os.cpu_count() or 2) // 2)
+        self.memory_cache_budget_mb = 512 # Waveforms, clip thumbnails and match frames memory cache.
+        self.undo_memory_budget_mb = UNDO_MEMORY_DEFAULT
+        self.tline_render_mode = appconsts.TLINE_RENDERING_OFF
+        self.segmented_render_processes = 1 # 1 means final render is not split in segments.
+        self.batch_render_slots = 1 # Number of Batch Render Queue items rendered concurrently.
+        self.max_concurrent_jobs = max(1, (os.cpu_count() or 2) // 2) # Jobs panel renders running at the same time.
+        self.generator_render_processes = 0 # Processes rendering Generator scripts, 0 means number is decided based on CPU count.
@@ -24,6 +24,7 @@ from gi.repository import GObject
 from gi.repository import Pango
 
 import os
+import socket
 import subprocess
 import sys
 import time
@@ -34,6 +35,7 @@ except:
     import mlt
 
 import appconsts
+import ccrutils
 import editorlayout
 import editorpersistance
 from editorstate import PROJECT
@@ -62,10 +64,25 @@ MOTION_MEDIA_ITEM_RENDER = 4
 PROXY_RENDER = 5
 CONTAINER_CLIP_RENDER_FLUXITY = 6
 
+# Queued jobs with higher priority are started first, FIFO within same priority.
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 1
+PRIORITY_HIGH = 2
+
+JOB_TYPE_PRIORITIES = { PROXY_RENDER:PRIORITY_LOW,
+                        MOTION_MEDIA_ITEM_RENDER:PRIORITY_NORMAL,
+                        CONTAINER_CLIP_RENDER_GMIC:PRIORITY_HIGH,
+                        CONTAINER_CLIP_RENDER_MLT_XML:PRIORITY_HIGH,
+                        CONTAINER_CLIP_RENDER_BLENDER:PRIORITY_HIGH,
+                        CONTAINER_CLIP_RENDER_FLUXITY:PRIORITY_HIGH }
+
 open_media_file_callback = None
 
 _status_polling_thread = None
 
+_status_events_socket = None # Render processes send status messages here, see ccrutils.py.
+_status_events_watch_id = None
+
 _jobs_list_view = None
 
 _jobs = [] # proxy objects that represent background renders and provide info on render status.
@@ -73,6 +90,8 @@ _remove_list = [] # objects are removed from GUI with delay to give user time to
 
 _jobs_render_progress_window = None
 
+_queue_paused = False # When paused, queued jobs are not started, jobs already rendering are not affected.
+
 
 class JobProxy: # This object represents job in job queue. 
 
@@ -108,6 +127,12 @@ class JobProxy: # This object represents job in job queue.
         elif self.type == CONTAINER_CLIP_RENDER_FLUXITY:
             return _("Generator Clip")
             
+    def get_priority(self):
+        try:
+            return JOB_TYPE_PRIORITIES[self.type]
+        except KeyError:
+            return PRIORITY_NORMAL
+
     def get_progress_str(self):
         if self.progress < 0.0:
             return "-"
@@ -139,16 +164,15 @@ def add_job(job_proxy):
     if editorpersistance.prefs.open_jobs_panel_on_add == True:
         editorlayout.show_panel(appconsts.PANEL_JOBS)
     
-    if editorpersistance.prefs.render_jobs_sequentially == False: # Feature not active for first release 2.6.
-        job_proxy.start_render()
-    else:
-         running = _get_jobs_with_status(RENDERING)
-         if len(running) == 0:
-             job_proxy.start_render()
+    # Status events need to be listened before render processes are launched.
+    if _status_events_socket == None:
+        _init_status_events()
+
+    _start_queued_jobs()
 
-    # Get polling going if needed.
+    # Get polling going if status events are not available.
     global _status_polling_thread
-    if _status_polling_thread == None:
+    if _status_polling_thread == None and _status_events_socket == None:
         _status_polling_thread = ContainerStatusPollingThread()
         _status_polling_thread.start()
 
@@ -180,9 +204,14 @@ def update_job_queue(job_msg): # We're using JobProxy objects as messages to upd
         _jobs[row].progress = 1.0
         _remove_list.append(_jobs[row])
         GLib.timeout_add(4000, _remove_jobs)
-        waiting_jobs = _get_jobs_with_status(QUEUED)
-        if len(waiting_jobs) > 0:
-            waiting_jobs[0].start_render()
+        _start_queued_jobs()
+    elif job_msg.status == CANCELLED:
+        # Failed renders are removed like completed ones, text set by caller is kept.
+        _jobs[row].status = CANCELLED
+        _jobs[row].progress = -1.0
+        _remove_list.append(_jobs[row])
+        GLib.timeout_add(4000, _remove_jobs)
+        _start_queued_jobs()
     else:
         _jobs[row].status = job_msg.status
 
@@ -210,12 +239,27 @@ def _cancel_all_jobs():
     _jobs_list_view.fill_data_model()
     _jobs_list_view.scroll.queue_draw()
     GLib.timeout_add(4000, _remove_jobs)
-        
+
+def pause_queue():
+    global _queue_paused
+    _queue_paused = True
+
+def resume_queue():
+    global _queue_paused
+    _queue_paused = False
+    _start_queued_jobs()
+
+def queue_paused():
+    return _queue_paused
+
+def get_max_concurrent_jobs():
+    return max(1, editorpersistance.prefs.max_concurrent_jobs)
+
 def get_jobs_of_type(job_type):
     jobs_of_type = []
     for job in _jobs:
-        job.type = job_type
-        jobs_of_type.append(job)
+        if job.type == job_type:
+            jobs_of_type.append(job)
     
     return jobs_of_type
 
@@ -254,8 +298,23 @@ def get_active_jobs_count():
 
 
 # ------------------------------------------------------------- module functions
+def _start_queued_jobs():
+    # Start highest priority queued jobs until max concurrent jobs are rendering.
+    if _queue_paused == True:
+        return
+
+    free_slots = get_max_concurrent_jobs() - len(_get_jobs_with_status(RENDERING))
+    if free_slots <= 0:
+        return
+    
+    # sorted() is stable, so jobs with same priority stay in the order they were added.
+    queued = sorted(_get_jobs_with_status(QUEUED), key=lambda job: job.get_priority(), reverse=True)
+    for job in queued[0:free_slots]:
+        job.status = RENDERING # Set here too so that job counts as rendering even if start fails to send message.
+        job.start_render()
+
 def _menu_action_pressed(launcher, widget, event, data):
-    guipopover.jobs_menu_popover_show(launcher, widget, _hamburger_item_activated)
+    guipopover.jobs_menu_popover_show(launcher, widget, _hamburger_item_activated, _queue_paused)
     
 def _hamburger_item_activated(action, variant, msg=None):
     print(msg)
@@ -278,7 +337,16 @@ def _hamburger_item_activated(action, variant, msg=None):
         _jobs_list_view.fill_data_model()
         _jobs_list_view.scroll.queue_draw()
         GLib.timeout_add(4000, _remove_jobs)
-        
+        _start_queued_jobs()
+
+    elif msg == "pause_queue":
+        new_state = not(action.get_state().get_boolean())
+        if new_state == True:
+            pause_queue()
+        else:
+            resume_queue()
+        action.set_state(GLib.Variant.new_boolean(new_state))
+
     elif msg == "open_on_add":
         new_state = not(action.get_state().get_boolean())
         editorpersistance.prefs.open_jobs_panel_on_add = new_state
@@ -301,11 +369,7 @@ def _remove_jobs():
         else:
             pass
 
-    running = _get_jobs_with_status(RENDERING)
-    if len(running) == 0:
-        in_queue = _get_jobs_with_status(QUEUED)
-        if len(in_queue) > 0:
-            in_queue[0].start_render()
+    _start_queued_jobs()
 
     _jobs_list_view.fill_data_model()
     _jobs_list_view.scroll.queue_draw()
@@ -625,6 +689,64 @@ class ProxyRenderJobQueueObject(AbstractJobQueueObject):
 
 
 
+# ----------------------------------------------------------------- status events
+def _get_status_socket_path():
+    return userfolders.get_cache_dir() + "jobs_status_" + str(os.getpid())
+
+def _init_status_events():
+    # Render processes inherit environment variable with socket path and send
+    # status messages to it, we get them in Gtk thread when they arrive.
+    global _status_events_socket
+    socket_path = _get_status_socket_path()
+    try:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        status_socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        status_socket.bind(socket_path)
+        status_socket.setblocking(False)
+    except OSError as e:
+        print("Jobs status events not available, using status polling:", e)
+        return
+
+    global _status_events_watch_id
+    _status_events_socket = status_socket
+    os.environ[ccrutils.STATUS_SOCKET_ENV_VAR] = socket_path
+    _status_events_watch_id = GLib.io_add_watch(status_socket.fileno(), GLib.PRIORITY_DEFAULT, GLib.IO_IN, _status_events_received)
+
+def _status_events_received(fd, condition):
+    while True:
+        try:
+            event_data = _status_events_socket.recv(65536)
+        except (BlockingIOError, OSError):
+            break
+
+        folder = ccrutils.status_event_received(event_data)
+        if folder == None:
+            continue
+
+        for job in _jobs:
+            if job.status == RENDERING and folder.endswith(str(job.proxy_uid)):
+                job.callback_object.update_render_status()
+                break
+
+    return True # keep watching
+
+def _shutdown_status_events():
+    global _status_events_socket, _status_events_watch_id
+    if _status_events_socket == None:
+        return
+
+    GLib.source_remove(_status_events_watch_id)
+    _status_events_watch_id = None
+    os.environ.pop(ccrutils.STATUS_SOCKET_ENV_VAR, None)
+    _status_events_socket.close()
+    _status_events_socket = None
+    try:
+        os.remove(_get_status_socket_path())
+    except OSError:
+        pass
+
+
 # ----------------------------------------------------------------- polling
 class ContainerStatusPollingThread(threading.Thread):
     
@@ -657,6 +779,8 @@ class ContainerStatusPollingThread(threading.Thread):
         self.abort = True
 
 def shutdown_polling():
+    _shutdown_status_events()
+
     if _status_polling_thread == None:
         return
     
@@ -28,6 +28,7 @@ import cairo
 import math
 
 import appconsts
+import audiowaveformrenderer
 import clipeffectseditor
 import dialogutils
 import edit
@@ -585,24 +586,16 @@ class TLineKeyFrameEditor:
         ex, ey, ew, eh = self._get_edit_area_rect()
         
         # Maybe draw audio levels
-        if self.edit_type == VOLUME_KF_EDIT and clip.is_blanck_clip == False and clip.waveform_data != None:
+        waveform_data = None
+        if self.edit_type == VOLUME_KF_EDIT and clip.is_blanck_clip == False:
+            waveform_data = audiowaveformrenderer.get_waveform_data(clip)
+        if waveform_data != None:
 
             cr.set_source_rgba(*AUDIO_LEVELS_COLOR)
         
             y_pad = TOP_PAD
             bar_height = eh
             
-            # Draw all frames only if pixels per frame > 2, otherwise
-            # draw only every other or fewer frames
-            draw_pix_per_frame = tlinewidgets.pix_per_frame
-            if draw_pix_per_frame < 2:
-                draw_pix_per_frame = 2
-                step = int(2 / pix_per_frame)
-                if step < 1:
-                    step = 1
-            else:
-                step = 1
-
             # Draw only frames in display.
             draw_first = clip_in
             draw_last = clip_out + 1
@@ -613,17 +606,19 @@ class TLineKeyFrameEditor:
             media_start_pos_pix = scale_in - clip_in * pix_per_frame
             mid_y = y + y_pad + eh / 2.0
             
-            # Draw level bar for each frame in draw range.
-            for f in range(draw_first, draw_last, step):
-                try:
-                    xf = media_start_pos_pix + f * pix_per_frame
-                    hf = bar_height * clip.waveform_data[f] * 0.5
-                    if h < 1:
-                        h = 1
-                    cr.rectangle(xf, mid_y - hf, draw_pix_per_frame, hf * 2.0)
-                except:
-                    # This is just dirty fix a when 23.98 fps does not work.
-                    break
+            # Draw levels as single polygon mirrored around mid line with at most one bar per pixel column.
+            xs, levels = tlinewidgets.get_waveform_columns(waveform_data, draw_first, draw_last, media_start_pos_pix, pix_per_frame)
+            if len(levels) > 0:
+                half_heights = (bar_height * levels * 0.5).tolist()
+                xs = xs.tolist()
+                cr.move_to(xs[0], mid_y)
+                for i in range(0, len(half_heights)):
+                    cr.line_to(xs[i], mid_y - half_heights[i])
+                    cr.line_to(xs[i + 1], mid_y - half_heights[i])
+                for i in range(len(half_heights) - 1, -1, -1):
+                    cr.line_to(xs[i + 1], mid_y + half_heights[i])
+                    cr.line_to(xs[i], mid_y + half_heights[i])
+                cr.close_path()
 
             cr.fill()
 
@@ -38,6 +38,7 @@ import editorpersistance # Aug-2019 - SvdB - BB
 import editorstate
 from editorstate import PROJECT
 import monitorevent
+import projectjournal
 import render
 import respaths
 import updater
@@ -89,6 +90,7 @@ class MediaLogEvent:
 def _mark_log_changed():
     global log_changed_since_last_save
     log_changed_since_last_save = True
+    projectjournal.project_changed()
 
 # ----------------------------------------------------------- dnd drop
 def clips_drop(clips):
@@ -0,0 +1,123 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module provides memory cache shared by waveforms, clip thumbnails and match frame surfaces.
+
+All items are kept in a single LRU ordered dict with keys (namespace, key) so that
+cached data types compete for the same memory budget. Least recently used items
+are dropped when total size of items exceeds budget.
+"""
+
+from collections import OrderedDict
+import threading
+
+WAVEFORMS = "waveforms"
+CLIP_THUMBNAILS = "clipthumbnails"
+MATCH_FRAMES = "matchframes"
+
+DEFAULT_BUDGET_MB = 512
+
+_items = OrderedDict() # (namespace, key) -> (value, size_bytes)
+_total_size = 0
+_budget = DEFAULT_BUDGET_MB * 1024 * 1024
+
+# Match frame surfaces are created in worker threads.
+_lock = threading.Lock()
+
+
+# ----------------------------------------------------- budget
+def set_budget_mb(budget_mb):
+    global _budget
+    with _lock:
+        _budget = int(budget_mb) * 1024 * 1024
+        _evict()
+
+def get_budget():
+    return _budget
+
+
+# ----------------------------------------------------- cache access
+def get(namespace, key):
+    """
+    Returns cached value or None if not found.
+    """
+    with _lock:
+        try:
+            value, size = _items[(namespace, key)]
+        except KeyError:
+            return None
+
+        _items.move_to_end((namespace, key))
+        return value
+
+def put(namespace, key, value, size_bytes):
+    global _total_size
+    with _lock:
+        try:
+            old_value, old_size = _items.pop((namespace, key))
+            _total_size -= old_size
+        except KeyError:
+            pass
+
+        _items[(namespace, key)] = (value, size_bytes)
+        _total_size += size_bytes
+        _evict()
+
+def remove(namespace, key):
+    global _total_size
+    with _lock:
+        try:
+            value, size = _items.pop((namespace, key))
+            _total_size -= size
+        except KeyError:
+            pass
+
+def clear(namespace=None):
+    """
+    Drops all items in namespace, or all items in cache if namespace is None.
+    """
+    global _total_size
+    with _lock:
+        if namespace == None:
+            _items.clear()
+            _total_size = 0
+            return
+
+        for item_key in [item_key for item_key in _items if item_key[0] == namespace]:
+            value, size = _items.pop(item_key)
+            _total_size -= size
+
+def _evict():
+    # Most recently added item is always kept even if it alone exceeds budget.
+    global _total_size
+    while _total_size > _budget and len(_items) > 1:
+        item_key, item = _items.popitem(last=False)
+        _total_size -= item[1]
+
+
+# ----------------------------------------------------- sizes
+def get_surface_size(surface):
+    try:
+        return surface.get_stride() * surface.get_height()
+    except:
+        # Not an image surface, give some nominal size.
+        return 4096
+
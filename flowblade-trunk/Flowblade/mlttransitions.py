@@ -458,14 +458,14 @@ def get_rendered_transition_tractor(current_sequence,
     
     # New from clip
     if orig_from.media_type != appconsts.PATTERN_PRODUCER:
-        from_clip = current_sequence.create_file_producer_clip(orig_from.path, None, False, orig_from.ttl)# File producer
+        from_clip = current_sequence.create_file_producer_clip(orig_from.path, None, False, orig_from.ttl, False)# File producer, not shared because rendered in another thread
     else:
         from_clip = current_sequence.create_pattern_producer(orig_from.create_data) # pattern producer
     current_sequence.clone_clip_and_filters(orig_from, from_clip)
 
     # New to clip
     if orig_to.media_type != appconsts.PATTERN_PRODUCER:
-        to_clip = current_sequence.create_file_producer_clip(orig_to.path, None, False, orig_to.ttl)# File producer
+        to_clip = current_sequence.create_file_producer_clip(orig_to.path, None, False, orig_to.ttl, False)# File producer, not shared because rendered in another thread
     else:
         to_clip = current_sequence.create_pattern_producer(orig_to.create_data) # pattern producer
     current_sequence.clone_clip_and_filters(orig_to, to_clip)
@@ -37,6 +37,7 @@ import gui
 import guicomponents
 import guipopover
 import movemodes
+import tlinerender
 import trimmodes
 import updater
 
@@ -55,6 +56,10 @@ def play_pressed():
     if editorstate.current_is_active_trim_mode() and trimmodes.submode != trimmodes.NOTHING_ON:
         return
 
+    # Make sure that no stale rendered timeline segments are played.
+    if current_is_move_mode() and editorstate.timeline_visible() and not PLAYER().is_playing():
+        tlinerender.update_timeline_rendering()
+
     if current_is_move_mode():
         movemodes.play_pressed()
     elif EDIT_MODE() == editorstate.ONE_ROLL_TRIM:
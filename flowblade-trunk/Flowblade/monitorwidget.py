@@ -33,6 +33,7 @@ import time
 import appconsts
 import cairoarea
 import editorstate
+import memorycache
 from editorstate import PLAYER
 from editorstate import PROJECT
 import respaths
@@ -67,6 +68,7 @@ FRAME_MATCH_VIEW_COLOR = (0.3, 0.3, 0.3)
 CONTINUOS_UPDATE_PAUSE = 0.2
 _last_render_time = 0.0
 _producer = None
+_producer_path = None
 _consumer = None
 _frame_write_on = False
             
@@ -855,9 +857,10 @@ class MonitorMatchFrameWriter(threading.Thread):
             pass
         
         # Save producer and consumer for view needing continues match frame update
-        global _producer, _consumer
+        global _producer, _producer_path, _consumer
         if _widget.view != START_TRIM_VIEW and _widget.view != END_TRIM_VIEW:
             _producer = producer
+            _producer_path = self.clip_path
             _consumer = consumer
 
         # Connect and write image
@@ -882,7 +885,16 @@ class MatchSurfaceCreator(threading.Thread):
         while _producer == None:
             print("MatchSurfaceCreator: waiting for _producer")
             time.sleep(0.01)
-            
+
+        # Surfaces for frames already displayed during this edit are found in cache.
+        size = _widget.get_match_frame_panel_size()
+        cache_key = (_producer_path, int(self.match_frame), size)
+        surface = memorycache.get(memorycache.MATCH_FRAMES, cache_key)
+        if surface != None:
+            _widget.match_frame_surface = surface
+            GLib.timeout_add(0, _widget._draw_displays)
+            return
+
         image_producer = _producer.cut(int(self.match_frame), int(self.match_frame))
         image_producer.set_speed(0)
         image_producer.seek(0)
@@ -891,7 +903,6 @@ class MatchSurfaceCreator(threading.Thread):
         frame = image_producer.get_frame()
         # And make sureto deinterlace if input is interlaced
         frame.set("consumer_deinterlace", 1)
-        size = _widget.get_match_frame_panel_size()
         mlt_rgb = frame.get_image(mlt.mlt_image_rgba, *size) 
    
         # Create cairo surface
@@ -899,7 +910,8 @@ class MatchSurfaceCreator(threading.Thread):
         img_w, img_h = size
         stride = cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_RGB24, img_w)
         surface = cairo.ImageSurface.create_for_data(cairo_buf, cairo.FORMAT_RGB24, img_w, img_h, stride)
-        
+        memorycache.put(memorycache.MATCH_FRAMES, cache_key, surface, memorycache.get_surface_size(surface))
+
         _widget.match_frame_surface = surface
         
         # Repaint
@@ -26,6 +26,7 @@ SwigPyObject MLT objects with pickleable python objects for save,
 and then create MLT objects from pickled objects when project is loaded.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 import copy
 import glob
 import fnmatch
@@ -33,6 +34,7 @@ import hashlib
 import os
 import pickle
 import sys
+import threading
 import time
 
 from gi.repository import GLib
@@ -45,6 +47,7 @@ import mltprofiles
 import mltfilters
 import mlttransitions
 import persistancecompat
+import projectjournal
 import propertyparse
 import resync
 import userfolders
@@ -53,7 +56,7 @@ import utils
 # Unpickleable attributes for all objects
 # These are removed at save and recreated at load.
 PROJECT_REMOVE = ['profile','c_seq']
-SEQUENCE_REMOVE = ['profile','field','multitrack','tractor','monitor_clip','vectorscope','audiowave','rgbparade','outputfilter','watermark_filter']
+SEQUENCE_REMOVE = ['mlt_build_data','clip_ids','clip_positions','clip_starts','cut_frames','profile','field','multitrack','tractor','monitor_clip','vectorscope','audiowave','rgbparade','outputfilter','watermark_filter']
 PLAY_LIST_REMOVE = ['this','sequence','get_name','gain_filter','pan_filter']
 CLIP_REMOVE = ['this','clip_length']
 TRANSITION_REMOVE = ['this']
@@ -62,6 +65,10 @@ MEDIA_FILE_REMOVE = ['icon']
 
 # Used to flag a not found relative path
 NOT_FOUND = "/not_found_not_found/not_found"
+
+RELATIVE_SEARCH_THREADS = 8 # Folder walks are IO bound, this mainly helps with network file systems.
+_relative_search_indexes = {} # project folder -> RelativeSearchIndex
+_relative_search_indexes_validated = set()
         
 # Used to send messages when loading project, set at callsite.
 load_dialog = None
@@ -117,12 +124,94 @@ def _do_show_msg(msg):
     load_dialog.info.set_text(msg)
         
 # -------------------------------------------------- SAVE
-def save_project(project, file_path, changed_profile_desc=None):
+def save_project(project, file_path, changed_profile_desc=None, journal_snapshot_id=None):
     """
-    Creates pickleable project object
+    Creates pickleable project object and writes it to file.
     """
     print("Saving project...")# + os.path.basename(file_path))
     
+    s_proj = get_pickleable_project(project, changed_profile_desc)
+
+    # Autosave snapshots are identified so that only journal records written for them are replayed.
+    if journal_snapshot_id != None:
+        s_proj.journal_snapshot_id = journal_snapshot_id
+
+    # Write out file.
+    with atomicfile.AtomicFileWriter(file_path, "wb") as afw:
+        outfile = afw.get_file()
+        pickle.dump(s_proj, outfile)
+
+def get_autosave_snapshot(project, journal_snapshot_id, sequence_indexes=None):
+    """
+    Creates pickleable project object for AutosaveWriterThread.
+
+    Pickleable project object is a shallow copy, so containers that later edits change 
+    in place are copied here on GTK thread. Pickling is done in AutosaveWriterThread.
+    """
+    s_proj = get_pickleable_project(project, None, sequence_indexes)
+    s_proj.journal_snapshot_id = journal_snapshot_id
+
+    s_bins = []
+    for b in project.bins:
+        s_bin = copy.copy(b)
+        s_bin.file_ids = list(b.file_ids)
+        s_bins.append(s_bin)
+    s_proj.bins = s_bins
+
+    # Groups refer to media log events, copies keep that identity when pickled.
+    s_events = {}
+    for log_event in project.media_log:
+        s_events[id(log_event)] = copy.copy(log_event)
+    s_proj.media_log = [s_events[id(log_event)] for log_event in project.media_log]
+    s_proj.media_log_groups = []
+    for name, items in project.media_log_groups:
+        s_items = [s_events.get(id(log_event), log_event) for log_event in items]
+        s_proj.media_log_groups.append((name, s_items))
+
+    s_proj.events = list(project.events)
+    s_proj.project_properties = copy.copy(project.project_properties)
+    s_proj.proxy_data = copy.copy(project.proxy_data)
+
+    return s_proj
+
+
+class AutosaveWriterThread(threading.Thread):
+    """
+    Pickles and writes autosave snapshot or journal record outside GTK thread.
+    
+    completed_callback(succeeded) is called on GTK thread when done.
+    """
+    def __init__(self, s_proj, autosave_path, is_journal_record, completed_callback):
+        threading.Thread.__init__(self)
+        self.s_proj = s_proj
+        self.autosave_path = autosave_path
+        self.is_journal_record = is_journal_record
+        self.completed_callback = completed_callback
+
+    def run(self):
+        try:
+            project_data = pickle.dumps(self.s_proj)
+            if self.is_journal_record == True:
+                projectjournal.append_record(self.autosave_path, project_data)
+            else:
+                with atomicfile.AtomicFileWriter(self.autosave_path, "wb") as afw:
+                    outfile = afw.get_file()
+                    outfile.write(project_data)
+                # Records written for previous snapshot are no longer needed.
+                projectjournal.delete_journal(self.autosave_path)
+            succeeded = True
+        except Exception as e:
+            print("Autosave write failed:", e)
+            succeeded = False
+
+        GLib.idle_add(self.completed_callback, succeeded)
+
+
+def get_pickleable_project(project, changed_profile_desc=None, sequence_indexes=None):
+    """
+    Creates pickleable project object, if sequence_indexes is given only those sequences
+    are converted and other items in sequences list are None.
+    """
     # Get shallow copy
     s_proj = copy.copy(project)
     
@@ -189,6 +278,9 @@ def save_project(project, file_path, changed_profile_desc=None):
     # Replace sequences with pickleable objects
     sequences = []
     for i in range(0, len(project.sequences)):
+        if sequence_indexes != None and not(i in sequence_indexes):
+            sequences.append(None)
+            continue
         add_seq = project.sequences[i]
         sequences.append(get_p_sequence(add_seq))
     s_proj.sequences = sequences
@@ -196,16 +288,14 @@ def save_project(project, file_path, changed_profile_desc=None):
     # Remove unpickleable attributes
     remove_attrs(s_proj, PROJECT_REMOVE)
 
-    # Write out file.
-    with atomicfile.AtomicFileWriter(file_path, "wb") as afw:
-        outfile = afw.get_file()
-        pickle.dump(s_proj, outfile)
+    return s_proj
 
 def get_p_sequence(sequence):
     """
     Creates pickleable sequence object from MLT Playlist
     """
     s_seq = copy.copy(sequence)
+    s_seq.markers = list(sequence.markers)
     
     # Replace tracks with pickleable objects
     tracks = []
@@ -291,6 +381,9 @@ def get_p_clip(clip):
     # Don't save waveform data.
     s_clip.waveform_data = None
 
+    if hasattr(clip, "markers"):
+        s_clip.markers = list(clip.markers)
+
     # Add pickleable filters
     s_clip.filters = filters
     
@@ -316,6 +409,10 @@ def get_p_filter(f):
     Creates pickleable version of MLT Filter object.
     """
     s_filter = copy.copy(f)
+    # Property lists are edited in place, copy them so that autosave snapshot written
+    # in a background thread is not changed by later edits.
+    s_filter.properties = list(f.properties)
+    s_filter.non_mlt_properties = list(getattr(f, "non_mlt_properties", []))
     remove_attrs(s_filter, FILTER_REMOVE)
     if f.info.multipart_filter == False:
         s_filter.is_multi_filter = False
@@ -329,6 +426,7 @@ def get_p_compositors(compositors):
     for compositor in compositors:
         s_compositor = copy.copy(compositor)
         s_compositor.transition = copy.copy(compositor.transition)
+        s_compositor.transition.properties = list(compositor.transition.properties)
         s_compositor.transition.mlt_transition = None
         if _fps_conv_mult != 1.0:
             _update_compositor_in_out_for_fps_change(s_compositor)
@@ -391,6 +489,15 @@ def load_project(file_path, icons_and_thumnails=True, relinker_load=False):
 
     project = unpickle(file_path)
 
+    _clear_relative_search_indexes_validation()
+
+    # Autosave snapshots may have journal of later changes.
+    project = projectjournal.replay_journal(project, file_path)
+    try:
+        del project.journal_snapshot_id
+    except AttributeError:
+        pass
+
     # Relinker only operates on pickleable python data 
     if relinker_load:
         persistancecompat.FIX_MISSING_PROJECT_ATTRS(project)
@@ -459,29 +566,15 @@ def load_project(file_path, icons_and_thumnails=True, relinker_load=False):
 
         _show_msg("Loading Media Item: " + media_file.name)
 
-    # Add MLT objects to sequences.
-    global all_clips, sync_clips
-    seq_count = 1
+    # Add MLT objects to current sequence. Other sequences are kept as unpickled
+    # python data until they are first activated, see build_sequence_mlt().
     for seq in project.sequences:
-            
         persistancecompat.FIX_MISSING_SEQUENCE_ATTRS(seq)
-
-        _show_msg(_("Building sequence ") + str(seq_count))
-        all_clips = {}
-        sync_clips = []
-                
         seq.profile = project.profile
-        fill_sequence_mlt(seq, project.SAVEFILE_VERSION)
+        seq.mlt_build_data = (_load_file_path, project_proxy_mode, proxy_path_dict)
 
-        handle_seq_watermark(seq)
-
-        if not hasattr(seq, "seq_len"):
-            seq.update_edit_tracks_length()
-
-        seq_count = seq_count + 1
-
-    all_clips = {}
-    sync_clips = []
+    project.c_seq = None
+    build_sequence_mlt(project.sequences[project.c_seq_index], show_messages)
 
     if icons_and_thumnails == True:
         _show_msg(_("Loading icons"))
@@ -494,6 +587,86 @@ def load_project(file_path, icons_and_thumnails=True, relinker_load=False):
 
     return project
 
+def sequence_mlt_built(seq):
+    return not hasattr(seq, "mlt_build_data")
+
+def build_sequence_mlt(seq, show_progress=False):
+    """
+    Replaces unbuilt sequence py objects with mlt objects.
+
+    Sequence object identity is kept, editorstate.project.c_seq is restored after build.
+    """
+    if sequence_mlt_built(seq) == True:
+        return
+
+    global show_messages, _load_file_path, project_proxy_mode, proxy_path_dict, all_clips, sync_clips
+    show_messages_value = show_messages
+    show_messages = show_progress
+    seq_data = seq.__dict__.copy()
+    _load_file_path, project_proxy_mode, proxy_path_dict = seq.mlt_build_data
+    del seq.mlt_build_data
+    _clear_relative_search_indexes_validation()
+
+    project = editorstate.project
+    c_seq = project.c_seq
+
+    _show_msg(_("Building sequence ") + seq.name)
+    all_clips = {}
+    sync_clips = []
+
+    try:
+        fill_sequence_mlt(seq, project.SAVEFILE_VERSION)
+    except FileProducerNotFoundError:
+        # Sequence is left unbuilt with its python data so that it can be built
+        # again after missing media has been relinked.
+        seq.__dict__.clear()
+        seq.__dict__.update(seq_data)
+        all_clips = {}
+        sync_clips = []
+        show_messages = show_messages_value
+        project.c_seq = c_seq
+        raise
+
+    handle_seq_watermark(seq)
+
+    if not hasattr(seq, "seq_len"):
+        seq.update_edit_tracks_length()
+
+    all_clips = {}
+    sync_clips = []
+    show_messages = show_messages_value
+
+    # fill_sequence_mlt() sets built sequence as current sequence on load.
+    project.c_seq = c_seq
+    if c_seq != None and c_seq != seq:
+        resync.sequence_changed(c_seq)
+
+def unload_sequence_mlt(project, seq):
+    """
+    Replaces built sequence in project with its pickleable python data to release
+    MLT objects. Sequence gets rebuilt with build_sequence_mlt() when needed again.
+    """
+    global _fps_conv_mult, _xml_new_paths_for_profile_change, project_proxy_mode, proxy_path_dict
+    _fps_conv_mult = 1.0
+    _xml_new_paths_for_profile_change = None
+    project_proxy_mode = project.proxy_data.proxy_mode
+    proxy_path_dict = {}
+
+    s_seq = get_p_sequence(seq)
+    s_seq.profile = project.profile
+
+    load_file_path = project.last_save_path
+    if load_file_path == None:
+        load_file_path = ""
+    build_proxy_path_dict = {}
+    for k, media_file in project.media_files.items():
+        if hasattr(media_file, "path"):
+            build_proxy_path_dict[media_file.path] = getattr(media_file, "second_file_path", None)
+    s_seq.mlt_build_data = (load_file_path, project.proxy_data.proxy_mode, build_proxy_path_dict)
+
+    project.sequences[project.sequences.index(seq)] = s_seq
+    return s_seq
+
 def fill_sequence_mlt(seq, SAVEFILE_VERSION):
     """
     Replaces sequences py objects with mlt objects
@@ -509,8 +682,10 @@ def fill_sequence_mlt(seq, SAVEFILE_VERSION):
     py_tracks = seq.tracks
     seq.tracks = []
 
-    # editorstate.project.c_seq needs to be available for sequence building 
-    editorstate.project.c_seq = seq
+    # editorstate.project.c_seq needs to be available for sequence building.
+    # Sequences built after load use current sequence, all sequences have project profile.
+    if editorstate.project.c_seq == None:
+        editorstate.project.c_seq = seq
     
     # Create and fill MLT tracks.
     for py_track in py_tracks:
@@ -578,6 +753,8 @@ def fill_sequence_mlt(seq, SAVEFILE_VERSION):
     # This sets MLT properties that actually do mute
     seq.set_tracks_mute_state()
 
+    seq.optimise_shared_producers()
+
     seq.length = None
 
 def fill_track_mlt(mlt_track, py_track):
@@ -720,6 +897,7 @@ def append_clip(track, clip, clip_in, clip_out):
     clip.clip_in = clip_in
     clip.clip_out = clip_out
     track.clips.append(clip) # py
+    track.sequence.clip_added(track, clip)
     track.append(clip, clip_in, clip_out) # mlt
     resync.clip_added_to_timeline(clip, track)
 
@@ -775,13 +953,10 @@ def get_img_seq_media_path(path, load_file_path):
 def get_relative_path(project_file_path, asset_path):
     name = os.path.basename(asset_path)
     _show_msg(_("Relative file search for ")  + name + "...")
-    matches = []
     asset_folder, asset_file_name = os.path.split(asset_path)
     project_folder, project_file_name =  os.path.split(project_file_path)
     
-    for root, dirnames, filenames in os.walk(project_folder):
-        for filename in fnmatch.filter(filenames, asset_file_name):
-            matches.append(os.path.join(root, filename))
+    matches = _get_relative_search_index(project_folder).find_files(asset_file_name)
     if len(matches) == 1:
         return matches[0]
     elif  len(matches) > 1:
@@ -797,13 +972,110 @@ def get_img_seq_relative_path(project_file_path, asset_path):
     
     project_folder, project_file_name =  os.path.split(project_file_path)
     
-    for root, dirnames, filenames in os.walk(project_folder):
-        look_up_path = root + "/" + look_up_file_name
-        listing = glob.glob(look_up_path)
-        if len(listing) > 0:
-            return root + "/" + asset_file_name
+    root = _get_relative_search_index(project_folder).find_folder_with_match(look_up_file_name)
+    if root != None:
+        return root + "/" + asset_file_name
 
     return NOT_FOUND # no relative path found
+
+def _get_relative_search_index(project_folder):
+    # Index is validated once per load and rebuilt if any folder in tree has changed.
+    try:
+        index = _relative_search_indexes[project_folder]
+        if project_folder in _relative_search_indexes_validated or index.is_valid() == True:
+            _relative_search_indexes_validated.add(project_folder)
+            return index
+    except KeyError:
+        pass
+
+    _show_msg(_("Indexing folder ") + project_folder + "...")
+    index = RelativeSearchIndex(project_folder)
+    _relative_search_indexes[project_folder] = index
+    _relative_search_indexes_validated.add(project_folder)
+    return index
+
+def _clear_relative_search_indexes_validation():
+    _relative_search_indexes_validated.clear()
+
+
+class RelativeSearchIndex:
+    """
+    File name -> paths index of a folder tree for relative media search.
+    
+    Top level subfolders are walked in parallel, results are combined in os.walk() order
+    so that first match is the same as with a single walk.
+    """
+    def __init__(self, root_folder):
+        self.folders = [] # (folder, file names) in os.walk() order
+        self.file_paths = {} # file name -> paths
+        self.folder_mtimes = {}
+
+        if not os.path.isdir(root_folder):
+            return
+
+        root_file_names, sub_folders = self._scan_folder(root_folder)
+        self.folders.append((root_folder, root_file_names))
+        
+        with ThreadPoolExecutor(max_workers=RELATIVE_SEARCH_THREADS) as executor:
+            for sub_folder_walk in executor.map(self._walk_folder, sub_folders):
+                self.folders.extend(sub_folder_walk)
+
+        for folder, file_names in self.folders:
+            for file_name in file_names:
+                self.file_paths.setdefault(file_name, []).append(os.path.join(folder, file_name))
+
+    def _scan_folder(self, folder):
+        self.folder_mtimes[folder] = os.stat(folder).st_mtime
+        file_names = []
+        sub_folders = []
+        try:
+            entries = sorted(os.scandir(folder), key=lambda entry: entry.name)
+        except OSError:
+            return (file_names, sub_folders)
+        for entry in entries:
+            if entry.is_dir():
+                if not entry.is_symlink(): # Like os.walk(), do not follow folder links.
+                    sub_folders.append(entry.path)
+            else:
+                file_names.append(entry.name)
+        return (file_names, sub_folders)
+
+    def _walk_folder(self, folder):
+        walk = []
+        for root, dirnames, filenames in os.walk(folder):
+            dirnames.sort()
+            walk.append((root, filenames))
+            try:
+                self.folder_mtimes[root] = os.stat(root).st_mtime
+            except OSError:
+                pass
+        return walk
+
+    def is_valid(self):
+        for folder, mtime in self.folder_mtimes.items():
+            try:
+                if os.stat(folder).st_mtime != mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def find_files(self, file_name):
+        if glob.has_magic(file_name) == False:
+            return self.file_paths.get(file_name, [])
+
+        # File names are used as patterns in search, names with pattern chars need matching.
+        matches = []
+        for folder, file_names in self.folders:
+            for match_name in fnmatch.filter(file_names, file_name):
+                matches.append(os.path.join(folder, match_name))
+        return matches
+
+    def find_folder_with_match(self, look_up_file_name):
+        for folder, file_names in self.folders:
+            if len(fnmatch.filter(file_names, look_up_file_name)) > 0:
+                return folder
+        return None
         
     
 # ------------------------------------------------------- backwards compatibility
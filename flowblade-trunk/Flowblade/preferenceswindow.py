@@ -27,8 +27,10 @@ import dialogutils
 import editorpersistance
 import gui
 import guiutils
+import memorycache
 import mltprofiles
 import multiprocessing
+import undo
 import utils
 import utilsgtk
 
@@ -74,6 +76,8 @@ def _preferences_dialog_callback(dialog, response_id, all_widgets):
     if response_id == Gtk.ResponseType.ACCEPT:
         editorpersistance.update_prefs_from_widgets(all_widgets)
         editorpersistance.save()
+        memorycache.set_budget_mb(editorpersistance.prefs.memory_cache_budget_mb)
+        undo.set_memory_budget_mb(editorpersistance.prefs.undo_memory_budget_mb)
         dialog.destroy()
         primary_txt = _("Restart required for some setting changes to take effect.")
         secondary_txt = _("If requested change is not in effect, restart application.")
@@ -97,10 +101,11 @@ def _general_options_panel():
     for profile in profiles:
         default_profile_combo.append_text(profile[0])
     default_profile_combo.set_active(mltprofiles.get_default_profile_index())
-    spin_adj = Gtk.Adjustment(value=prefs.undos_max, lower=editorpersistance.UNDO_STACK_MIN, upper=editorpersistance.UNDO_STACK_MAX, step_increment=1)
-    undo_max_spin = Gtk.SpinButton.new_with_range(editorpersistance.UNDO_STACK_MIN, editorpersistance.UNDO_STACK_MAX, 1)
-    undo_max_spin.set_adjustment(spin_adj)
-    undo_max_spin.set_numeric(True)
+    spin_adj = Gtk.Adjustment(value=prefs.undo_memory_budget_mb, lower=editorpersistance.UNDO_MEMORY_MIN, upper=editorpersistance.UNDO_MEMORY_MAX, step_increment=16)
+    undo_memory_spin = Gtk.SpinButton.new_with_range(editorpersistance.UNDO_MEMORY_MIN, editorpersistance.UNDO_MEMORY_MAX, 16)
+    undo_memory_spin.set_adjustment(spin_adj)
+    undo_memory_spin.set_numeric(True)
+    undo_memory_spin.set_tooltip_text(_("Oldest undos are removed when edits in undo stack use more memory than this"))
 
     autosave_combo = Gtk.ComboBoxText()
     # Aug-2019 - SvdB - AS - This is now initialized in app.main
@@ -136,7 +141,7 @@ def _general_options_panel():
     # Layout
     row1 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Default Profile:")), default_profile_combo, PREFERENCES_LEFT))
     row2 = _row(guiutils.get_checkbox_row_box(open_in_last_opened_check, Gtk.Label(label=_("Remember last media directory"))))
-    row3 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Undo stack size:")), undo_max_spin, PREFERENCES_LEFT))
+    row3 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Undo Stack Memory MB:")), undo_memory_spin, PREFERENCES_LEFT))
     row5 = _row(guiutils.get_checkbox_row_box(open_in_last_rendered_check, Gtk.Label(label=_("Remember last render directory"))))
     row6 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Autosave for crash recovery every:")), autosave_combo, PREFERENCES_LEFT))
     row9 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Media look-up order on load:")), load_order_combo, PREFERENCES_LEFT))
@@ -158,7 +163,7 @@ def _general_options_panel():
 
     # Aug-2019 - SvdB - AS - Added autosave_combo
     return vbox, ( default_profile_combo, open_in_last_opened_check, open_in_last_rendered_check,
-                    undo_max_spin, load_order_combo, autosave_combo, render_folder_select, disk_cache_warning_combo)
+                    undo_memory_spin, load_order_combo, autosave_combo, render_folder_select, disk_cache_warning_combo)
 
 def _edit_prefs_panel():
     prefs = editorpersistance.prefs
@@ -437,25 +442,75 @@ def _performance_panel():
     perf_drop_frames = Gtk.CheckButton()
     perf_drop_frames.set_active(prefs.perf_drop_frames)
 
+    spin_adj = Gtk.Adjustment(value=prefs.audio_levels_render_processes, lower=1, upper=multiprocessing.cpu_count(), step_increment=1)
+    audio_levels_processes = Gtk.SpinButton(adjustment=spin_adj)
+    audio_levels_processes.set_numeric(True)
+
+    spin_adj = Gtk.Adjustment(value=prefs.memory_cache_budget_mb, lower=64, upper=16384, step_increment=64)
+    memory_cache_budget = Gtk.SpinButton(adjustment=spin_adj)
+    memory_cache_budget.set_numeric(True)
+
+    tline_render_mode_combo = Gtk.ComboBoxText()
+    tline_render_mode_combo.append_text(_("Off"))
+    tline_render_mode_combo.append_text(_("Render In Background"))
+    tline_render_mode_combo.set_active(prefs.tline_render_mode)
+
+    spin_adj = Gtk.Adjustment(value=prefs.segmented_render_processes, lower=1, upper=multiprocessing.cpu_count(), step_increment=1)
+    segmented_render_processes = Gtk.SpinButton(adjustment=spin_adj)
+    segmented_render_processes.set_numeric(True)
+
+    spin_adj = Gtk.Adjustment(value=prefs.batch_render_slots, lower=1, upper=multiprocessing.cpu_count(), step_increment=1)
+    batch_render_slots = Gtk.SpinButton(adjustment=spin_adj)
+    batch_render_slots.set_numeric(True)
+
+    spin_adj = Gtk.Adjustment(value=prefs.max_concurrent_jobs, lower=1, upper=multiprocessing.cpu_count(), step_increment=1)
+    max_concurrent_jobs = Gtk.SpinButton(adjustment=spin_adj)
+    max_concurrent_jobs.set_numeric(True)
+
+    spin_adj = Gtk.Adjustment(value=prefs.generator_render_processes, lower=0, upper=multiprocessing.cpu_count(), step_increment=1)
+    generator_render_processes = Gtk.SpinButton(adjustment=spin_adj)
+    generator_render_processes.set_numeric(True)
+
     # Tooltips
     perf_render_threads.set_tooltip_text(_("Between 1 and the number of CPU Cores"))
     perf_drop_frames.set_tooltip_text(_("Allow Frame Dropping for real-time rendering, when needed"))
+    audio_levels_processes.set_tooltip_text(_("Number of processes used to render audio levels data for waveforms"))
+    memory_cache_budget.set_tooltip_text(_("Memory used to cache waveforms, clip thumbnails and match frames"))
+    tline_render_mode_combo.set_tooltip_text(_("Render changed parts of timeline in background for smooth playback"))
+    max_concurrent_jobs.set_tooltip_text(_("Number of Jobs panel renders running at the same time"))
+    batch_render_slots.set_tooltip_text(_("Number of Batch Render Queue items rendered at the same time, CPU cores are divided between them"))
+    segmented_render_processes.set_tooltip_text(_("Number of processes rendering segments of Batch and Single renders in parallel, 1 renders in one process"))
+    generator_render_processes.set_tooltip_text(_("Number of processes rendering Generator frames, 0 decides number based on CPU count"))
 
     # Layout
     row0 = _row(guiutils.get_left_justified_box([warning_icon, warning_label]))
     row1 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Render Threads:")), perf_render_threads, PREFERENCES_LEFT))
     row2 = _row(guiutils.get_checkbox_row_box(perf_drop_frames, Gtk.Label(label=_("Allow Frame Dropping"))))
+    row3 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Audio Levels Render Processes:")), audio_levels_processes, PREFERENCES_LEFT))
+    row4 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Memory Cache Size MB:")), memory_cache_budget, PREFERENCES_LEFT))
+    row5 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Timeline Preview Rendering:")), tline_render_mode_combo, PREFERENCES_LEFT))
+    row6 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Segmented Render Processes:")), segmented_render_processes, PREFERENCES_LEFT))
+    row7 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Concurrent Batch Renders:")), batch_render_slots, PREFERENCES_LEFT))
+    row8 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Concurrent Jobs:")), max_concurrent_jobs, PREFERENCES_LEFT))
+    row9 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Generator Render Processes:")), generator_render_processes, PREFERENCES_LEFT))
 
     vbox = Gtk.VBox(False, 2)
     vbox.pack_start(row0, False, False, 0)
     vbox.pack_start(guiutils.pad_label(12, 12), False, False, 0)
     vbox.pack_start(row1, False, False, 0)
     vbox.pack_start(row2, False, False, 0)
+    vbox.pack_start(row3, False, False, 0)
+    vbox.pack_start(row4, False, False, 0)
+    vbox.pack_start(row5, False, False, 0)
+    vbox.pack_start(row6, False, False, 0)
+    vbox.pack_start(row7, False, False, 0)
+    vbox.pack_start(row8, False, False, 0)
+    vbox.pack_start(row9, False, False, 0)
     vbox.pack_start(Gtk.Label(), True, True, 0)
 
     guiutils.set_margins(vbox, 12, 0, 12, 12)
 
-    return vbox, (perf_render_threads, perf_drop_frames)
+    return vbox, (perf_render_threads, perf_drop_frames, audio_levels_processes, memory_cache_budget, tline_render_mode_combo, segmented_render_processes, batch_render_slots, max_concurrent_jobs, generator_render_processes)
 
 def _row(row_cont):
     row_cont.set_size_request(10, 26)
@@ -0,0 +1,91 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module provides shared parent producers for timeline file clips.
+
+Timeline clips are MLT cuts of one parent producer per media file so that
+clips cut from the same file do not each open their own demuxer and decoder.
+Filters attached to a cut only affect that cut.
+
+Parents are reference counted by the python cut objects handed out and are dropped
+from cache when last cut is garbage collected. MLT keeps parent alive as long as
+any cut still references it, e.g. from a playlist.
+"""
+
+try:
+    import mlt7 as mlt
+except:
+    import mlt
+import os
+import weakref
+
+_parents = {} # (path, mtime, profile description, ttl) -> [parent producer, cuts count]
+
+
+def get_clip_producer(profile, path, ttl=None):
+    key = _get_key(profile, path, ttl)
+    try:
+        entry = _parents[key]
+    except KeyError:
+        parent = mlt.Producer(profile, str(path)) # this runs 0.5s+ on some clips
+        if parent.is_valid() == False:
+            return parent # Caller handles invalid and missing files.
+
+        # Img seq ttl value and pause muting are read by the parent producer.
+        if ttl != None:
+            parent.set("ttl", str(ttl))
+        parent.set("mute_on_pause", str(1))
+        entry = [parent, 0]
+        _parents[key] = entry
+
+    parent = entry[0]
+    cut = parent.cut()
+    entry[1] += 1
+    weakref.finalize(cut, _cut_released, key, entry)
+    return cut
+
+def set_cut_range(clip, clip_in, clip_out):
+    # Playlists use inserted cuts as they are and limit out to current cut out, 
+    # so cut shortened by an earlier edit needs its range set before it is inserted again.
+    if clip.is_cut():
+        clip.set_in_and_out(clip_in, clip_out)
+
+def clear():
+    # Existing cuts keep their parents alive in MLT, new clips get new parents.
+    _parents.clear()
+
+def get_parents_count():
+    return len(_parents)
+
+def _cut_released(key, entry):
+    entry[1] -= 1
+    if entry[1] > 0:
+        return
+    # Cache may have been cleared and key reused for another parent.
+    if _parents.get(key) is entry:
+        del _parents[key]
+
+def _get_key(profile, path, ttl):
+    try:
+        mtime = os.path.getmtime(path) # Re-rendered files at same path must get new parent.
+    except OSError:
+        mtime = None
+    return (path, mtime, profile.description(), ttl)
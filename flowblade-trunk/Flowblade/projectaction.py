@@ -23,6 +23,7 @@ Module handles user actions that are not edits on the current sequence.
 Load, save, add media file, etc...
 """
 
+import concurrent.futures
 import datetime
 import glob
 import hashlib
@@ -77,6 +78,7 @@ import patternproducer
 import persistance
 import projectdata
 import projectinfogui
+import projectjournal
 import projectmediaimport
 import propertyparse
 import projectdatavault
@@ -104,6 +106,10 @@ force_proxy = False
 # This is needed to pass only one event for double click, double init for monitor click possibly somewhat unstable
 _media_panel_double_click_counter = 0
 
+# Media import creates thumbnails and reads file info for this many files at the same time.
+MEDIA_IMPORT_THREADS = max(1, min(8, os.cpu_count() or 1))
+MEDIA_IMPORT_UPDATE_INTERVAL = 0.5 # seconds between media list updates during import
+
 
 #--------------------------------------- worker threads
 class LoadThread(threading.Thread):
@@ -283,6 +289,7 @@ class AddMediaFilesThread(threading.Thread):
         target_bin = PROJECT().c_bin
         succes_new_file = None
         filenames = self.filenames
+        load_files = []
         for new_file in filenames:
             (folder, file_name) = os.path.split(new_file)
             
@@ -302,19 +309,30 @@ class AddMediaFilesThread(threading.Thread):
                 extension_refused.append(new_file)
                 continue
 
-            if PROJECT().media_file_exists(new_file):
+            if PROJECT().media_file_exists(new_file) or new_file in load_files:
                 duplicates.append(file_name)
             else:
+                load_files.append(new_file)
+
+        # Thumbnails and file info are created in parallel, media files are added in selection order.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=MEDIA_IMPORT_THREADS) as executor:
+            media_data_futures = [executor.submit(projectdata.thumbnailer.get_media_data, new_file) for new_file in load_files]
+            last_update_time = time.monotonic()
+            for i in range(0, len(load_files)):
+                new_file = load_files[i]
                 try:
-                    PROJECT().add_media_file(new_file, self.compound_clip_name, target_bin)
+                    PROJECT().add_media_file(new_file, self.compound_clip_name, target_bin, media_data_futures[i].result())
                     succes_new_file = new_file
                 except projectdata.ProducerNotValidError as err:
                     GLib.idle_add(self._not_valid_producer, err)
 
-            self.list_view_update_done = False
-            GLib.idle_add(self._list_view_update)
-            while self.list_view_update_done == False:
-                time.sleep(0.05)
+                # Updating list view for every file makes large imports slow.
+                if time.monotonic() - last_update_time > MEDIA_IMPORT_UPDATE_INTERVAL or i == len(load_files) - 1:
+                    self.list_view_update_done = False
+                    GLib.idle_add(self._list_view_update)
+                    while self.list_view_update_done == False:
+                        time.sleep(0.05)
+                    last_update_time = time.monotonic()
 
         add_count = len(filenames) - len(duplicates)
         project_event = projectdata.ProjectEvent(projectdata.EVENT_MEDIA_ADDED, str(add_count))
@@ -406,6 +424,50 @@ class UpdateMediaLengthsThread(threading.Thread):
         
         print("Updating media lengths done.")
         
+class BuildSequenceThread(threading.Thread):
+    
+    def __init__(self, dialog, seq_index):
+        threading.Thread.__init__(self)
+        self.dialog = dialog
+        self.seq_index = seq_index
+
+    def run(self):
+        ticker = utils.Ticker(self._pulse_bar, 0.15)
+        ticker.start_ticker()
+
+        persistance.load_dialog = self.dialog
+        try:
+            persistance.build_sequence_mlt(PROJECT().sequences[self.seq_index], True)
+        except persistance.FileProducerNotFoundError as e:
+            ticker.stop_ticker()
+            GLib.idle_add(self._build_failed, e)
+            return
+
+        ticker.stop_ticker()
+        GLib.idle_add(self._build_done)
+
+    def _pulse_bar(self):
+        GLib.idle_add(self.dialog.progress_bar.pulse)
+
+    def _build_done(self):
+        dialogutils.dialog_destroy(self.dialog, None)
+        app.change_current_sequence(self.seq_index)
+
+    def _build_failed(self, e):
+        print("BuildSequenceThread.run() - FileProducerNotFoundError")
+        dialogutils.dialog_destroy(self.dialog, None)
+        app.start_autosave()
+        show_sequence_media_missing_dialog(e)
+
+def show_sequence_media_missing_dialog(e):
+    primary_txt = _("Media asset was missing!")
+    secondary_txt = _("Path of missing asset:") + "\n   <b>" + e.value + "</b>\n\n" + \
+                    _("Relative search for replacement file in sub folders of project file failed.") + "\n\n" + \
+                    _("To open the sequence you will need to either:") + "\n" + \
+                    "\u2022" + " " + _("Open project in 'Media Relinker' tool to relink media assets to new files, or") + "\n" + \
+                    "\u2022" + " " + _("Place a file with the same exact name and path on the hard drive")
+    dialogutils.warning_message(primary_txt, secondary_txt, gui.editor_window.window)
+
 def _duplicates_info(duplicates):
     primary_txt = _("Media files already present in project were opened!")
     MAX_DISPLAYED_ITEMS = 3
@@ -459,6 +521,7 @@ def _load_pulse_bar():
     GLib.idle_add(persistance.load_dialog.progress_bar.pulse)
     
 def _enable_save():
+    projectjournal.project_changed()
     if PROJECT().last_save_path != None:
         gui.editor_window.uimanager.get_widget("/MenuBar/FileMenu/Save").set_sensitive(True)
 
@@ -1228,7 +1291,7 @@ def media_file_name_edited(dialog, response_id, data):
 
 def _display_file_info(media_file):
     # get info
-    clip = current_sequence().create_file_producer_clip(media_file.path, None, False, media_file.ttl)
+    clip = current_sequence().create_file_producer_clip(media_file.path, None, False, media_file.ttl, False) # Info is read from producer, not a shared producer cut.
     info = utils.get_file_producer_info(clip)
 
     width = info["width"]
@@ -1478,6 +1541,11 @@ def _do_create_sequence_compound_clip_from_selected(dialog, response_id, name_en
     (model, rows) = selection.get_selected_rows()
     row = max(rows[0])
     selected_sequence = PROJECT().sequences[row]
+    try:
+        persistance.build_sequence_mlt(selected_sequence)
+    except persistance.FileProducerNotFoundError as e:
+        show_sequence_media_missing_dialog(e)
+        return
 
     render_player = renderconsumer.XMLRenderPlayer( write_file, _sequence_xml_compound_render_done_callback, 
                                                     (write_file, media_name), selected_sequence, 
@@ -1714,6 +1782,16 @@ def change_edit_sequence():
     # therefore is not saved.
     movemodes.clear_selected_clips()
     
+    # Sequences not yet edited after project load need MLT objects built first.
+    if persistance.sequence_mlt_built(PROJECT().sequences[row]) == False:
+        app.stop_autosave()
+        dialog = dialogs.build_sequence_progress_dialog()
+        dialog.set_transient_for(gui.editor_window.window)
+        dialog.set_modal(True) # Current sequence may not be edited while resync data is being built.
+        build_thread = BuildSequenceThread(dialog, row)
+        build_thread.start()
+        return
+
     app.change_current_sequence(row)
 
 def sequences_hamburger_pressed(widget, event):
@@ -1954,6 +2032,12 @@ def _combine_sequences_dialog_callback(dialog, response_id, action_select, seq_s
     seq = selectable_seqs[seq_select.get_active()]
     
     dialog.destroy()
+
+    try:
+        persistance.build_sequence_mlt(seq)
+    except persistance.FileProducerNotFoundError as e:
+        show_sequence_media_missing_dialog(e)
+        return
     
     if action == 0:
         _append_sequence(seq)
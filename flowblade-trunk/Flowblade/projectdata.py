@@ -29,9 +29,9 @@ except:
     import mlt
 import hashlib
 import os
-import shutil
+import threading
 
-from gi.repository import GdkPixbuf
+from gi.repository import GdkPixbuf, GLib
 
 import appconsts
 import editorpersistance
@@ -39,6 +39,7 @@ from editorstate import PROJECT
 import mltprofiles
 import patternproducer
 import miscdataobjects
+import projectjournal
 import respaths
 import sequence
 import userfolders
@@ -134,9 +135,11 @@ class Project:
         media_object.name = name
         media_object.ttl = ttl
 
-    def add_media_file(self, file_path, compound_clip_name=None, target_bin=None):
+    def add_media_file(self, file_path, compound_clip_name=None, target_bin=None, media_data=None):
         """
         Adds media file to project if exists and file is of right type.
+        
+        media_data is (icon_path, length, info) tuple from Thumbnailer.get_media_data() if already created.
         """
         (directory, file_name) = os.path.split(file_path)
         (name, ext) = os.path.splitext(file_name)
@@ -145,12 +148,9 @@ class Project:
         media_type = sequence.get_media_type(file_path)
 
         # Get length and icon
-        if media_type == appconsts.AUDIO:
-            icon_path = respaths.IMAGE_PATH + "audio_file.png"
-            length = thumbnailer.get_file_length(file_path)
-            info = None
-        else: # For non-audio we need write a thumbnail file and get file length while we're at it
-             (icon_path, length, info) = thumbnailer.write_image(file_path)
+        if media_data == None:
+            media_data = thumbnailer.get_media_data(file_path)
+        (icon_path, length, info) = media_data
 
         # Refuse files giving "fps_den" == 0, these have been seen in the wild.
         if media_type == appconsts.VIDEO and info["fps_den"] == 0.0: 
@@ -188,6 +188,7 @@ class Project:
         """
         global media_files_changed_since_last_save
         media_files_changed_since_last_save = True
+        projectjournal.project_changed()
         
         self.media_files[media_object.id] = media_object
         self.next_media_file_id += 1
@@ -246,6 +247,7 @@ class Project:
     def delete_media_file_from_current_bin(self, media_file):
         global media_files_changed_since_last_save
         media_files_changed_since_last_save = True
+        projectjournal.project_changed()
 
         self.c_bin.file_ids.pop(media_file.id)
 
@@ -524,6 +526,17 @@ class Thumbnailer:
     def set_context(self, profile):
         self.profile = profile
     
+    def get_media_data(self, file_path):
+        """
+        Returns (icon_path, length, info) tuple for media file.
+        Can be called from multiple threads at the same time.
+        """
+        if sequence.get_media_type(file_path) == appconsts.AUDIO:
+            icon_path = respaths.IMAGE_PATH + "audio_file.png"
+            return (icon_path, self.get_file_length(file_path), None)
+        else: # For non-audio we need write a thumbnail file and get file length while we're at it
+            return self.write_image(file_path)
+
     def write_image(self, file_path):
         """
         Writes thumbnail image from file producer
@@ -531,13 +544,6 @@ class Thumbnailer:
         # Get data
         md_str = hashlib.md5(file_path.encode('utf-8')).hexdigest()
         thumbnail_path = userfolders.get_thumbnail_dir() + md_str + ".png"
-        render_image_path = userfolders.get_cache_dir() + "thumbnail%03d.png"
-
-        # Create consumer
-        consumer = mlt.Consumer(self.profile, "avformat", 
-                                     render_image_path)
-        consumer.set("real_time", 0)
-        consumer.set("vcodec", "png")
 
         # Create one frame producer
         producer = mlt.Producer(self.profile, str(file_path))
@@ -548,15 +554,22 @@ class Thumbnailer:
         info = utils.get_file_producer_info(producer)
 
         length = producer.get_length()
-        frame = length // 2
-        producer = producer.cut(frame, frame)
-
-        # Connect and write image
-        consumer.connect(producer)
-        consumer.run()
-        
-        # consumer.run() blocks until done so the thubnailfile is now ready to be copied.
-        shutil.copyfile(userfolders.get_cache_dir() + "thumbnail001.png", thumbnail_path)
+        producer.set_speed(0)
+        producer.seek(length // 2)
+
+        # Decode middle frame into memory
+        frame = producer.get_frame()
+        frame.set("consumer_deinterlace", 1)
+        width = self.profile.width()
+        height = self.profile.height()
+        rgba = frame.get_image(mlt.mlt_image_rgba, width, height)
+
+        # Write image with unique temp file name so that thumbnails can be created in parallel.
+        pixbuf = GdkPixbuf.Pixbuf.new_from_bytes(GLib.Bytes.new(bytes(rgba)), GdkPixbuf.Colorspace.RGB,
+                                                 True, 8, width, height, width * 4)
+        write_path = thumbnail_path + "." + str(threading.get_ident()) + ".tmp"
+        pixbuf.savev(write_path, "png", [], [])
+        os.replace(write_path, thumbnail_path)
         
         return (thumbnail_path, length, info)
 
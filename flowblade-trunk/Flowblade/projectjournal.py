@@ -0,0 +1,175 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module tracks project changes since last autosave and handles autosave journal file.
+
+Autosave writes a full project snapshot only when journal is compacted. In between,
+sequences changed by edits since last autosave are appended to journal file next to
+snapshot file as delta records. Project level data like media files and bins is small
+and is included in every record. Loading snapshot replays journal records onto it.
+
+Records carry id of the snapshot they were written for, so records left over from
+an earlier snapshot are never replayed onto a newer one.
+"""
+
+import os
+import pickle
+
+JOURNAL_EXTENSION = ".journal"
+
+COMPACT_AFTER_RECORDS = 20 # Full snapshot is written after this many journal records.
+
+_changed_sequences = set() # id()s of sequences changed since last autosave.
+_project_changed = False
+_snapshot_sequences = None # id()s of project sequences when last snapshot was written, None forces full snapshot.
+_snapshot_id = None
+_journal_records = 0
+
+
+# ------------------------------------------------------- change tracking
+def sequence_changed(seq):
+    _changed_sequences.add(id(seq))
+
+def project_changed():
+    global _project_changed
+    _project_changed = True
+
+def has_changes():
+    if _project_changed == True or len(_changed_sequences) > 0:
+        return True
+    return False
+
+def reset():
+    """
+    Called when project is opened, next autosave writes full snapshot.
+    """
+    global _snapshot_sequences, _snapshot_id, _journal_records
+    _clear_changes()
+    _snapshot_sequences = None
+    _snapshot_id = None
+    _journal_records = 0
+
+def _clear_changes():
+    global _project_changed
+    _changed_sequences.clear()
+    _project_changed = False
+
+
+# ------------------------------------------------------- autosave
+def full_save_needed(project):
+    # Journal records address sequences by index, so adding, deleting or
+    # moving sequences requires full snapshot.
+    if _snapshot_sequences != _get_sequence_ids(project):
+        return True
+    if _journal_records >= COMPACT_AFTER_RECORDS:
+        return True
+    return False
+
+def get_changed_sequence_indexes(project):
+    # Current sequence is always included because some edits, e.g. clip
+    # filter parameter edits in some editors, are not tracked.
+    changed = []
+    for i in range(0, len(project.sequences)):
+        seq = project.sequences[i]
+        if id(seq) in _changed_sequences or seq == project.c_seq:
+            changed.append(i)
+    return changed
+
+def create_snapshot_id():
+    return os.urandom(8).hex()
+
+def snapshot_saved(project, snapshot_id):
+    global _snapshot_sequences, _snapshot_id, _journal_records
+    _clear_changes()
+    _snapshot_sequences = _get_sequence_ids(project)
+    _snapshot_id = snapshot_id
+    _journal_records = 0
+
+def save_failed():
+    """
+    Called when autosave write fails, next autosave writes full snapshot.
+    """
+    global _snapshot_sequences
+    _snapshot_sequences = None
+    project_changed()
+
+def record_saved():
+    global _journal_records
+    _clear_changes()
+    _journal_records += 1
+
+def get_snapshot_id():
+    return _snapshot_id
+
+def _get_sequence_ids(project):
+    return [id(seq) for seq in project.sequences]
+
+
+# ------------------------------------------------------- journal file
+def get_journal_path(snapshot_path):
+    return snapshot_path + JOURNAL_EXTENSION
+
+def is_journal_file(file_path):
+    return file_path.endswith(JOURNAL_EXTENSION)
+
+def append_record(snapshot_path, record_data):
+    # record_data is pickled record. Partially written last record after a crash is skipped when replaying.
+    with open(get_journal_path(snapshot_path), "ab") as journal_file:
+        journal_file.write(record_data)
+        journal_file.flush()
+        os.fsync(journal_file.fileno())
+
+def delete_journal(snapshot_path):
+    try:
+        os.remove(get_journal_path(snapshot_path))
+    except FileNotFoundError:
+        pass
+
+def replay_journal(project, snapshot_path):
+    """
+    Applies journal records written for snapshot onto unpickled snapshot project.
+    """
+    snapshot_id = getattr(project, "journal_snapshot_id", None)
+    journal_path = get_journal_path(snapshot_path)
+    if snapshot_id == None or not os.path.isfile(journal_path):
+        return project
+
+    records_count = 0
+    with open(journal_path, "rb") as journal_file:
+        while True:
+            try:
+                s_record = pickle.load(journal_file)
+            except (EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+                break # End of file or partially written record.
+
+            if getattr(s_record, "journal_snapshot_id", None) != snapshot_id:
+                continue
+
+            for attr_name, value in s_record.__dict__.items():
+                if attr_name != "sequences":
+                    setattr(project, attr_name, value)
+            for i in range(0, len(s_record.sequences)):
+                if s_record.sequences[i] != None:
+                    project.sequences[i] = s_record.sequences[i]
+            records_count += 1
+
+    print("Replayed autosave journal records:", records_count)
+    return project
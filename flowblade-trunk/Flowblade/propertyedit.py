@@ -36,6 +36,7 @@ from editorstate import current_sequence
 import gui
 import mlttransitions
 import mltfilters
+import projectjournal
 import propertyparse
 import utils
 
@@ -409,6 +410,7 @@ class EditableProperty(AbstractProperty):
         filter_object = self._get_filter_object()
         prop = (str(self.name), str(str_value), self.type)
         filter_object.properties[self.property_index] = prop
+        projectjournal.sequence_changed(current_sequence())
 
 
 class TransitionEditableProperty(AbstractProperty):
@@ -448,6 +450,7 @@ class TransitionEditableProperty(AbstractProperty):
         # Persistent python object
         prop = (str(self.name), str(str_value), self.type)
         self.transition.properties[self.property_index] = prop
+        projectjournal.sequence_changed(current_sequence())
 
 
 class NonMltEditableProperty(AbstractProperty):
@@ -483,6 +486,7 @@ class NonMltEditableProperty(AbstractProperty):
         prop = (str(self.name), str(str_value), self.type)
         filter_object.non_mlt_properties[self.non_mlt_property_index] = prop
         self.value = str_value
+        projectjournal.sequence_changed(current_sequence())
 
     def get_float_value(self):
         return float(self.value)
@@ -517,6 +517,17 @@ def get_producer_as_tractor(producer, last_frame):
     multitrack.connect(track0, 0)
     track0.insert(producer, 0, 0, last_frame)
     return tractor
+
+def get_rawvideo_pipe_producer(profile, pipe_path, width, height, pixel_format, length):
+    # Producer reads raw frames of given size and pixel format from named pipe written by another thread or process.
+    # Creating producer blocks until pipe has been opened for writing and first frame is available.
+    frame_rate = str(profile.frame_rate_num()) + "/" + str(profile.frame_rate_den())
+    resource = "rawvideo:" + pipe_path + "?video_size=" + str(width) + "x" + str(height) \
+                + "&pixel_format=" + pixel_format + "&framerate=" + frame_rate
+    producer = mlt.Producer(profile, str(resource))
+    producer.set("length", length)
+    producer.set_in_and_out(0, length - 1)
+    return producer
             
 
 class FileRenderPlayer(threading.Thread):
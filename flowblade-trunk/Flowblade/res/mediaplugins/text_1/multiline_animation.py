@@ -502,6 +502,10 @@ class LineText:
 
         self._apply_fade(fctx)
 
+        # Animation data does not change after this, compute values for all frames once.
+        self.affine.create_values_tables(fctx.get_length())
+        self.opacity.create_values_table(fctx.get_length())
+
     def _compute_line_position(self, fctx, multiline_animation):
         # Apply line y-offset, alignment and centering.
         # Compute line x position for user selected alignment.
@@ -35,10 +35,14 @@ from editorstate import current_sequence
 # Maps clip -> track
 sync_children = {}
 
+# Child clips added or with changed sync data since last sync states calculation.
+_changed_children = set()
+
 # ----------------------------------------- sync display updating
 def clip_added_to_timeline(clip, track):
     if clip.sync_data != None:
         sync_children[clip] = track
+        _changed_children.add(clip)
 
 def clip_removed_from_timeline(clip):
     try:
@@ -57,24 +61,34 @@ def clip_sync_cleared(clip):
 def sequence_changed(new_sequence):
     global sync_children
     sync_children = {}
+    _changed_children.clear()
     for track in new_sequence.tracks:
         for clip in track.clips:
             clip_added_to_timeline(clip, track)
     calculate_and_set_child_clip_sync_states()
 
-def calculate_and_set_child_clip_sync_states():
+def calculate_and_set_child_clip_sync_states(changed_tracks=None):
+    # changed_tracks maps track id -> earliest clip index changed by edit. When given, only
+    # children with child or parent clip at or after earliest changed index are recalculated,
+    # clip start frames before that index on a track did not change.
     parent_track = current_sequence().first_video_track()
     for child_clip, track in sync_children.items():
-        child_index = track.clips.index(child_clip)
-        child_clip_start = track.clip_start(child_index) - child_clip.clip_in
+        child_index = track.sequence.get_clip_position(track, child_clip)
 
         parent_clip = child_clip.sync_data.master_clip
         try:
-            parent_index = parent_track.clips.index(parent_clip)
+            parent_index = parent_track.sequence.get_clip_position(parent_track, parent_clip)
         except:
             child_clip.sync_data.sync_state = appconsts.SYNC_PARENT_GONE
             continue
-        parent_clip_start = parent_track.clip_start(parent_index) - parent_clip.clip_in
+
+        if changed_tracks != None and not(child_clip in _changed_children):
+            if (child_index < changed_tracks.get(track.id, child_index + 1) 
+                and parent_index < changed_tracks.get(parent_track.id, parent_index + 1)):
+                continue
+
+        child_clip_start = track.sequence.get_clip_start(track, child_index) - child_clip.clip_in
+        parent_clip_start = parent_track.sequence.get_clip_start(parent_track, parent_index) - parent_clip.clip_in
 
         pos_offset = child_clip_start - parent_clip_start
         if pos_offset == child_clip.sync_data.pos_offset:
@@ -84,6 +98,8 @@ def calculate_and_set_child_clip_sync_states():
         
         child_clip.sync_diff = pos_offset - child_clip.sync_data.pos_offset
 
+    _changed_children.clear()
+
 def get_resync_data_list_for_clip_list(clips_list):
     # Input is list of (clip, track) tuples
     # Returns list of tuples with data needed to do resync.
@@ -92,17 +108,17 @@ def get_resync_data_list_for_clip_list(clips_list):
     parent_track = current_sequence().first_video_track()
     for clip_track_tuple in clips_list:
         child_clip, track = clip_track_tuple
-        child_index = track.clips.index(child_clip)
-        child_clip_pos_on_tline = track.clip_start(child_index)
+        child_index = track.sequence.get_clip_position(track, child_clip)
+        child_clip_pos_on_tline = track.sequence.get_clip_start(track, child_index)
         child_clip_start = child_clip_pos_on_tline - child_clip.clip_in
 
         parent_clip = child_clip.sync_data.master_clip
         try:
-            parent_index = parent_track.clips.index(parent_clip)
+            parent_index = parent_track.sequence.get_clip_position(parent_track, parent_clip)
         except:
             # Parent clip no longer awailable
             continue
-        parent_clip_start = parent_track.clip_start(parent_index) - parent_clip.clip_in
+        parent_clip_start = parent_track.sequence.get_clip_start(parent_track, parent_index) - parent_clip.clip_in
 
         pos_offset = child_clip_start - parent_clip_start
 
@@ -26,6 +26,7 @@ try:
     import mlt7 as mlt
 except:
     import mlt
+import bisect
 import os
 
 import appconsts
@@ -35,6 +36,9 @@ import mltfilters
 import mlttransitions
 import mltrefhold
 import patternproducer
+import producercache
+import projectjournal
+import tlinerender
 import tlineypage
 import utils
 
@@ -364,10 +368,12 @@ class Sequence:
     def set_track_gain(self, track, gain):
         track.gain_filter.set("gain", str(gain))
         track.audio_gain = gain
+        projectjournal.sequence_changed(self)
 
     def set_master_gain(self, gain):
         self.tractor.gain_filter.set("gain", str(gain))
         self.master_audio_gain = gain
+        projectjournal.sequence_changed(self)
 
     def add_track_pan_filter(self, track, value):
         # This method is used for master too, and is called with tractor then.
@@ -385,16 +391,19 @@ class Sequence:
         else:
             track.pan_filter.set("start", str(value))
             track.audio_pan = value
+        projectjournal.sequence_changed(self)
     
     def remove_track_pan_filter(self, track):
         # This method is used for master too, and called with tractor then
         track.detach(track.pan_filter)
         track.pan_filter = None
         track.audio_pan = NO_PAN
+        projectjournal.sequence_changed(self)
 
     def set_master_pan_value(self, value):
         self.tractor.pan_filter.set("start", str(value))
         self.master_audio_pan = value
+        projectjournal.sequence_changed(self)
 
     def first_video_track(self):
         return self.tracks[self.first_video_index]
@@ -415,14 +424,19 @@ class Sequence:
         return True
 
     # -------------------------------------------------- clips
-    def create_file_producer_clip(self, path, new_clip_name=None, novalidate=False, ttl=None):
+    def create_file_producer_clip(self, path, new_clip_name=None, novalidate=False, ttl=None, shared_producer=True):
         """
         Creates MLT Producer and adds attributes to it, but does 
         not add it to track/playlist object.
+
+        If shared_producer is True, clip is a cut of a parent producer shared
+        by all clips of same media file, see producercache.py.
         """
-        producer = mlt.Producer(self.profile, str(path)) # this runs 0.5s+ on some clips
-    
-        mltrefhold.hold_ref(producer)
+        if shared_producer == True:
+            producer = producercache.get_clip_producer(self.profile, path, ttl)
+        else:
+            producer = mlt.Producer(self.profile, str(path)) # this runs 0.5s+ on some clips
+            mltrefhold.hold_ref(producer)
         producer.path = path
         producer.filters = []
         
@@ -441,10 +455,11 @@ class Sequence:
         
         # Img seq ttl value
         producer.ttl = ttl
-        if ttl != None:
+        if ttl != None and shared_producer == False:
             producer.set("ttl", str(ttl))
 
-        producer.set("mute_on_pause", str(1))
+        if shared_producer == False:
+            producer.set("mute_on_pause", str(1))
 
         return producer
 
@@ -564,14 +579,133 @@ class Sequence:
         if test_clip == None:
             return False
 
-        for i in range(1, len(self.tracks)):
-            track = self.tracks[i]
-            for clip in track.clips:
-                if clip == test_clip:
-                    return True
+        try:
+            track, clip = self._get_clip_ids()[test_clip.id]
+            if clip == test_clip:
+                return True
+        except KeyError:
+            pass
+
+        for clip in self.tracks[-1].clips:
+            if clip == test_clip:
+                return True
         
         return False
 
+    # ------------------------------------------ clip lookup indexes
+    # Clips on editable tracks are indexed by id, and clip positions are cached per track.
+    # edit.py track primitives keep indexes up to date, black and hidden tracks are not indexed.
+    def clip_added(self, track, clip):
+        if self._clip_indexes_built() == False or self._track_is_indexed(track) == False:
+            return
+        self.clip_ids[clip.id] = (track, clip)
+        self._track_clips_changed(track)
+
+    def clip_removed(self, track, clip):
+        if self._clip_indexes_built() == False or self._track_is_indexed(track) == False:
+            return
+        try:
+            index_track, index_clip = self.clip_ids[clip.id]
+            if index_clip == clip:
+                del self.clip_ids[clip.id]
+        except KeyError:
+            pass
+        self._track_clips_changed(track)
+
+    def invalidate_clip_indexes(self):
+        # Called when track clips lists are changed without using edit.py primitives.
+        self.clip_ids = None
+        self.clip_positions = None
+        self.clip_starts = None
+        self.cut_frames = None
+
+    def get_clip_position(self, track, clip):
+        """
+        Returns index of clip in track, raises ValueError if clip not on track like list.index().
+        """
+        if self._track_is_indexed(track) == False:
+            return track.clips.index(clip)
+
+        self._get_clip_ids()
+        try:
+            positions = self.clip_positions[track.id]
+        except KeyError:
+            positions = {}
+            for i in range(0, len(track.clips)):
+                positions[id(track.clips[i])] = i
+            self.clip_positions[track.id] = positions
+
+        try:
+            return positions[id(clip)]
+        except KeyError:
+            raise ValueError("clip not on track")
+
+    def get_clip_start(self, track, index):
+        """
+        Returns same value as MLT track.clip_start(index) using cached clip start frames.
+        """
+        if self._track_is_indexed(track) == False:
+            return track.clip_start(index)
+
+        return self._get_track_cut_frames(track)[index]
+
+    def _get_track_cut_frames(self, track):
+        # Returns sorted clip start frames on track with track end frame as last item.
+        if self._track_is_indexed(track) == False:
+            return self._create_track_cut_frames(track)
+
+        self._get_clip_ids()
+        try:
+            return self.clip_starts[track.id]
+        except KeyError:
+            cuts = self._create_track_cut_frames(track)
+            self.clip_starts[track.id] = cuts
+            return cuts
+
+    def _create_track_cut_frames(self, track):
+        cuts = []
+        start = 0
+        for clip in track.clips:
+            cuts.append(start)
+            start += clip.clip_out - clip.clip_in + 1 # +1 out inclusive
+        cuts.append(start)
+        return cuts
+
+    def _get_cut_frames(self):
+        # Returns sorted cut frames of all editable tracks, tracks with clips have cut at 0 and at track end.
+        self._get_clip_ids()
+        if self.cut_frames == None:
+            cuts = set()
+            for i in range(1, len(self.tracks) - 1):
+                track = self.tracks[i]
+                if len(track.clips) > 0:
+                    cuts.update(self._get_track_cut_frames(track))
+            self.cut_frames = sorted(cuts)
+        return self.cut_frames
+
+    def _track_clips_changed(self, track):
+        self.clip_positions.pop(track.id, None)
+        self.clip_starts.pop(track.id, None)
+        self.cut_frames = None
+
+    def _get_clip_ids(self):
+        if self._clip_indexes_built() == False:
+            self.clip_ids = {}
+            self.clip_positions = {}
+            self.clip_starts = {}
+            self.cut_frames = None
+            for i in range(1, len(self.tracks) - 1):
+                track = self.tracks[i]
+                for clip in track.clips:
+                    self.clip_ids[clip.id] = (track, clip)
+        return self.clip_ids
+
+    def _clip_indexes_built(self):
+        return getattr(self, "clip_ids", None) != None
+
+    def _track_is_indexed(self, track):
+        return track.id > 0 and track.id < len(self.tracks) - 1 and self.tracks[track.id] == track
+
     # ------------------------------------------ blanks
     def create_and_insert_blank(self, track, index, length):
         """
@@ -678,7 +812,73 @@ class Sequence:
         compositor.transition.set_tracks(old_compositor.transition.a_track + track_delta, old_compositor.transition.b_track + track_delta)
         self._plant_compositor(compositor)
         return compositor
-        
+
+    def create_render_clone_tractor(self):
+        """
+        Creates tractor with clones of all tracks except hidden track, clips,
+        compositors and audio settings. Used to write sequence MLT XML without
+        disconnecting the tractor from the player.
+        """
+        tractor = mlt.Tractor()
+        multitrack = tractor.multitrack()
+        field = tractor.field()
+        tractor.clips = []
+        tractor.compositors = []
+
+        for track in self.tracks[0:-1]:
+            clone_track = mlt.Playlist()
+            multitrack.connect(clone_track, track.id)
+            for clip in track.clips:
+                if clip.is_blanck_clip == True:
+                    clone_track.blank(clip.clip_out - clip.clip_in)
+                    continue
+                clone_clip = self.create_clone_clip(clip)
+                self.clone_mute_state(clip, clone_clip)
+                clone_track.append(clone_clip, clone_clip.clip_in, clone_clip.clip_out)
+                tractor.clips.append(clone_clip)
+            clone_track.set("hide", int(track.get("hide")))
+
+            if track.id > AUDIO_MIX_DOWN_TRACK:
+                transition = mlt.Transition(self.profile, "mix")
+                mltrefhold.hold_ref(transition)
+                transition.set("a_track", int(AUDIO_MIX_DOWN_TRACK))
+                transition.set("b_track", track.id)
+                transition.set("always_active", 1)
+                transition.set("combine", 1)
+                field.plant_transition(transition, int(AUDIO_MIX_DOWN_TRACK), track.id)
+
+                gain_filter = mlt.Filter(self.profile, "volume")
+                mltrefhold.hold_ref(gain_filter)
+                if hasattr(track, "gain_filter"):
+                    gain_filter.set("gain", track.gain_filter.get("gain"))
+                else:
+                    gain_filter.set("gain", str(track.audio_gain))
+                clone_track.attach(gain_filter)
+                if track.audio_pan != NO_PAN:
+                    self.add_track_pan_filter(clone_track, track.audio_pan)
+
+        for old_compositor in self.compositors:
+            compositor = self.create_compositor(old_compositor.type_id)
+            compositor.clone_properties(old_compositor)
+            compositor.set_in_and_out(old_compositor.clip_in, old_compositor.clip_out)
+            compositor.transition.set_tracks(old_compositor.transition.a_track, old_compositor.transition.b_track)
+            if self.compositing_mode == appconsts.COMPOSITING_MODE_STANDARD_FULL_TRACK:
+                compositor.transition.mlt_transition.set("always_active", str(1))
+                compositor.transition.mlt_transition.set("disable", str(0))
+            field.plant_transition(compositor.transition.mlt_transition,
+                                   int(compositor.transition.a_track),
+                                   int(compositor.transition.b_track))
+            tractor.compositors.append(compositor)
+
+        gain_filter = mlt.Filter(self.profile, "volume")
+        mltrefhold.hold_ref(gain_filter)
+        gain_filter.set("gain", str(self.master_audio_gain))
+        tractor.attach(gain_filter)
+        if self.master_audio_pan != NO_PAN:
+            self.add_track_pan_filter(tractor, self.master_audio_pan)
+
+        return tractor
+
     def get_compositors(self):
         return self.compositors
 
@@ -763,11 +963,15 @@ class Sequence:
         pattern_producer_data is MediaFile or AbstractPatternProduer object
         """
         track = self.tracks[-1] # Always last track
+        # Rendered timeline segments are removed so that monitor clip starts at frame 0,
+        # clear_hidden_track() puts them back when timeline is displayed again.
+        track.clear()
+        track.clips = []
         if pattern_producer_data == None:
-            self.monitor_clip = self.create_file_producer_clip(path, None, False, ttl)
+            self.monitor_clip = self.create_file_producer_clip(path, None, False, ttl, False)
         else:
             if pattern_producer_data.type == IMAGE_SEQUENCE:
-                self.monitor_clip = self.create_file_producer_clip(pattern_producer_data.path, None, False, ttl)
+                self.monitor_clip = self.create_file_producer_clip(pattern_producer_data.path, None, False, ttl, False)
             else:
                 self.monitor_clip = self.create_pattern_producer(pattern_producer_data)
         
@@ -789,7 +993,7 @@ class Sequence:
         if path != None:
             clip = editorstate.get_cached_trim_clip(path)
             if clip == None:
-                clip = self.create_file_producer_clip(path, None, True, ttl)
+                clip = self.create_file_producer_clip(path, None, True, ttl, False)
                 editorstate.add_cached_trim_clip(clip)
     
             if clip_start_pos > 0:
@@ -830,22 +1034,10 @@ class Sequence:
     def clear_hidden_track(self):
         """
         Last track is hidden track used to display clips and trim edits.
-        Here that track is cleared of any content.
+        Here that track is cleared of any content other than rendered timeline segments.
         """
         self.update_edit_tracks_length()
-
-        # Empty timeline needs blank clip of len atleast 1 because  
-        # edit_insert_blank() always needs a clip to add attributes to 
-        # and that method is fundamendal and cannot be changed. 
-        seq_len = self.seq_len
-        if seq_len < 1:
-            seq_len = 1
-        
-        self.tracks[-1].clips = []
-        self.tracks[-1].clear()
-
-        edit._insert_blank(self.tracks[-1], 0, seq_len) # TRIM INIT CRASH HACK. This being empty crashes a lot, so far unexplained.
-        
+        self.display_rendered_segments()
         self._unmute_editable()
 
     def update_edit_tracks_length(self):
@@ -856,15 +1048,41 @@ class Sequence:
             if track_len > self.seq_len:
                 self.seq_len = track_len
 
+    def optimise_shared_producers(self):
+        # Clips sharing parent producer that overlap in time get parent clones from MLT,
+        # otherwise parent would seek between clip positions for every frame.
+        self.tractor.optimise()
+
     def update_hidden_track_for_timeline_rendering(self):
         # Needed for timeline render updates
-        self.tracks[-1].clips = []
-        self.tracks[-1].clear()
+        tlinerender.update_segments(self)
+        self.display_rendered_segments()
 
+    def display_rendered_segments(self):
+        """
+        Fills hidden track with rendered timeline segments and blanks between them.
+        """
+        # Empty timeline needs blank clip of len atleast 1 because  
+        # edit_insert_blank() always needs a clip to add attributes to 
+        # and that method is fundamendal and cannot be changed. 
         seq_len = self.seq_len
         if seq_len < 1:
             seq_len = 1
 
+        track = self.tracks[-1]
+        track.clips = []
+        track.clear()
+
+        pos = 0
+        for start, end, clip in tlinerender.get_rendered_segments_data(self):
+            if start > pos:
+                edit._insert_blank(track, len(track.clips), start - pos)
+            edit._insert_clip(track, clip, len(track.clips), 0, end - start - 1)
+            pos = end
+
+        if pos < seq_len:
+            edit._insert_blank(track, len(track.clips), seq_len - pos) # TRIM INIT CRASH HACK. This being empty crashes a lot, so far unexplained.
+
     def fix_v1_for_render(self): 
         # This is a workaround to fix Issue #941 with H248 encoder not being able to handle 
         # blanks and crashing or losing working audio. Underlying reason still 
@@ -876,6 +1094,7 @@ class Sequence:
                 continue
             track_v1.remove(i)
             track_v1.clips.pop(i)
+            self.invalidate_clip_indexes()
             length = clip.clip_out - clip.clip_in + 1
             white_clip = self._create_white_clip(length)
             edit._insert_clip(track_v1, white_clip, i, white_clip.clip_in, white_clip.clip_out)
@@ -994,29 +1213,12 @@ class Sequence:
         """
         Returns frame of next cut in active tracks relative to timeline.
         """
-        cut_frame = -1
-        for i in range(1, len(self.tracks) - 1):
-            track = self.tracks[i]
-            
-            # Get index and clip
-            index = track.get_clip_index_at(tline_frame)
-            try:
-                clip = track.clips[index]            
-            except Exception:
-                continue # Frame after last clip in track
-            
-            # Get next cut frame
-            clip_start_in_tline = track.clip_start(index)
-            length = clip.clip_out - clip.clip_in 
-            next_cut_frame = clip_start_in_tline + length + 1 # +1 clip out inclusive
- 
-            # Set cut frame
-            if cut_frame == -1:
-                cut_frame = next_cut_frame
-            elif next_cut_frame < cut_frame:
-                cut_frame = next_cut_frame
-                
-        return cut_frame
+        cuts = self._get_cut_frames()
+        index = bisect.bisect_right(cuts, tline_frame)
+        if index == len(cuts):
+            return -1 # Frame after last clip in all tracks
+
+        return cuts[index]
 
     def find_prev_cut_frame(self, tline_frame):
         """
@@ -1025,37 +1227,12 @@ class Sequence:
         if tline_frame == 0:
             return 0 # Rest of method fails for this special case
         
-        cut_frame = -1
-        for i in range(1, len(self.tracks) - 1):
-            track = self.tracks[i]
-            
-            # Get index and clip start
-            index = track.get_clip_index_at(tline_frame)
-            clip_start_frame = track.clip_start(index)
-            
-            # If we are on cut, we want previous cut
-            if clip_start_frame == tline_frame:
-                index = index - 1
-            
-            # Get prev cut frame
-            try:
-                clip = track.clips[index]
-                prev_cut_frame = track.clip_start(index)
-            except Exception:
-                try:
-                    if index == len(track.clips):
-                        clip = track.clips[index - 1]
-                        prev_cut_frame = track.clip_start(index)
-                except Exception:
-                    continue
-            
-            # Set cut frame
-            if cut_frame == -1:
-                cut_frame = prev_cut_frame
-            elif prev_cut_frame > cut_frame:
-                cut_frame = prev_cut_frame
-            
-        return cut_frame
+        cuts = self._get_cut_frames()
+        index = bisect.bisect_left(cuts, tline_frame) - 1
+        if index < 0:
+            return -1
+
+        return cuts[index]
 
     def find_next_editable_clip_and_track(self, tline_frame):
         """
@@ -1066,34 +1243,23 @@ class Sequence:
         select_clip = None
         for i in range(1, len(self.tracks) - 1):
             track = self.tracks[i]
+            cuts = self._get_track_cut_frames(track)
             
-            # Get index and clip
-            index = track.get_clip_index_at(tline_frame)
-            try:
-                clip = track.clips[index]
-                clip_start_in_tline = track.clip_start(index)
-                # We are looking for media clips only and after tline_frame.
-                while clip.is_blanck_clip == True or clip_start_in_tline < tline_frame:
-                    clip = track.clips[index + 1]
-                    clip_start_in_tline = track.clip_start(index + 1)
-                    index = index + 1
-            except Exception as e:
+            # We are looking for media clips only and starting at or after tline_frame.
+            index = bisect.bisect_left(cuts, tline_frame, 0, len(track.clips))
+            while index < len(track.clips) and track.clips[index].is_blanck_clip == True:
+                index = index + 1
+            if index == len(track.clips):
                 continue # No selectable clip on track after frame
 
             # Get next cut frame
-            clip_start_in_tline = track.clip_start(index)
-            length = clip.clip_out - clip.clip_in 
-            next_cut_frame = clip_start_in_tline + length + 1 # +1 clip out inclusive
-                     
+            next_cut_frame = cuts[index + 1]
+
             # Set cut frame
-            if cut_frame == -1 and next_cut_frame > tline_frame:
-                cut_frame = next_cut_frame
-                clip_track = track
-                select_clip = clip
-            elif next_cut_frame < cut_frame and next_cut_frame > tline_frame:
+            if cut_frame == -1 or next_cut_frame < cut_frame:
                 cut_frame = next_cut_frame
                 clip_track = track
-                select_clip = clip
+                select_clip = track.clips[index]
 
         return (select_clip, clip_track)
 
@@ -1106,54 +1272,59 @@ class Sequence:
         select_clip = None
         for i in range(1, len(self.tracks) - 1):
             track = self.tracks[i]
-            
-            # Get index and clip
-            index = track.get_clip_index_at(tline_frame)
-            try:
-                clip = track.clips[index]
-                clip_start_in_tline = track.clip_start(index)
-                # We are looking for media clips only and before tline_frame.
-                while clip.is_blanck_clip == True or clip_start_in_tline > tline_frame:
-                    clip = track.clips[index - 1]
-                    clip_start_in_tline = track.clip_start(index - 1)
-                    index = index - 1
-            except Exception as e:
+            cuts = self._get_track_cut_frames(track)
+            if tline_frame >= cuts[-1]:
+                continue # Frame after last clip in track
+
+            # We are looking for media clips only and before tline_frame.
+            index = bisect.bisect_right(cuts, tline_frame) - 1
+            while index >= 0 and track.clips[index].is_blanck_clip == True:
+                index = index - 1
+            if index < 0:
                 continue # No selectable clip on track before frame
 
             # Get prev cut frame
-            prev_cut_frame = clip_start_in_tline
+            prev_cut_frame = cuts[index]
                      
             # Set cut frame
-            if cut_frame == -1 and prev_cut_frame < tline_frame:
-                cut_frame = prev_cut_frame
-                clip_track = track
-                select_clip = clip
-            elif prev_cut_frame > cut_frame and prev_cut_frame < tline_frame:
+            if prev_cut_frame < tline_frame and (cut_frame == -1 or prev_cut_frame > cut_frame):
                 cut_frame = prev_cut_frame
                 clip_track = track
-                select_clip = clip
+                select_clip = track.clips[index]
 
         return (select_clip, clip_track)
 
     def get_closest_cut_frame(self, track_id, frame):
+        """
+        Returns closest start or end frame of clip at frame on track, or -1 if no clip at frame.
+        """
         track = self.tracks[track_id]
-        index = track.get_clip_index_at(frame)
-        try:
-            clip = track.clips[index]            
-        except Exception:
+        cuts = self._get_track_cut_frames(track)
+        index = max(bisect.bisect_right(cuts, frame) - 1, 0)
+        if index >= len(track.clips):
             return -1
             
-        start_frame = track.clip_start(index)
-        start_dist = frame - start_frame
-        end_frame = start_frame + (clip.clip_out - clip.clip_in + 1) # frames are inclusive
-        end_dist = end_frame - frame
-        
-        if start_dist < end_dist:
+        start_frame = cuts[index]
+        end_frame = cuts[index + 1]
+        if frame - start_frame < end_frame - frame:
             return start_frame
         else:
-            return end_frame
-        
-        return start_frame # equal distance
+            return end_frame # equal distance returns end frame
+
+    def get_closest_cut_frame_in_all_tracks(self, frame):
+        """
+        Returns closest cut frame on any editable track, or -1 if tracks have no clips.
+        """
+        cuts = self._get_cut_frames()
+        if len(cuts) == 0:
+            return -1
+
+        index = bisect.bisect_left(cuts, frame)
+        if index == len(cuts):
+            return cuts[-1]
+        if index == 0 or cuts[index] - frame <= frame - cuts[index - 1]:
+            return cuts[index]
+        return cuts[index - 1]
 
     def get_first_active_track(self):
         """
@@ -1179,24 +1350,33 @@ class Sequence:
         """
         Returns index or -1 if frame not on a clip
         """
-        index = track.get_clip_index_at(frame)
-        try:
-            clip = track.clips[index]
-        except Exception:
+        if self._track_is_indexed(track) == False:
+            index = track.get_clip_index_at(frame)
+            try:
+                clip = track.clips[index]
+            except Exception:
+                return -1
+            return index
+
+        index = max(bisect.bisect_right(self._get_track_cut_frames(track), frame) - 1, 0)
+        if index >= len(track.clips):
             return -1
-        
+
         return index
 
     def get_clip_for_id(self, clip_id):
         """
         Returns clip or None if not found.
         """
-        for i in range(1, len(self.tracks)):
-            track = self.tracks[i]
-            for j in range(0, len(track.clips)):
-                clip = track.clips[j]
-                if clip.id == clip_id:
-                    return clip
+        try:
+            track, clip = self._get_clip_ids()[clip_id]
+            return clip
+        except KeyError:
+            pass
+
+        for clip in self.tracks[-1].clips:
+            if clip.id == clip_id:
+                return clip
 
         return None
 
@@ -1204,18 +1384,24 @@ class Sequence:
         """
         Returns clip or None if not found.
         """
-        for i in range(1, len(self.tracks)):
-            track = self.tracks[i]
-            for j in range(0, len(track.clips)):
-                clip = track.clips[j]
-                if clip.id == clip_id:
-                    return (track, j)
+        try:
+            track, clip = self._get_clip_ids()[clip_id]
+            return (track, self.get_clip_position(track, clip))
+        except KeyError:
+            pass
+
+        track = self.tracks[-1]
+        for j in range(0, len(track.clips)):
+            clip = track.clips[j]
+            if clip.id == clip_id:
+                return (track, j)
 
         return (None, None)
         
     def set_track_mute_state(self, track_index, mute_state):
         track = self.tracks[track_index]
         track.mute_state = mute_state
+        projectjournal.sequence_changed(self)
     
         # Some older projects might get here without a track gain filter existing
         if not hasattr(track, "gain_filter"):
@@ -110,6 +110,9 @@ def _get_track_snapped_x(track, x, frame, frame_x):
         return -1
 
     closest_cut_frame = current_sequence().get_closest_cut_frame(track.id, frame)
+    return _get_cut_snapped_x(closest_cut_frame, x, frame_x)
+
+def _get_cut_snapped_x(closest_cut_frame, x, frame_x):
     if closest_cut_frame == -1:
         return -1
     
@@ -155,15 +158,8 @@ def _playhead_snap(mouse_x, snapping_feature_x):
         
      
 def _all_tracks_snap(track, x, frame, frame_x):
-    snapped_x = -1
-    
-    for i in range(1, len(current_sequence().tracks) - 1):
-        track = current_sequence().tracks[i]
-        snapped_x = _get_track_snapped_x(track, x, frame, frame_x)
-        if snapped_x != -1:
-            return snapped_x
-
-    return snapped_x
+    closest_cut_frame = current_sequence().get_closest_cut_frame_in_all_tracks(frame)
+    return _get_cut_snapped_x(closest_cut_frame, x, frame_x)
     
 def return_snapped_x_or_x(snapped_x, x):
     # Return either original or snapped x
@@ -63,6 +63,7 @@ import movemodes
 import multimovemode
 import mlttransitions
 import projectaction
+import projectjournal
 import render
 import renderconsumer
 import respaths
@@ -1082,13 +1083,16 @@ def _marker_menu_item_activated(action, event, msg):
     elif msg == "delete":
         if mrk_index != -1:
             current_sequence().markers.pop(mrk_index)
+            projectjournal.sequence_changed(current_sequence())
             updater.repaint_tline()
     elif msg == "deleteall":
         current_sequence().markers = []
+        projectjournal.sequence_changed(current_sequence())
         updater.repaint_tline()
     elif msg == "rename":
         if mrk_index != -1:
             current_sequence().markers.pop(mrk_index)
+            projectjournal.sequence_changed(current_sequence())
             dialogs.marker_name_dialog(utils.get_tc_string(current_frame), _marker_add_dialog_callback, True)
     else: # seek to marker
         name, frame = current_sequence().markers[int(msg)]
@@ -1120,6 +1124,7 @@ def _do_add_marker(name, current_frame):
 
     current_sequence().markers.append((name, current_frame))
     current_sequence().markers = sorted(current_sequence().markers, key=itemgetter(1))
+    projectjournal.sequence_changed(current_sequence())
 
     updater.update_position_bar()
     updater.repaint_tline()
@@ -0,0 +1,389 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module handles timeline preview rendering.
+
+Timeline is split into fixed length segments and a hash is computed for each segment
+from clips, filters, compositors and in/out points that affect its frames. Segments
+are rendered in background to files in project data folder named by their hash,
+so an edit only invalidates the segments whose contents it changes.
+
+Rendered segments are displayed on the hidden track that covers the editable tracks
+below it, so playback uses rendered files where they are available.
+"""
+
+from gi.repository import GLib
+
+import hashlib
+try:
+    import mlt7 as mlt
+except:
+    import mlt
+import os
+import threading
+import time
+
+import appconsts
+import editorpersistance
+import editorstate
+from editorstate import PLAYER
+import projectdatavault
+import renderconsumer
+import userfolders
+
+SEGMENT_LENGTH_SECONDS = 5
+RENDER_LAUNCH_DELAY_MS = 1500 # Rendering is started after edits have stopped for this long.
+
+SEGMENTS_FOLDER = "tline_segments/"
+RENDERING_FILE_PREFIX = "rendering_"
+SEQUENCE_XML_FILE = "tline_render_sequence.xml"
+
+_segments = [] # Segment objects for current sequence in timeline order.
+_segment_clips = {} # segment hash -> clip displayed on hidden track
+_render_thread = None
+_render_launch_id = None
+
+
+# ------------------------------------------------------------- module interface
+def timeline_rendering_active():
+    if editorstate.tline_render_mode == appconsts.TLINE_RENDERING_OFF:
+        return False
+    if renderconsumer.proxy_encodings == None or len(renderconsumer.proxy_encodings) == 0:
+        return False
+    return True
+
+def clear():
+    """
+    Called when project is opened or sequence is changed.
+    """
+    global _segments, _segment_clips
+    _abort_render()
+    _segments = []
+    _segment_clips = {}
+
+def update_segments(seq):
+    """
+    Computes segment hashes after edit and launches background rendering for dirty segments.
+    """
+    global _segments
+    if not timeline_rendering_active():
+        _segments = []
+        return
+
+    old_hashes = [segment.segment_hash for segment in _segments]
+    _segments = _compute_segments(seq)
+    if old_hashes == [segment.segment_hash for segment in _segments]:
+        return # Nothing changed, possible running render is still valid.
+
+    if editorstate.tline_render_mode == appconsts.TLINE_RENDERING_AUTO and len(get_dirty_segments()) > 0:
+        _schedule_render_launch()
+
+def get_rendered_segments_data(seq):
+    """
+    Returns list of (start, end, clip) tuples for rendered segments to be displayed on hidden track.
+    """
+    if not timeline_rendering_active():
+        return []
+
+    data = []
+    for segment in _segments:
+        if segment.is_rendered() == False:
+            continue
+        clip = _get_segment_clip(seq, segment)
+        if clip != None:
+            data.append((segment.start, segment.end, clip))
+    return data
+
+def get_dirty_segments():
+    return [segment for segment in _segments if segment.is_rendered() == False]
+
+def update_timeline_rendering():
+    """
+    Called before playback is started so that no stale segments are played,
+    for example after filter parameters have been changed without an edit action.
+    """
+    if not timeline_rendering_active():
+        return
+
+    seq = editorstate.current_sequence()
+    displayed = [segment.segment_hash for segment in _segments if segment.is_rendered()]
+    update_segments(seq)
+    current = [segment.segment_hash for segment in _segments if segment.is_rendered()]
+    if displayed != current:
+        seq.display_rendered_segments()
+
+
+# ------------------------------------------------------------- segments
+class Segment:
+    def __init__(self, start, end, segment_hash):
+        self.start = start # inclusive
+        self.end = end # exclusive
+        self.segment_hash = segment_hash
+
+    def get_file_path(self):
+        return _get_segments_folder() + self.segment_hash + _get_encoding().extension
+
+    def is_rendered(self):
+        return os.path.isfile(self.get_file_path())
+
+
+def get_segment_length(seq):
+    return max(1, int(round(seq.profile.fps() * SEGMENT_LENGTH_SECONDS)))
+
+def _compute_segments(seq):
+    seg_len = get_segment_length(seq)
+    seq_len = seq.seq_len
+    segments_count = -(-seq_len // seg_len) # ceil division
+
+    # Everything that affects segment frames is fed into segment hashers.
+    hashers = []
+    for i in range(0, segments_count):
+        hasher = hashlib.md5()
+        start = i * seg_len
+        end = min(start + seg_len, seq_len)
+        hasher.update((seq.profile.description() + " " + str(end - start) + " " + str(_get_render_settings())).encode("utf-8"))
+        hasher.update((" master " + str(seq.master_audio_gain) + " " + str(seq.master_audio_pan)).encode("utf-8"))
+        hashers.append(hasher)
+
+    for i in range(1, len(seq.tracks) - 1):
+        track = seq.tracks[i]
+        track_desc = "track " + str(track.id) + " " + str(track.mute_state) + " " + str(track.audio_gain) + " " + str(track.audio_pan)
+        for hasher in hashers:
+            hasher.update(track_desc.encode("utf-8"))
+
+        pos = 0
+        for clip in track.clips:
+            length = clip.clip_out - clip.clip_in + 1
+            if clip.is_blanck_clip == False:
+                clip_desc = " " + str(track.id) + _get_clip_desc(clip)
+                _update_hashers(hashers, seg_len, pos, pos + length, clip_desc)
+            pos += length
+
+    for comp in seq.compositors:
+        _update_hashers(hashers, seg_len, comp.clip_in, comp.clip_out + 1, _get_compositor_desc(comp))
+
+    segments = []
+    for i in range(0, segments_count):
+        start = i * seg_len
+        end = min(start + seg_len, seq_len)
+        segments.append(Segment(start, end, hashers[i].hexdigest()))
+
+    return segments
+
+def _update_hashers(hashers, seg_len, start, end, desc):
+    # Items are hashed with position relative to segment start so that
+    # identical contents produce identical hashes.
+    if len(hashers) == 0 or end <= start:
+        return
+    first_seg = max(0, start // seg_len)
+    last_seg = min(len(hashers) - 1, (end - 1) // seg_len)
+    for i in range(first_seg, last_seg + 1):
+        hashers[i].update((" " + str(start - i * seg_len) + desc).encode("utf-8"))
+
+def _get_clip_desc(clip):
+    desc = " " + str(clip.path) + " " + str(clip.clip_in) + " " + str(clip.clip_out)
+    desc += " " + str(clip.get("speed")) + " " + str(clip.mute_filter != None) + " " + str(getattr(clip, "ttl", None))
+    if clip.media_type == appconsts.PATTERN_PRODUCER:
+        create_data = [(k, str(v)) for k, v in vars(clip.create_data).items()]
+        desc += " " + str(sorted(create_data))
+    for f in clip.filters:
+        desc += " " + _get_filter_desc(f)
+    return desc
+
+def _get_filter_desc(f):
+    desc = f.info.mlt_service_id + " " + str(f.active) + " " + str(f.properties) + " " + str(f.non_mlt_properties)
+    try:
+        desc += " " + str(f.value) # Multipart filters
+    except AttributeError:
+        pass
+    return desc
+
+def _get_compositor_desc(comp):
+    transition = comp.transition
+    return " comp " + transition.info.mlt_service_id + " " + str(transition.a_track) + " " + str(transition.b_track) \
+            + " " + str(comp.clip_in) + " " + str(comp.clip_out) + " " + str(transition.properties)
+
+def _get_segments_folder():
+    folder = projectdatavault.get_render_folder() + SEGMENTS_FOLDER
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    return folder
+
+def _get_encoding():
+    encodings = renderconsumer.proxy_encodings
+    enc_index = editorpersistance.prefs.tline_render_encoding
+    if enc_index >= len(encodings):
+        enc_index = 0
+    return encodings[enc_index]
+
+def _get_render_settings():
+    return (_get_encoding().name, editorpersistance.prefs.tline_render_size)
+
+def _get_render_size(profile):
+    tline_render_size = editorpersistance.prefs.tline_render_size
+    if tline_render_size == appconsts.PROXY_SIZE_FULL:
+        size_mult = 1.0
+    elif tline_render_size == appconsts.PROXY_SIZE_HALF:
+        size_mult = 0.5
+    else:
+        size_mult = 0.25
+    w = int(profile.width() * size_mult)
+    h = int(profile.height() * size_mult)
+    return (w - w % 2, h - h % 2)
+
+def _get_segment_clip(seq, segment):
+    try:
+        return _segment_clips[segment.segment_hash]
+    except KeyError:
+        pass
+
+    clip = seq.create_file_producer_clip(segment.get_file_path())
+    if clip == None:
+        return None
+    _segment_clips[segment.segment_hash] = clip
+    return clip
+
+
+# ------------------------------------------------------------- rendering
+def _schedule_render_launch():
+    global _render_launch_id
+    _abort_render()
+    if _render_launch_id != None:
+        GLib.source_remove(_render_launch_id)
+    _render_launch_id = GLib.timeout_add(RENDER_LAUNCH_DELAY_MS, _launch_render)
+
+def _launch_render():
+    global _render_launch_id, _render_thread
+    _render_launch_id = None
+
+    # Sequence can only be written out while timeline is displayed and not playing,
+    # try again later if that is not the case.
+    if editorstate.timeline_visible() == False or PLAYER().is_playing():
+        _render_launch_id = GLib.timeout_add(RENDER_LAUNCH_DELAY_MS, _launch_render)
+        return False
+
+    _remove_unused_segment_files()
+
+    dirty_segments = get_dirty_segments()
+    if len(dirty_segments) == 0:
+        return False
+
+    seq = editorstate.current_sequence()
+    xml_path = userfolders.get_cache_dir() + SEQUENCE_XML_FILE
+    _write_sequence_xml(seq, xml_path)
+
+    _render_thread = SegmentsRenderThread(xml_path, dirty_segments, seq.profile, _get_encoding(), _get_render_size(seq.profile))
+    _render_thread.start()
+    return False
+
+def _write_sequence_xml(seq, xml_path):
+    # XML is written from a clone tractor without hidden track so that rendered segments
+    # are never rendered again into new segments and player keeps running.
+    tractor = seq.create_render_clone_tractor()
+    xml_consumer = mlt.Consumer(seq.profile, "xml", str(xml_path))
+    xml_consumer.connect(tractor)
+    xml_consumer.start()
+    while xml_consumer.is_stopped() == False:
+        time.sleep(0.01)
+
+def _remove_unused_segment_files():
+    # Files for segments no longer on timeline are deleted when edits have settled.
+    # Files being rendered are removed by render thread on abort.
+    global _segment_clips
+    used_hashes = set([segment.segment_hash for segment in _segments])
+    _segment_clips = {k: v for k, v in _segment_clips.items() if k in used_hashes}
+
+    folder = _get_segments_folder()
+    for file_name in os.listdir(folder):
+        if file_name.startswith(RENDERING_FILE_PREFIX):
+            continue
+        segment_hash = os.path.splitext(file_name)[0]
+        if not (segment_hash in used_hashes):
+            try:
+                os.remove(folder + file_name)
+            except OSError:
+                pass
+
+def _abort_render():
+    global _render_thread
+    if _render_thread != None:
+        _render_thread.abort()
+        _render_thread = None
+
+def _segment_render_complete(segment):
+    # Segment is displayed only if it is still part of current timeline.
+    if not (segment.segment_hash in [s.segment_hash for s in _segments]):
+        return False
+
+    if editorstate.timeline_visible() == True and PLAYER().is_playing() == False and editorstate.current_is_move_mode():
+        editorstate.current_sequence().display_rendered_segments()
+    return False
+
+
+class SegmentsRenderThread(threading.Thread):
+
+    def __init__(self, xml_path, segments, profile, encoding, render_size):
+        threading.Thread.__init__(self)
+        self.xml_path = xml_path
+        self.segments = segments
+        self.profile = profile
+        self.encoding = encoding
+        self.render_size = render_size
+        self.aborted = False
+
+    def run(self):
+        producer = mlt.Producer(self.profile, str(self.xml_path))
+        folder = _get_segments_folder()
+
+        for segment in self.segments:
+            if self.aborted == True:
+                return
+
+            file_path = segment.get_file_path()
+            render_path = folder + RENDERING_FILE_PREFIX + os.path.basename(file_path)
+            consumer = renderconsumer.get_render_consumer_for_encoding(render_path, self.profile, self.encoding)
+            w, h = self.render_size
+            consumer.set("width", w)
+            consumer.set("height", h)
+
+            render_player = renderconsumer.FileRenderPlayer(render_path, producer, consumer, segment.start, segment.end - 1)
+            render_player.wait_for_producer_end_stop = False
+            render_player.start()
+
+            while render_player.stopped == False:
+                if self.aborted == True:
+                    render_player.shutdown()
+                    self._remove_file(render_path)
+                    return
+                time.sleep(0.1)
+
+            # Rendered file gets its final name only when complete so partial files are never displayed.
+            os.replace(render_path, file_path)
+            GLib.idle_add(_segment_render_complete, segment)
+
+    def abort(self):
+        self.aborted = True
+
+    def _remove_file(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -24,6 +24,7 @@ Global display position and scale information is in this module.
 """
 import cairo
 import math
+import numpy as np
 
 from gi.repository import Gtk
 from gi.repository import Gdk
@@ -47,6 +48,7 @@ from editorstate import current_proxy_media_paths
 import editorstate
 import gui
 import guiutils
+import memorycache
 import respaths
 import sequence
 import snapping
@@ -330,7 +332,8 @@ fake_current_frame = None
 # Used to draw indicators that tell if more frames are available while trimming.
 trim_status = appconsts.ON_BETWEEN_FRAME
 
-# Dict for clip thumbnails path -> image.
+# Dict for clip thumbnails path -> image. These are media file icons that are kept in memory
+# by media files anyway, rendered container clip thumbnails are kept in memorycache.CLIP_THUMBNAILS namespace.
 clip_thumbnails = {}
 
 
@@ -406,6 +409,7 @@ def update_clip_thumbnail(media_file):
     global clip_thumbnails
 
     clip_thumbnails[media_file.path] = media_file.icon
+    memorycache.remove(memorycache.CLIP_THUMBNAILS, media_file.path)
 
 def set_tracks_double_height_consts():
     global ID_PAD_Y_HIGH, ID_PAD_Y, ID_PAD_Y_SMALL, MUTE_ICON_POS, MUTE_ICON_POS_NORMAL, \
@@ -612,6 +616,31 @@ def _get_standard_mode_compositor_rect(scale_in, scale_length, y):
     
     return (scale_mid - side_half, y, side_half * 2, side_half * 2)
         
+def get_waveform_columns(waveform_data, draw_first, draw_last, media_start_pos_pix, pix_per_frame):
+    """
+    Returns tuple (xs, levels) of arrays for drawing waveform with at most one bar per pixel column.
+    Bar i spans from xs[i] to xs[i + 1], so xs has one more item than levels.
+    """
+    if pix_per_frame >= 1.0:
+        # One frame covers at least one pixel, bar for every frame.
+        first_frame = max(0, draw_first)
+        levels = waveform_data.get_values(first_frame, draw_last)
+        xs = media_start_pos_pix + np.arange(first_frame, first_frame + len(levels) + 1) * pix_per_frame
+        return (xs, levels)
+
+    # Many frames per pixel, use precomputed peaks and reduce them to pixel columns.
+    bucket_size = waveform_data.get_bucket_size_for_frames_per_pixel(1.0 / pix_per_frame)
+    start_frame, mins, maxs = waveform_data.get_peaks(bucket_size, draw_first, draw_last)
+    if len(maxs) == 0:
+        return (np.zeros(0), maxs)
+
+    bucket_xs = media_start_pos_pix + (start_frame + np.arange(len(maxs)) * bucket_size) * pix_per_frame
+    columns = np.floor(bucket_xs)
+    column_starts = np.flatnonzero(np.diff(columns, prepend=columns[0] - 1.0))
+    levels = np.maximum.reduceat(maxs, column_starts)
+    xs = np.append(columns[column_starts], columns[-1] + 1.0)
+    return (xs, levels)
+
 # --------------------------------------- edit mode overlay draw handling
 def set_edit_mode(data, draw_func):
     global canvas_widget
@@ -1730,8 +1759,6 @@ class TimeLineCanvas:
 
         proxy_paths = current_proxy_media_paths()
 
-        global clip_thumbnails
-                
         # Draw clips in draw range
         for i in range(start, end):
 
@@ -1898,28 +1925,31 @@ class TimeLineCanvas:
                     text_x_add = 115
                     cr.save()
                     try: # paint thumbnail
-                        thumb_img = clip_thumbnails[clip.path]
+                        thumb_img = clip_thumbnails.get(clip.path, None)
+                        if thumb_img == None:
+                            thumb_img = memorycache.get(memorycache.CLIP_THUMBNAILS, clip.path)
+                        if thumb_img == None:
+                            raise KeyError(clip.path)
                         self.create_round_rect_path(cr, scale_in + 5, y + 4.5, scale_length - 10, track_height - 8, 3.0)
                         cr.clip()
                         cr.set_source_surface(thumb_img,scale_in, y - 20)
                         cr.paint()
                     except: # thumbnail not found  in dict, get it and  paint it.
                         try:
-                            if clip.container_data == None:
-                                media_file = PROJECT().get_media_file_for_path(clip.path)
+                            media_file = PROJECT().get_media_file_for_path(clip.path)
+                            if clip.container_data == None or media_file != None:
                                 thumb_img = media_file.icon
                             else:
-                                media_file = PROJECT().get_media_file_for_path(clip.path)
-                                if media_file != None:
-                                    thumb_img = media_file.icon
-                                else:
-                                    thumb_img = clip.container_data.get_rendered_thumbnail()
+                                thumb_img = clip.container_data.get_rendered_thumbnail()
 
                             cr.rectangle(scale_in + 4, y + 3.5, scale_length - 8, track_height - 6)
                             cr.clip()
                             cr.set_source_surface(thumb_img, scale_in, y - 20)
                             cr.paint()
-                            clip_thumbnails[clip.path] = thumb_img
+                            if media_file != None:
+                                clip_thumbnails[clip.path] = thumb_img
+                            else:
+                                memorycache.put(memorycache.CLIP_THUMBNAILS, clip.path, thumb_img, memorycache.get_surface_size(thumb_img))
                         except:
                             pass # This fails for rendered fades and transitions.
                     
@@ -1935,12 +1965,14 @@ class TimeLineCanvas:
                     cr.restore()
 
             # Draw audio levels data if needed.
-            # Init data rendering if data needed and not available.
-            if clip.is_blanck_clip == False and clip.waveform_data == None and editorstate.display_all_audio_levels == True \
+            # Levels data is looked up from memory cache for every draw so that cache can release it,
+            # data rendering is initialized if data needed and not available.
+            waveform_data = None
+            if clip.is_blanck_clip == False and editorstate.display_all_audio_levels == True \
                 and clip.media_type != appconsts.IMAGE and clip.media_type != appconsts.IMAGE_SEQUENCE and clip.media_type != appconsts.PATTERN_PRODUCER:
-                clip.waveform_data = audiowaveformrenderer.get_waveform_data(clip)
+                waveform_data = audiowaveformrenderer.get_waveform_data(clip)
             # Draw data if available large enough scale
-            if clip.is_blanck_clip == False and clip.waveform_data != None and scale_length > FILL_MIN and editorstate.display_all_audio_levels == True:
+            if waveform_data != None and scale_length > FILL_MIN:
                 r, g, b = clip_bg_col
                 cr.set_source_rgb(r * 1.9, g * 1.9, b * 1.9)
                 
@@ -1960,17 +1992,6 @@ class TimeLineCanvas:
                     y_pad = WAVEFORM_PAD_SMALL
                     bar_height = WAVEFORM_HEIGHT_SMALL
                 
-                # Draw all frames only if pixels per frame > 2, otherwise.
-                # draw only every other or fewer frames.
-                draw_pix_per_frame = pix_per_frame
-                if draw_pix_per_frame < 2:
-                    draw_pix_per_frame = 2
-                    step = int(2 // pix_per_frame)
-                    if step < 1:
-                        step = 1
-                else:
-                    step = 1
-
                 # Draw only frames in display.
                 draw_first = clip_in
                 draw_last = clip_out + 1
@@ -1982,17 +2003,18 @@ class TimeLineCanvas:
                 # Get media frame 0 position in screen pixels.
                 media_start_pos_pix = scale_in - clip_in * pix_per_frame
                 
-                # Draw level bar for each frame in draw range.
-                for f in range(draw_first, draw_last, step):
-                    try:
-                        x = media_start_pos_pix + f * pix_per_frame
-                        h = bar_height * clip.waveform_data[f]
-                        if h < 1:
-                            h = 1
-                        cr.rectangle(x, y + y_pad + (bar_height - h), draw_pix_per_frame, h)
-                    except:
-                        # This is just dirty fix a when 23.98 fps does not work.
-                        break
+                # Draw levels as single polygon with at most one bar per pixel column.
+                xs, levels = get_waveform_columns(waveform_data, draw_first, draw_last, media_start_pos_pix, pix_per_frame)
+                if len(levels) > 0:
+                    bottom = y + y_pad + bar_height
+                    tops = (bottom - np.maximum(bar_height * levels, 1.0)).tolist()
+                    xs = xs.tolist()
+                    cr.move_to(xs[0], bottom)
+                    for i in range(0, len(tops)):
+                        cr.line_to(xs[i], tops[i])
+                        cr.line_to(xs[i + 1], tops[i])
+                    cr.line_to(xs[-1], bottom)
+                    cr.close_path()
 
                 cr.fill()
                 cr.restore()
@@ -2095,7 +2117,7 @@ class TimeLineCanvas:
                         cr.move_to(scale_in + TEXT_X + centering, y + track_height - 3)
                         cr.show_text(str(clip.sync_diff))
 
-            if clip.waveform_data == None and editorstate.display_all_audio_levels == True and scale_length > FILL_MIN:
+            if waveform_data == None and editorstate.display_all_audio_levels == True and scale_length > FILL_MIN:
                 if clip.media_type != appconsts.IMAGE and clip.media_type != appconsts.IMAGE_SEQUENCE and clip.media_type != appconsts.PATTERN_PRODUCER:
                     cr.set_source_surface(LEVELS_RENDER_ICON, int(scale_in) + 4, y + 8)
                     cr.paint()
@@ -35,6 +35,7 @@ except:
     import mlt
 import hashlib
 import locale
+import multiprocessing
 import os
 from os import listdir
 from os.path import isfile, join
@@ -61,6 +62,7 @@ import processutils
 import persistance
 import respaths
 import renderconsumer
+import segmentedrender
 import toolguicomponents
 import translations
 import userfolders
@@ -86,11 +88,11 @@ RENDERING = 1
 RENDERED = 2
 UNQUEUED = 3
 ABORTED = 4
+FAILED = 5
 
 render_queue = []
 _batch_render_app = None
 batch_window = None
-render_thread = None
 queue_runner_thread = None
 
 timeout_id = None
@@ -106,99 +108,172 @@ single_render_launch_thread = None
 single_render_thread = None
 
 # -------------------------------------------------------- render thread
+class RenderSlot:
+    """
+    Item being rendered in one of the concurrent render slots.
+    """
+    def __init__(self, render_item, render_thread, start_frame, end_frame):
+        self.render_item = render_item
+        self.render_thread = render_thread
+        self.length = end_frame - start_frame + 1
+
+    def get_render_fraction(self):
+        if self.render_thread.has_started_running == False:
+            return 0.0
+        return self.render_thread.get_render_fraction()
+
+
 class QueueRunnerThread(threading.Thread):
     def __init__(self):
         threading.Thread.__init__(self)
+        self.slots = [None] * get_render_slots_count()
     
     def run(self):        
         self.running = True
+        self.aborted = False
         items = 0
         global render_queue, batch_window
-        for render_item in render_queue.queue:
-            if self.running == False:
+        pending = [render_item for render_item in render_queue.queue if render_item.render_this_item == True]
+        
+        # Aggregate progress is computed from frames so that long and short items are weighted correctly. 
+        total_frames = 0
+        for render_item in pending:
+            start_frame, end_frame, wait_for_stop_render = get_render_range(render_item)
+            total_frames += end_frame - start_frame + 1
+        rendered_frames = 0
+        queue_start_time = time.time()
+
+        GLib.idle_add(self._render_slots_init_update, len(self.slots))
+
+        while self.running:
+            # Fill free slots. Items with same render target as an item being currently rendered
+            # are held back, check_for_same_paths() only warns on queued items at launch.
+            for i in range(0, len(self.slots)):
+                if self.slots[i] != None:
+                    continue
+                render_item = self._get_next_item(pending)
+                if render_item == None:
+                    break
+                pending.remove(render_item)
+                self.slots[i] = self._start_render(render_item)
+                GLib.idle_add(self._render_start_update, self._get_rendering_items())
+
+            # Release slots for completed items.
+            for i in range(0, len(self.slots)):
+                if self.aborted == True:
+                    break # shutdown() also stops render threads, so they are not completed.
+                slot = self.slots[i]
+                if slot == None or slot.render_thread.has_started_running == False:
+                    continue
+                if slot.render_thread.running == False: # Rendering has reached end
+                    slot.render_thread.shutdown()
+                    # Segmented renders set error if a render process or concat failed.
+                    if getattr(slot.render_thread, "error", None) != None:
+                        slot.render_item.render_failed()
+                    else:
+                        slot.render_item.render_completed()
+                    rendered_frames += slot.length
+                    items = items + 1
+                    self.slots[i] = None
+                    GLib.idle_add(self._render_start_update, self._get_rendering_items())
+
+            if self._get_rendering_items() == [] and len(pending) == 0:
                 break
-            if render_item.render_this_item == False:
-                continue
-            
-            current_render_time = 0
 
-            # Create render objects
-            identifier = render_item.generate_identifier()
-            project_file_path = get_projects_dir() + identifier + ".flb"
-            persistance.show_messages = False
+            # Update view
+            slots_progress = []
+            in_progress_frames = 0
+            for slot in self.slots:
+                if slot == None:
+                    slots_progress.append(None)
+                    continue
+                fraction = slot.get_render_fraction()
+                in_progress_frames += fraction * slot.length
+                slots_progress.append((slot.render_item.get_display_name(), fraction))
+
+            if total_frames > 0:
+                render_fraction = min((rendered_frames + in_progress_frames) / float(total_frames), 1.0)
+            else:
+                render_fraction = 1.0
+            current_render_time = time.time() - queue_start_time
+            names = ", ".join([render_item.get_display_name() for render_item in self._get_rendering_items()])
 
-            project = persistance.load_project(project_file_path, False)
+            GLib.idle_add(self._render_progress_update, render_fraction, items, names, current_render_time)
+            GLib.idle_add(self._render_slots_progress_update, slots_progress)
 
-            project.c_seq.fix_v1_for_render()
+            time.sleep(0.33)
 
-            maybe_create_render_folder(render_item.render_path)
+        if self.aborted == True:
+            for slot in self.slots:
+                if slot != None:
+                    slot.render_item.render_aborted()
         
-            producer = project.c_seq.tractor
-            profile = mltprofiles.get_profile(render_item.render_data.profile_name)
-            consumer = renderconsumer.get_mlt_render_consumer(render_item.render_path, 
-                                                              profile,
-                                                              render_item.args_vals_list)
+        # Update view for render end
+        GLib.idle_add(self._queue_done_update)
 
-            # Get render range
-            start_frame, end_frame, wait_for_stop_render = get_render_range(render_item)
-            
-            # Create and launch render thread
-            global render_thread 
-            render_thread = renderconsumer.FileRenderPlayer(None, producer, consumer, start_frame, end_frame) # None == file name not needed this time when using FileRenderPlayer because callsite keeps track of things
-            render_thread.wait_for_producer_end_stop = wait_for_stop_render
-            render_thread.start()
+    def _get_next_item(self, pending):
+        rendering_paths = [render_item.render_path for render_item in self._get_rendering_items()]
+        for render_item in pending:
+            if not(render_item.render_path in rendering_paths):
+                return render_item
+        return None
 
-            # Set render start time and item state
-            render_item.render_started()
+    def _get_rendering_items(self):
+        return [slot.render_item for slot in self.slots if slot != None]
 
-            GLib.idle_add(self._render_start_update, render_item)
+    def _start_render(self, render_item):
+        # Create render objects
+        identifier = render_item.generate_identifier()
+        project_file_path = get_projects_dir() + identifier + ".flb"
+        persistance.show_messages = False
 
-            # Make sure that render thread is actually running before
-            # testing render_thread.running value later
-            while render_thread.has_started_running == False:
-                time.sleep(0.05)
+        project = persistance.load_project(project_file_path, False)
 
-            # View update loop
-            self.thread_running = True
-            self.aborted = False
-            while self.thread_running:
-                if self.aborted == True:
-                    break        
-                render_fraction = render_thread.get_render_fraction()
-                now = time.time()
-                current_render_time = now - render_item.start_time
+        project.c_seq.fix_v1_for_render()
+
+        maybe_create_render_folder(render_item.render_path)
     
-                GLib.idle_add(self._render_progress_update, render_fraction, items, render_item.get_display_name(), current_render_time)
-                
-                if render_thread.running == False: # Rendering has reached end
-                    self.thread_running = False
-                    
-                    GLib.idle_add(self._progress_bar_update, 1.0)
-                                    
-                    render_item.render_completed()
-                else:
-                    time.sleep(0.33)
-                    
-            if not self.aborted:
-                items = items + 1
-                GLib.idle_add(self._render_progress_update, 0, items, render_item.get_display_name(), 0)
-            else:
-                if render_item != None:
-                    render_item.render_aborted()
-                    break
-            render_thread.shutdown()
+        producer = project.c_seq.tractor
+        profile = mltprofiles.get_profile(render_item.render_data.profile_name)
+        consumer = renderconsumer.get_mlt_render_consumer(render_item.render_path, 
+                                                          profile,
+                                                          render_item.args_vals_list)
+        if len(self.slots) > 1:
+            set_consumer_threads_budget(consumer, render_item, get_render_slot_threads(len(self.slots)))
+
+        # Get render range
+        start_frame, end_frame, wait_for_stop_render = get_render_range(render_item)
         
-        # Update view for render end
-        GLib.idle_add(self._queue_done_update)
+        # Create and launch render thread
+        if segmentedrender.segmented_render_possible(render_item, start_frame, end_frame):
+            item_file_path = get_datafiles_dir() + identifier + ".renderitem"
+            render_thread = segmentedrender.SegmentedRenderPlayer(render_item, project_file_path, item_file_path, start_frame, end_frame, wait_for_stop_render)
+        else:
+            render_thread = renderconsumer.FileRenderPlayer(None, producer, consumer, start_frame, end_frame) # None == file name not needed this time when using FileRenderPlayer because callsite keeps track of things
+            render_thread.wait_for_producer_end_stop = wait_for_stop_render
+        render_thread.start()
+
+        # Set render start time and item state
+        render_item.render_started()
+
+        return RenderSlot(render_item, render_thread, start_frame, end_frame)
+
+    def _render_slots_init_update(self, slots_count):
+        batch_window.init_slots_view(slots_count)
 
-    def _render_start_update(self, render_item):
+    def _render_start_update(self, rendering_items):
         batch_window.update_queue_view()
-        batch_window.current_render.set_text("  " + render_item.get_display_name())
-        batch_window.current_file.set_text("  " +  os.path.basename(render_item.render_path))
+        names = ", ".join([render_item.get_display_name() for render_item in rendering_items])
+        files = ", ".join([os.path.basename(render_item.render_path) for render_item in rendering_items])
+        batch_window.current_render.set_text("  " + names)
+        batch_window.current_file.set_text("  " + files)
 
     def _render_progress_update(self, render_fraction, items, display_time, current_render_time):
         batch_window.update_render_progress(render_fraction, items, display_time, current_render_time)
 
+    def _render_slots_progress_update(self, slots_progress):
+        batch_window.update_slots_progress(slots_progress)
+
     def _progress_bar_update(self, fraction):
         batch_window.render_progress_bar.set_fraction(fraction)
 
@@ -208,11 +283,12 @@ class QueueRunnerThread(threading.Thread):
         batch_window.render_queue_stopped()
         
     def abort(self):
-        render_thread.shutdown()
+        for slot in self.slots:
+            if slot != None:
+                slot.render_thread.shutdown()
         # It may be that 'aborted' and 'running' could combined into single flag, but whatevaar
         self.aborted = True
         self.running = False
-        self.thread_running = False
         
         batch_window.reload_queue() # item may have added to queue while rendering
 
@@ -576,10 +652,15 @@ class BatchRenderItemData:
         self.render_time = -1
         self.save()
 
-        global queue_runner_thread, render_thread
-        render_thread = None
+        global queue_runner_thread
         queue_runner_thread = None      
 
+    def render_failed(self):
+        self.status = FAILED
+        self.render_this_item = False
+        self.render_time = -1
+        self.save()
+
     def get_status_string(self):
         if self.status == IN_QUEUE:
             return _("Queued")
@@ -589,6 +670,8 @@ class BatchRenderItemData:
             return _("Finished")
         elif self.status == UNQUEUED:
             return _("Unqueued")
+        elif self.status == FAILED:
+            return _("Failed")
         else:
             return _("Aborted")
 
@@ -633,6 +716,25 @@ def get_render_range(render_item):
     
     return (start_frame, end_frame, wait_for_stop_render)
 
+def get_render_slots_count():
+    return max(1, editorpersistance.prefs.batch_render_slots)
+
+def get_render_slot_threads(slots_count):
+    # CPU cores are divided evenly between concurrently rendering items.
+    return max(1, multiprocessing.cpu_count() // slots_count)
+
+def set_consumer_threads_budget(consumer, render_item, threads):
+    if editorpersistance.prefs.perf_drop_frames == True:
+        consumer.set("real_time", threads)
+    else:
+        consumer.set("real_time", -threads)
+
+    # User set encoder threads value is kept.
+    for arg, val in render_item.args_vals_list:
+        if arg == "threads":
+            return
+    consumer.set("threads", str(threads))
+
 
 # -------------------------------------------------------------------- gui
 class BatchRenderWindow:
@@ -676,6 +778,11 @@ class BatchRenderWindow:
         self.render_progress_bar = Gtk.ProgressBar()
         self.render_progress_bar.set_text(self.not_rendering_txt)
 
+        # Per slot progress is displayed when more then one item is rendered concurrently.
+        self.slots_box = Gtk.VBox(False, 2)
+        self.slot_labels = []
+        self.slot_progress_bars = []
+
         self.remove_selected = Gtk.Button(label=_("Delete Selected"))
         self.remove_selected.connect("clicked", 
                                      lambda w, e: self.remove_selected_clicked(), 
@@ -713,6 +820,7 @@ class BatchRenderWindow:
         top_vbox.pack_start(info_vbox, False, False, 0)
         top_vbox.pack_start(guiutils.get_pad_label(12, 12), False, False, 0)
         top_vbox.pack_start(self.render_progress_bar, False, False, 0)
+        top_vbox.pack_start(self.slots_box, False, False, 0)
         top_vbox.pack_start(guiutils.get_pad_label(12, 12), False, False, 0)
         top_vbox.pack_start(button_row, False, False, 0)
 
@@ -838,6 +946,40 @@ class BatchRenderWindow:
         
         self.items_rendered.set_text("  " + str(items))
 
+    def init_slots_view(self, slots_count):
+        for child in self.slots_box.get_children():
+            self.slots_box.remove(child)
+        self.slot_labels = []
+        self.slot_progress_bars = []
+        if slots_count < 2:
+            return
+
+        for i in range(0, slots_count):
+            slot_label = Gtk.Label(label=_("Slot ") + str(i + 1) + ":")
+            slot_label.set_size_request(60, 20)
+            slot_progress_bar = Gtk.ProgressBar()
+            slot_progress_bar.set_show_text(True)
+            slot_progress_bar.set_text(self.not_rendering_txt)
+            row = Gtk.HBox(False, 4)
+            row.pack_start(slot_label, False, False, 0)
+            row.pack_start(slot_progress_bar, True, True, 0)
+            self.slots_box.pack_start(row, False, False, 0)
+            self.slot_labels.append(slot_label)
+            self.slot_progress_bars.append(slot_progress_bar)
+
+        self.slots_box.show_all()
+
+    def update_slots_progress(self, slots_progress):
+        for i in range(0, len(self.slot_progress_bars)):
+            progress_bar = self.slot_progress_bars[i]
+            if slots_progress[i] == None:
+                progress_bar.set_fraction(0.0)
+                progress_bar.set_text(self.not_rendering_txt)
+            else:
+                display_name, fraction = slots_progress[i]
+                progress_bar.set_fraction(fraction)
+                progress_bar.set_text(display_name + "  " + str(int(fraction * 100)) + " %")
+
     def abort_render(self):
         global queue_runner_thread
         queue_runner_thread.abort()
@@ -852,9 +994,9 @@ class BatchRenderWindow:
         self.current_file.set_text("")
         self.remove_selected.set_sensitive(True)
         self.remove_finished.set_sensitive(True)
+        self.init_slots_view(0)
 
-        global queue_runner_thread, render_thread
-        render_thread = None
+        global queue_runner_thread
         queue_runner_thread = None        
 
 
@@ -1284,8 +1426,11 @@ class SingleRenderThread(threading.Thread):
         start_frame, end_frame, wait_for_stop_render = get_render_range(render_item)
         
         # Create and launch render thread
-        render_thread = renderconsumer.FileRenderPlayer(None, producer, consumer, start_frame, end_frame) # None == file name not needed this time when using FileRenderPlayer because callsite keeps track of things
-        render_thread.wait_for_producer_end_stop = wait_for_stop_render
+        if segmentedrender.segmented_render_possible(render_item, start_frame, end_frame):
+            render_thread = segmentedrender.SegmentedRenderPlayer(render_item, project_file_path, data_file_path, start_frame, end_frame, wait_for_stop_render)
+        else:
+            render_thread = renderconsumer.FileRenderPlayer(None, producer, consumer, start_frame, end_frame) # None == file name not needed this time when using FileRenderPlayer because callsite keeps track of things
+            render_thread.wait_for_producer_end_stop = wait_for_stop_render
         render_thread.start()
 
         # Set render start time and item state
@@ -1319,6 +1464,11 @@ class SingleRenderThread(threading.Thread):
         global single_render_thread
         single_render_thread = None
 
+        # Segmented renders set error if a render process or concat failed.
+        if getattr(render_thread, "error", None) != None:
+            GLib.idle_add(_show_single_render_error, render_thread.error)
+            return
+
         # Update view for render end
         GLib.idle_add(_single_render_shutdown)
 
@@ -1434,5 +1584,14 @@ class SingleRenderWindow:
 def _start_single_render_shutdown():
     single_render_thread.abort()
 
+def _show_single_render_error(error):
+    primary_txt = _("Render failed!")
+    secondary_txt = _("Message:\n") + error
+    dialogutils.warning_message_with_callback(primary_txt, secondary_txt, single_render_window.window, False, _single_render_error_dialog_closed)
+
+def _single_render_error_dialog_closed(dialog, response_id):
+    dialog.destroy()
+    _single_render_shutdown()
+
 def _single_render_shutdown():
     _single_render_app.quit()
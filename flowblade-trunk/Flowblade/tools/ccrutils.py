@@ -25,6 +25,7 @@ Used mostly for container clips rendering, hence ContainerClipsRenderingUTILS.
 
 import os
 import pickle
+import socket
 import sys
 
 import appconsts
@@ -42,17 +43,31 @@ ABORT_MSG_FILE = "abort"
 RENDER_DATA_FILE = "render_data"
 RANGE_RENDER_DATA_DICT = "proc_fctx_dict"
 
+# Application sets this environment variable for launched render processes when it
+# receives status messages as events. Message files are still always written so that
+# status is available if application does not receive events.
+STATUS_SOCKET_ENV_VAR = "FLOWBLADE_JOBS_STATUS_SOCKET"
+STATUS_EVENT = "status"
+COMPLETED_EVENT = "completed"
+
 _session_folder = None
 _clip_frames_folder_internal = None
 _rendered_frames_folder_internal = None
 
 _render_data = None
 
+_status_socket = None
+
+# Messages received as events in application process, session folder -> message.
+_received_status_messages = {}
+_received_completed = set()
+
 
 # ----------------------------------------------------- interface with message files, used by main app
 # We are using message files to communicate with application.
 def clear_flag_files(parent_folder, session_id):
     folder = _get_session_folder(parent_folder, session_id)
+    _clear_received_events(folder)
     
     completed_msg = folder + "/" + COMPLETED_MSG_FILE
     if os.path.exists(completed_msg):
@@ -66,6 +81,10 @@ def clear_flag_files(parent_folder, session_id):
     if os.path.exists(abort_msg_file):
         os.remove(abort_msg_file)
 
+    range_render_data_file = folder + "/" + RANGE_RENDER_DATA_DICT
+    if os.path.exists(range_render_data_file):
+        os.remove(range_render_data_file)
+
 def set_render_data(parent_folder, session_id, video_render_data):
     folder = _get_session_folder(parent_folder, session_id)
     render_data_path = folder + "/" + RENDER_DATA_FILE
@@ -98,6 +117,9 @@ def read_misc_session_data(parent_folder, session_id, file_name):
         
 def session_render_complete(parent_folder, session_id):
     folder = _get_session_folder(parent_folder, session_id)
+    if folder in _received_completed:
+        return True
+
     completed_msg_path = folder + "/" + COMPLETED_MSG_FILE
 
     if os.path.exists(completed_msg_path):
@@ -114,6 +136,11 @@ def get_session_status(parent_folder, session_id):
     return (step, frame, length, elapsed)
 
 def get_session_status_message(parent_folder, session_id):
+    try:
+        return _received_status_messages[_get_session_folder(parent_folder, session_id)]
+    except KeyError:
+        pass
+
     try:
         status_msg_file = _get_session_folder(parent_folder, session_id) + "/" + STATUS_MSG_FILE
         with open(status_msg_file) as f:
@@ -144,6 +171,28 @@ def abort_render(parent_folder, session_id):
         # Sometimes this fails and not handling it makes things worse, see if this needs more attention.
         print("atomicfile.AtomicFileWriteError in ccrutils.abort_render(), could not open for writing: ", folder)
         
+def status_event_received(event_data):
+    """
+    Saves status message received as event, returns session folder of message or None for unknown data.
+    """
+    try:
+        folder, event, msg = event_data.decode("utf-8").split("\n", 2)
+    except:
+        return None
+
+    if event == COMPLETED_EVENT:
+        _received_completed.add(folder)
+    elif event == STATUS_EVENT:
+        _received_status_messages[folder] = msg
+    else:
+        return None
+
+    return folder
+
+def _clear_received_events(folder):
+    _received_status_messages.pop(folder, None)
+    _received_completed.discard(folder)
+
 def _get_session_folder(parent_folder, session_id):
     session_folder_path = parent_folder + session_id
     return session_folder_path
@@ -181,6 +230,7 @@ def delete_internal_folders(parent_folder, session_id):
     _session_folder = _get_session_folder(parent_folder, session_id)
     _clip_frames_folder_internal = _session_folder + CLIP_FRAMES_DIR
     _rendered_frames_folder_internal = _session_folder + RENDERED_FRAMES_DIR
+    _clear_received_events(_session_folder)
     
     if os.path.exists(_clip_frames_folder_internal):
         os.rmdir(_clip_frames_folder_internal)
@@ -233,6 +283,8 @@ def write_status_message(msg):
     except:
         pass # this failing because we can't get file access will show as progress hickup to user, we don't care
 
+    _send_status_event(STATUS_EVENT, msg, False)
+
 def write_completed_message():
     completed_msg_file = session_folder_saved_global() + "/" + COMPLETED_MSG_FILE
     script_text = "##completed##" # let's put something in here
@@ -240,6 +292,28 @@ def write_completed_message():
         script_file = afw.get_file()
         script_file.write(script_text)
 
+    _send_status_event(COMPLETED_EVENT, script_text, True)
+
+def _send_status_event(event, msg, wait_for_send):
+    # Dropped status events only delay progress display, but we wait a bit to
+    # get completed events delivered if application is busy. 
+    socket_path = os.environ.get(STATUS_SOCKET_ENV_VAR)
+    if socket_path == None:
+        return
+
+    global _status_socket
+    try:
+        if _status_socket == None:
+            _status_socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        if wait_for_send == True:
+            _status_socket.settimeout(5.0)
+        else:
+            _status_socket.setblocking(False)
+        event_data = session_folder_saved_global() + "\n" + event + "\n" + msg
+        _status_socket.sendto(event_data.encode("utf-8"), socket_path)
+    except OSError:
+        pass # Application has exited or is not listening, message files are used.
+
 def write_range_render_data(proc_fctx_dict):
     out_file_path = session_folder_saved_global() + "/" + RANGE_RENDER_DATA_DICT
     with atomicfile.AtomicFileWriter(out_file_path, "wb") as afw:
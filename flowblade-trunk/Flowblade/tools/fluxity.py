@@ -199,6 +199,7 @@
     | ------- | ------- |
     | 1 | Initial release. |
     | 2 | Added methods FluxityContext.required_api_version(), FluxityContext.add_editor_group()|
+    | 3 | Added methods AnimatedValue.get_values(), AnimatedValue.create_values_table(), AffineTransform.create_values_tables()|
 
     # FLUXITY API
 """
@@ -209,6 +210,7 @@ __pdoc__['FluxityScript'] = False
 __pdoc__['FluxityProfile'] = False
 __pdoc__['FluxityEmptyClass'] = False
 __pdoc__['render_frame_sequence'] = False
+__pdoc__['render_frame_stream'] = False
 __pdoc__['render_preview_frame'] = False
 __pdoc__['EDITOR_GROUP_LABEL'] = False
 
@@ -218,13 +220,17 @@ from gi.repository import Pango
 from gi.repository import PangoCairo
 
 import array
+import bisect
 import cairo
 import json
 import math
 import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
 import os
 from PIL import Image, ImageFilter
 import sys
+import time
 import traceback
 
 
@@ -244,6 +250,10 @@ DEFAULT_FONT_SIZE = 40
 
 FLUXITY_ERROR_MSG = "ERROR"
 FLUXITY_LOG_MSG = "LOG"
+FLUXITY_THROUGHPUT_MSG = "THROUGHPUT"
+
+RENDER_CHUNK_FRAMES = 8
+STREAM_CHUNK_FRAMES = 4
 
 VERTICAL = 0
 HORIZONTAL = 1
@@ -368,7 +378,7 @@ KEYFRAME_SMOOTH = 1
 KEYFRAME_DISCRETE = 2
 """Value after keyframe of this type is value at keyframe."""
 
-API_VERSION = 2
+API_VERSION = 3
 """API version number, increasing integer for each Flowblade release with changes."""
 
 # ---------------------------------------------------------- script object
@@ -1124,10 +1134,13 @@ class AnimatedValue:
       * **`KEYFRAME_DISCRETE`** Value after keyframe is value at keyframe.
 
     Implementation assumes there always being a keyframe at frame 0, and removing that will result in undefined behaviour. It is of course possible to overwrite existing keyframe at frame 0 using method *add_keyframe_at_frame().*
+    
+    Values for all frames can be computed once with *create_values_table()* in script method *init_render()* after keyframes have been added, *get_value()* then looks up values from the table.
     """
     def __init__(self, value=0.0):
         # We enforce a keyframe always existing in frame 0
         self.keyframes = [(0, value, KEYFRAME_LINEAR)]
+        self.values_table = None
 
     def add_keyframe_at_frame(self, frame, value, kf_type):
         """
@@ -1146,33 +1159,34 @@ class AnimatedValue:
         If frame is after last keyframe a new keyframe is appended.
         """
         
+        # Values table is no longer valid.
+        self.values_table = None
+
         # Replace if kf in frame exists.
         new_kf = (frame, value, kf_type)
         kf_index_on_frame = self._frame_has_keyframe(frame)
         if kf_index_on_frame != -1:
-            self.keyframes.pop(kf_index_on_frame)
-            self.keyframes.insert(kf_index_on_frame, new_kf)
+            self.keyframes[kf_index_on_frame] = new_kf
             return
 
-        # Insert between if frame between two kfs.
-        for i in range(0, len(self.keyframes)):
-            kf_frame, kf_value, kf_type = self.keyframes[i]
-            if kf_frame > frame:
-                prev_frame, prev_value, prev_type = self.keyframes[i - 1]
-                self.keyframes.insert(i, new_kf)
-                self.active_kf_index = i
-                return
-
-        # Append last if after last kf.
-        self.keyframes.append(new_kf)
+        # Insert between if frame between two kfs, or append last if after last kf.
+        i = self._get_keyframe_index(frame) + 1
+        self.keyframes.insert(i, new_kf)
+        if i < len(self.keyframes) - 1:
+            self.active_kf_index = i
 
     def _frame_has_keyframe(self, frame):
-        for i in range(0, len(self.keyframes)):
-            kf_frame, kf_value, type = self.keyframes[i]
-            if frame == kf_frame:
-                return i
+        # Keyframes are sorted by frame and (frame,) sorts before all keyframes on frame.
+        i = bisect.bisect_left(self.keyframes, (frame,))
+        if i < len(self.keyframes) and self.keyframes[i][0] == frame:
+            return i
 
         return -1
+
+    def _get_keyframe_index(self, frame):
+        # Returns index of last keyframe at or before frame, or -1 if frame is before first keyframe.
+        # (frame, math.inf) sorts after all keyframes on frame.
+        return bisect.bisect_right(self.keyframes, (frame, math.inf)) - 1
         
     def get_value(self, frame):
         """
@@ -1182,27 +1196,74 @@ class AnimatedValue:
 
         **Returns:** (float) value at frame.
         """
+        if self.values_table != None and type(frame) == int and frame >= 0 and frame < len(self.values_table):
+            return self.values_table[frame]
+
         last_frame, last_value, last_type  = self.keyframes[-1]
         if frame >= last_frame: # This also handles case len(self.keyframes) == 1 because first keyframe always at frame 0.
             return last_value
 
-        for i in range(0, len(self.keyframes) - 1):
-            kf_frame, kf_value, kf_type = self.keyframes[i]
-            if frame == kf_frame:
-                return kf_value
-            next_frame, next_value, next_type = self.keyframes[i + 1]
-            if frame == next_frame:
-                return next_value
-            if frame > kf_frame and frame < next_frame:
-                if kf_type == KEYFRAME_LINEAR:
-                    fract = (frame - kf_frame) / (next_frame - kf_frame)
-                    return kf_value + fract * (next_value - kf_value)
-                elif kf_type == KEYFRAME_SMOOTH:
-                    return self._get_smooth_value(i, frame)
-                else: # KEYFRAME_DISCRETE
-                    return kf_value
-                    
-        return None # We absolutely want to crash if somehow we hit this.
+        i = self._get_keyframe_index(frame)
+        if i == -1:
+            return None # We absolutely want to crash if somehow we hit this.
+
+        kf_frame, kf_value, kf_type = self.keyframes[i]
+        if frame == kf_frame:
+            return kf_value
+        next_frame, next_value, next_type = self.keyframes[i + 1]
+        if kf_type == KEYFRAME_LINEAR:
+            fract = (frame - kf_frame) / (next_frame - kf_frame)
+            return kf_value + fract * (next_value - kf_value)
+        elif kf_type == KEYFRAME_SMOOTH:
+            return self._get_smooth_value(i, frame)
+        else: # KEYFRAME_DISCRETE
+            return kf_value
+
+    def get_values(self, frame_range):
+        """
+        **`frame_range(range|list)`** Frame numbers in range 0 - (plugin length), e.g. *range(0, fctx.get_length())*.
+                
+        Computes values at all given frames using current keyframe values, positions and types.
+
+        **Returns:** (numpy.ndarray) float values at frames in given order.
+        """
+        frames = np.asarray(frame_range, dtype=np.float64)
+        kf_frames = np.array([kf[0] for kf in self.keyframes], dtype=np.float64)
+        kf_values = np.array([kf[1] for kf in self.keyframes], dtype=np.float64)
+        kf_types = np.array([kf[2] for kf in self.keyframes])
+        last = len(self.keyframes) - 1
+
+        # Indexes of the four keyframes that affect value at each frame, see _get_smooth_value().
+        prev = np.clip(np.searchsorted(kf_frames, frames, side="right") - 1, 0, last)
+        next = np.minimum(prev + 1, last)
+        prev_prev = np.maximum(prev - 1, 0)
+        next_next = np.minimum(next + 1, last)
+
+        val0 = kf_values[prev_prev]
+        val1 = kf_values[prev]
+        val2 = kf_values[next]
+        val3 = kf_values[next_next]
+
+        span = kf_frames[next] - kf_frames[prev]
+        fract = np.divide(frames - kf_frames[prev], span, out=np.zeros_like(frames), where=span > 0)
+
+        linear = val1 + fract * (val2 - val1)
+        smooth = self._catmull_rom_interpolate(val0, val1, val2, val3, fract)
+        prev_types = kf_types[prev]
+        values = np.where(prev_types == KEYFRAME_LINEAR, linear, np.where(prev_types == KEYFRAME_SMOOTH, smooth, val1))
+
+        # Frames on and after last keyframe get last keyframe value.
+        return np.where(frames >= kf_frames[last], kf_values[last], values)
+
+    def create_values_table(self, length):
+        """
+        **`length(int)`** Number of frames in table, usually *fctx.get_length()*.
+        
+        Computes values for frames *0 - (length - 1)* and saves them to be used by *get_value()*. Adding keyframes after this clears the table. 
+        
+        This is best called in script method *init_render()* after all keyframes have been added.
+        """
+        self.values_table = self.get_values(range(0, length)).tolist()
  
     def _get_smooth_value(self, i, frame):
         # Get indexes of the four keyframes that affect the drawn curve. 
@@ -1282,6 +1343,15 @@ class AffineTransform:
         self.scale_y = AnimatedValue(1.0)
         self.rotation = AnimatedValue()
 
+    def create_values_tables(self, length):
+        """
+        **`length(int)`** Number of frames in tables, usually *fctx.get_length()*.
+        
+        Calls *`fluxity.AnimatedValue.create_values_table()`* for all animated attributes.
+        """
+        for animated_value in (self.x, self.y, self.anchor_x, self.anchor_y, self.scale_x, self.scale_y, self.rotation):
+            animated_value.create_values_table(length)
+
     def apply_transform(self, cr, frame):
         """
         **`cr(cairo.Context)`** a `cairo.Context` object.
@@ -1390,7 +1460,7 @@ def render_preview_frame(script, script_file, frame, out_folder, profile_file_pa
         fctx.error = str(e) + traceback.format_exc(6,True)
         return fctx
 
-def render_frame_sequence(script, script_file, in_frame, out_frame, out_folder, profile_file_path, editors_data_json=None, start_out_from_frame_one=False):
+def render_frame_sequence(script, script_file, in_frame, out_frame, out_folder, profile_file_path, editors_data_json=None, start_out_from_frame_one=False, processes_count=None):
     """
     **script(str)** Script to be rendered as a string.
     
@@ -1408,26 +1478,19 @@ def render_frame_sequence(script, script_file, in_frame, out_frame, out_folder,
     
     **start_out_from_frame_one(boolean)** Setting this *True* will cause numbering of rendered frame sequence to start from *1*, otherwise it will start from *in_frame*. 
     
-    Renders a range of frames from provided script.
+    **processes_count(int)** Number of processes used for rendering. This is optional, not providing this or providing *0* selects number of processes based on CPU count.
+    
+    Renders a range of frames from provided script. Processes render contiguous chunks of *RENDER_CHUNK_FRAMES* frames taken in order from a shared queue as they become free.
     
     **Returns:** (dict) Dictionary object created during rendering with the following information:
     
-    * for each process it has *key -> value* pair *process number(str) -> path to first frame rendered by process(str)*.
+    * for each process that rendered frames it has *key -> value* pair *process number(str) -> path to first frame rendered by process(str)*.
     * if errors occurred during rendering it has *key -> value* pair *fluxity.FLUXITY_ERROR_MSG -> error message(str)*.
     * if script created log messages it has *key -> value* pair *fluxity.FLUXITY_LOG_MSG -> log message(str)*.
+    * *key -> value* pair *fluxity.FLUXITY_THROUGHPUT_MSG -> rendered frames, render time and frames per second for each process(str)*.
     """
-    # Some simple heuristics to decide how many processes will be used for rendering
-    cpu_count = multiprocessing.cpu_count()
-    threads = cpu_count - 2
-    # Computer does not have that many cores, let's only use one.
-    if threads < 2:
-        threads = 1
-    # This gets diminshing returns so let's cap it at 8.
-    if threads > 8:
-        threads = 8
-    # If we are rendering a very small amount of frames, there isn't much benefit to use multiple processes.
-    if out_frame - in_frame < threads * 2:
-        threads = 1
+    threads = _get_render_processes_count(in_frame, out_frame, processes_count, RENDER_CHUNK_FRAMES)
+    chunks_queue = _get_frame_chunks_queue(in_frame, out_frame, threads, RENDER_CHUNK_FRAMES)
 
     result_queue = multiprocessing.Queue()
     
@@ -1437,17 +1500,21 @@ def render_frame_sequence(script, script_file, in_frame, out_frame, out_folder,
         render_data = ( script, script_file, in_frame, out_frame, out_folder, \
                         profile_file_path, editors_data_json, start_out_from_frame_one)
         
-        proc_info = (i, threads, result_queue)
+        proc_info = (i, chunks_queue, result_queue)
         p = multiprocessing.Process(target=_render_process_launch, args=(render_data, proc_info))
         jobs.append(p)
         p.start()
 
     proc_fctx_dict = {}
+    throughputs = []
     for proc in jobs:
         results_dict = result_queue.get()
         proc.join()
+        _pop_throughput(results_dict, throughputs)
         proc_fctx_dict.update(results_dict)
 
+    _set_throughput_msg(proc_fctx_dict, throughputs)
+
     return proc_fctx_dict
         
 def _render_process_launch(render_data, proc_info):
@@ -1456,7 +1523,7 @@ def _render_process_launch(render_data, proc_info):
         script, script_file, in_frame, out_frame, out_folder, \
         profile_file_path, editors_data_json, start_out_from_frame_one = render_data
         
-        procnum, threads_count, result_queue = proc_info
+        procnum, chunks_queue, result_queue = proc_info
      
         # Used to communicate to app what happened.
         results_dict = {}
@@ -1486,13 +1553,20 @@ def _render_process_launch(render_data, proc_info):
         fctx.priv_context.in_frame = in_frame
         fctx.priv_context.process_id = procnum
         
-        for frame in range(in_frame + procnum, out_frame, threads_count):
+        frames_count = 0
+        render_time = 0.0
+        for frame in _get_chunked_frames(chunks_queue):
+            frame_start_time = time.monotonic()
             fctx.priv_context.create_frame_surface(frame)
             w, h = fctx.get_dimensions()
             fscript.call_render_frame(frame, fctx, w, h)
             fctx.priv_context.write_out_frame()
+            render_time += time.monotonic() - frame_start_time
+            frames_count += 1
 
-        results_dict[str(procnum)] = str(fctx.priv_context.first_rendered_frame_path)
+        if fctx.priv_context.first_rendered_frame_path != None:
+            results_dict[str(procnum)] = str(fctx.priv_context.first_rendered_frame_path)
+        results_dict[str(FLUXITY_THROUGHPUT_MSG)] = (procnum, frames_count, render_time)
         if len(fctx.log_msg) > 0:
             results_dict[str(FLUXITY_LOG_MSG)] = str(fctx.log_msg)
         
@@ -1503,6 +1577,223 @@ def _render_process_launch(render_data, proc_info):
         results_dict[str(FLUXITY_ERROR_MSG)] = str(fctx.error)
         result_queue.put(results_dict)
 
+def render_frame_stream(script, script_file, in_frame, out_frame, profile_file_path, frame_callback, editors_data_json=None, processes_count=None):
+    """
+    **script(str)** Script to be rendered as a string.
+    
+    **script_file(str)** Absolute path to file containing script. If this is not provided methods some like *FluxityContext.get_script_dir()* will not function as intended.
+    
+    **in_frame(int)** First frame of rendered range.
+
+    **out_frame(int)** Last frame of rendered range, exclusive.
+    
+    **profile_file_path(str)** Path to a file containing a file describing MLT profile used to when rendering the script.
+    
+    **frame_callback(function)** Called in rendering order with arguments *(frame(int), frame_data(memoryview))* for each rendered frame. Frame data is Cairo *FORMAT_ARGB32* image data of profile size and is only valid during the call. Returning *False* stops rendering.
+    
+    **editors_data_json(str)** String representation of JSON object containing editors described in the script and their values. This is optional, not providing this will use default values given in script when rendering.
+    
+    **processes_count(int)** Number of processes used for rendering. This is optional, not providing this or providing *0* selects number of processes based on CPU count.
+    
+    Renders a range of frames from provided script without saving them. Frames are rendered by multiple processes into shared memory and given to *frame_callback* in order as soon as they are available. Processes are scheduled as in *render_frame_sequence()*, with chunks of *STREAM_CHUNK_FRAMES* frames.
+    
+    **Returns:** (dict) Dictionary object created during rendering with the same error and log information as returned by *render_frame_sequence()*.
+    """
+    priv_context = FluxityContextPrivate(None)
+    profile_data = priv_context.load_profile(profile_file_path)
+    w = profile_data[PROFILE_WIDTH]
+    h = profile_data[PROFILE_HEIGHT]
+    frame_size = cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_ARGB32, w) * h
+
+    threads = _get_render_processes_count(in_frame, out_frame, processes_count, STREAM_CHUNK_FRAMES)
+    chunks_queue = _get_frame_chunks_queue(in_frame, out_frame, threads, STREAM_CHUNK_FRAMES)
+
+    # Each process gets its own frame slots in shared memory so that process rendering 
+    # next frame in order always has a free slot to render into. Slot for every frame of chunk
+    # lets processes render their chunks without waiting for earlier chunks to be consumed.
+    frames_memory = shared_memory.SharedMemory(create=True, size=frame_size * threads * STREAM_CHUNK_FRAMES)
+    result_queue = multiprocessing.Queue()
+
+    jobs = []
+    free_slots_queues = []
+    for i in range(threads):
+        free_slots_queue = multiprocessing.Queue()
+        for slot in range(i * STREAM_CHUNK_FRAMES, (i + 1) * STREAM_CHUNK_FRAMES):
+            free_slots_queue.put(slot)
+        free_slots_queues.append(free_slots_queue)
+
+        render_data = ( script, script_file, in_frame, out_frame, \
+                        profile_file_path, editors_data_json, frames_memory, frame_size)
+
+        proc_info = (i, chunks_queue, result_queue, free_slots_queue)
+        p = multiprocessing.Process(target=_stream_render_process_launch, args=(render_data, proc_info))
+        jobs.append(p)
+        p.start()
+
+    proc_fctx_dict = {}
+    throughputs = []
+    rendered_slots = {} # frame -> (procnum, slot), frames rendered ahead of next frame in order.
+    next_frame = in_frame
+    running_processes = threads
+    try:
+        while running_processes > 0:
+            msg = result_queue.get()
+            
+            # Process sends results dict when it exits.
+            if isinstance(msg, dict):
+                _pop_throughput(msg, throughputs)
+                proc_fctx_dict.update(msg)
+                running_processes -= 1
+                if FLUXITY_ERROR_MSG in msg:
+                    break
+                continue
+
+            procnum, frame, slot = msg
+            rendered_slots[frame] = (procnum, slot)
+            while next_frame in rendered_slots:
+                procnum, slot = rendered_slots.pop(next_frame)
+                start = slot * frame_size
+                with frames_memory.buf[start:start + frame_size] as frame_data:
+                    keep_rendering = frame_callback(next_frame, frame_data)
+                free_slots_queues[procnum].put(slot)
+                next_frame += 1
+                if keep_rendering == False:
+                    running_processes = 0
+                    break
+    finally:
+        for proc in jobs:
+            if proc.is_alive():
+                proc.terminate()
+            proc.join()
+        frames_memory.close()
+        frames_memory.unlink()
+
+    _set_throughput_msg(proc_fctx_dict, throughputs)
+
+    return proc_fctx_dict
+
+def _stream_render_process_launch(render_data, proc_info):
+
+    try:
+        script, script_file, in_frame, out_frame, \
+        profile_file_path, editors_data_json, frames_memory, frame_size = render_data
+        
+        procnum, chunks_queue, result_queue, free_slots_queue = proc_info
+     
+        # Used to communicate to app what happened.
+        results_dict = {}
+        
+        # Init script and context.
+        error_msg, results = _init_script_and_context(script, script_file, None, profile_file_path)
+        if error_msg != None:
+            results_dict[str(FLUXITY_ERROR_MSG) ] = str(error_msg)
+            result_queue.put(results_dict)
+            return 
+
+        fscript, fctx = results
+
+        # Execute script to render frames into shared memory.
+        fctx.priv_context.current_method = METHOD_INIT_SCRIPT
+        fscript.call_init_script(fctx)
+
+        if editors_data_json != None:
+            fctx.set_editors_data(editors_data_json)
+            
+        fctx.priv_context.current_method = METHOD_INIT_RENDER
+        fscript.call_init_render(fctx)
+        
+        fctx.priv_context.current_method = METHOD_RENDER_FRAME
+        fctx.priv_context.in_frame = in_frame
+        fctx.priv_context.process_id = procnum
+        
+        frames_count = 0
+        render_time = 0.0
+        for frame in _get_chunked_frames(chunks_queue):
+            frame_start_time = time.monotonic()
+            fctx.priv_context.create_frame_surface(frame)
+            w, h = fctx.get_dimensions()
+            fscript.call_render_frame(frame, fctx, w, h)
+            render_time += time.monotonic() - frame_start_time
+            frames_count += 1
+
+            slot = free_slots_queue.get()
+            frame_surface = fctx.priv_context.frame_surface
+            frame_surface.flush()
+            start = slot * frame_size
+            frames_memory.buf[start:start + frame_size] = frame_surface.get_data()
+            result_queue.put((procnum, frame, slot))
+
+        results_dict[str(FLUXITY_THROUGHPUT_MSG)] = (procnum, frames_count, render_time)
+        if len(fctx.log_msg) > 0:
+            results_dict[str(FLUXITY_LOG_MSG)] = str(fctx.log_msg)
+        
+        result_queue.put(results_dict)
+                    
+    except Exception as e:
+        fctx.error = str(e) + traceback.format_exc(6,True) 
+        results_dict[str(FLUXITY_ERROR_MSG)] = str(fctx.error)
+        result_queue.put(results_dict)
+
+def _get_render_processes_count(in_frame, out_frame, processes_count, chunk_frames):
+    chunks_count = (out_frame - in_frame + chunk_frames - 1) // chunk_frames
+
+    # Use given number of processes, but no more then there are chunks to render.
+    if processes_count != None and processes_count > 0:
+        return max(1, min(processes_count, chunks_count))
+
+    # Some simple heuristics to decide how many processes will be used for rendering
+    cpu_count = multiprocessing.cpu_count()
+    threads = cpu_count - 2
+    # Computer does not have that many cores, let's only use one.
+    if threads < 2:
+        threads = 1
+    # This gets diminshing returns so let's cap it at 8.
+    if threads > 8:
+        threads = 8
+    # If we are rendering a very small amount of frames, there isn't much benefit to use multiple processes.
+    if out_frame - in_frame < threads * 2:
+        threads = 1
+    
+    return max(1, min(threads, chunks_count))
+
+def _get_frame_chunks_queue(in_frame, out_frame, threads, chunk_frames):
+    # Processes take contiguous frame ranges in order from shared queue when they become free.
+    # This keeps frames rendered by a process consecutive for scripts that keep state between 
+    # frames and balances load when frame render times vary over range.
+    chunks_queue = multiprocessing.Queue()
+    for chunk_in in range(in_frame, out_frame, chunk_frames):
+        chunks_queue.put((chunk_in, min(chunk_in + chunk_frames, out_frame)))
+    # Every process exits on receiving None.
+    for i in range(threads):
+        chunks_queue.put(None)
+    
+    return chunks_queue
+
+def _get_chunked_frames(chunks_queue):
+    while True:
+        chunk = chunks_queue.get()
+        if chunk == None:
+            return
+        chunk_in, chunk_out = chunk
+        for frame in range(chunk_in, chunk_out):
+            yield frame
+
+def _pop_throughput(results_dict, throughputs):
+    try:
+        throughputs.append(results_dict.pop(FLUXITY_THROUGHPUT_MSG))
+    except KeyError:
+        pass # Process exited on error.
+
+def _set_throughput_msg(proc_fctx_dict, throughputs):
+    lines = []
+    for procnum, frames_count, render_time in sorted(throughputs):
+        fps = 0.0
+        if render_time > 0.0:
+            fps = frames_count / render_time
+        lines.append("process " + str(procnum) + ": " + str(frames_count) + " frames, " \
+                     + "{:.2f}".format(render_time) + " s, " + "{:.2f}".format(fps) + " fps")
+    proc_fctx_dict[str(FLUXITY_THROUGHPUT_MSG)] = "\n".join(lines)
+
 def get_script_default_edit_data(script, script_file, out_folder, profile_file_path):
     """
     **script(str)** Script to be rendered as a string.
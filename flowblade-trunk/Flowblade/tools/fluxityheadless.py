@@ -34,6 +34,8 @@ try:
 except:
     import mlt
 import os
+import shutil
+import tempfile
 import threading
 import time
 
@@ -64,6 +66,12 @@ RENDER_DATA_FILE = ccrutils.RENDER_DATA_FILE
 _render_thread = None
 _frame_range_update_thread = None
 
+# Stream rendered frames into encoder when video file is rendered, see fluxity.render_frame_stream().
+STREAM_FRAMES = True
+
+# Status message file is written at most this often when streaming frames.
+STREAM_STATUS_UPDATE_INTERVAL = 0.2
+
 
 # ----------------------------------------------------- module interface to render process with message files, used by main app
 # We are using message files to communicate with application.
@@ -163,6 +171,11 @@ class FluxityHeadlessRunnerThread(threading.Thread):
         editors_data_json = json.dumps(self.fluxity_plugin_edit_data["editors_list"]) # See fluxity.FluxityContext.get_script_data()
         render_length = self.range_out - self.range_in 
 
+        # When video file is rendered frames are given to encoder without writing them on disk.
+        if self.render_data.do_video_render == True and STREAM_FRAMES == True:
+            self.run_streamed(user_script, script_file, profile_file_path, editors_data_json, render_length)
+            return
+
         global _frame_range_update_thread
         _frame_range_update_thread = FrameRangeUpdateThread(rendered_frames_folder, render_length)
         _frame_range_update_thread.start()
@@ -174,7 +187,8 @@ class FluxityHeadlessRunnerThread(threading.Thread):
                                                           rendered_frames_folder, 
                                                           profile_file_path, 
                                                           editors_data_json,
-                                                          True)
+                                                          True,
+                                                          editorpersistance.prefs.generator_render_processes)
         ccrutils.write_range_render_data(proc_fctx_dict)
         
         # Exit on error without waiting frame render to complete.
@@ -239,6 +253,128 @@ class FluxityHeadlessRunnerThread(threading.Thread):
         # Write out completed flag file.
         ccrutils.write_completed_message()
         
+    def run_streamed(self, user_script, script_file, profile_file_path, editors_data_json, render_length):
+        self.render_length = render_length
+        self.frames_written = 0
+        self.stream_done = False
+        self.proc_fctx_dict = {}
+
+        # Rendered frames are written in order as raw Cairo ARGB32 data into pipe read by render producer.
+        self.pipes_folder = tempfile.mkdtemp(prefix="flowblade_fluxity_stream_")
+        self.output_pipe_path = os.path.join(self.pipes_folder, "rendered.bgra")
+        os.mkfifo(self.output_pipe_path)
+
+        stream_thread = threading.Thread(target=self._stream_frames, 
+                                         args=(user_script, script_file, profile_file_path, editors_data_json),
+                                         daemon=True)
+        stream_thread.start()
+
+        # Render consumer
+        args_vals_list = toolsencoding.get_args_vals_list_for_render_data(self.render_data)
+        profile = mltprofiles.get_profile_for_index(self.render_data.profile_index) 
+        
+        if self.render_data.save_internally == True:
+            file_path = ccrutils.session_folder_saved_global() + "/" + appconsts.CONTAINER_CLIP_VIDEO_CLIP_NAME + self.render_data.file_extension
+        else:
+            file_path = self.render_data.render_dir +  "/" + self.render_data.file_name + self.render_data.file_extension
+    
+        consumer = renderconsumer.get_mlt_render_consumer(file_path, profile, args_vals_list)
+
+        # Render producer, frames are rendered in script profile size.
+        script_profile = mltprofiles.get_profile(self.profile_desc)
+        producer = renderconsumer.get_rawvideo_pipe_producer(profile, self.output_pipe_path, 
+                                                             script_profile.width(), script_profile.height(),
+                                                             "bgra", render_length)
+
+        # Script errors before first frame leave pipe empty and producer invalid.
+        if producer.is_valid() == False:
+            self.end_streamed(stream_thread)
+            return
+
+        self.render_player = renderconsumer.FileRenderPlayer("", producer, consumer, 0, render_length - 1)
+        self.render_player.wait_for_producer_end_stop = False
+        self.render_player.start()
+
+        while self.render_player.stopped == False:
+            self.abort_requested()
+            
+            error_msg, log_msg = self.get_range_render_messages(self.proc_fctx_dict)
+            if self.abort == True or error_msg != None:
+                self.render_player.shutdown()
+                self.end_streamed(stream_thread)
+                return
+
+            # Script rendering and encoding happen at the same time, encoding is reported after all frames have been rendered.
+            if self.stream_done == True:
+                fraction = self.render_player.get_render_fraction()
+                self.video_render_update_callback(fraction)
+            
+            time.sleep(0.3)
+
+        self.end_streamed(stream_thread)
+
+    def _stream_frames(self, user_script, script_file, profile_file_path, editors_data_json):
+        try:
+            self.output_pipe = open(self.output_pipe_path, "wb")
+        except OSError as e:
+            self.proc_fctx_dict = {fluxity.FLUXITY_ERROR_MSG:str(e)}
+            return
+
+        with self.output_pipe:
+            self.proc_fctx_dict = fluxity.render_frame_stream(user_script,
+                                                              script_file,
+                                                              self.range_in,
+                                                              self.range_out,
+                                                              profile_file_path,
+                                                              self.stream_frame_rendered,
+                                                              editors_data_json,
+                                                              editorpersistance.prefs.generator_render_processes)
+            self.stream_done = True
+
+    def stream_frame_rendered(self, frame, frame_data):
+        if self.abort == True:
+            return False
+
+        try:
+            self.output_pipe.write(frame_data)
+        except OSError:
+            # Render producer closed pipe.
+            return False
+
+        self.frames_written += 1
+
+        now = time.monotonic()
+        if now - self.last_frame_write_time > STREAM_STATUS_UPDATE_INTERVAL:
+            self.last_frame_write_time = now
+            elapsed = now - self.start_time
+            msg = "1 " + str(self.frames_written) + " " + str(self.render_length + 1) + " " + str(elapsed)
+            ccrutils.write_status_message(msg)
+        
+        return True
+
+    def end_streamed(self, stream_thread):
+        # Stream thread may be blocked opening or writing pipe if render producer is not reading it,
+        # reading pipe from here lets it exit.
+        if self.frames_written != self.render_length:
+            self.abort = True
+        while stream_thread.is_alive():
+            try:
+                fd = os.open(self.output_pipe_path, os.O_RDONLY | os.O_NONBLOCK)
+                try:
+                    while len(os.read(fd, 1048576)) > 0:
+                        pass
+                except BlockingIOError:
+                    pass
+                os.close(fd)
+            except OSError:
+                pass
+            time.sleep(0.05)
+
+        shutil.rmtree(self.pipes_folder, ignore_errors=True)
+
+        ccrutils.write_range_render_data(self.proc_fctx_dict)
+        ccrutils.write_completed_message()
+
     def abort_requested(self):
         self.abort = ccrutils.abort_requested()
         return self.abort
@@ -63,6 +63,12 @@ RENDER_DATA_FILE = ccrutils.RENDER_DATA_FILE
 
 _render_thread = None
 
+# Stream frames through G'MIC into encoder when video file is rendered, see gmicplayer.StreamedScriptRenderer.
+STREAM_FRAMES = True
+
+# Range render data key for streamed render error message, same as fluxity.FLUXITY_ERROR_MSG.
+GMIC_ERROR_MSG = "ERROR"
+
 
 # ----------------------------------------------------- module interface to render process with message files, used by main app
 # We are using message files to communicate with application.
@@ -75,6 +81,13 @@ def set_render_data(parent_folder, session_id, video_render_data):
 def session_render_complete(parent_folder, session_id):
     return ccrutils.session_render_complete(parent_folder, session_id)
 
+def get_session_error(parent_folder, session_id):
+    # Streamed render writes completed message also when it fails, error is in range render data.
+    range_render_data = ccrutils.read_range_render_data(parent_folder, session_id)
+    if range_render_data == None:
+        return None
+    return range_render_data.get(GMIC_ERROR_MSG, None)
+
 def get_session_status(parent_folder, session_id):
     msg = ccrutils.get_session_status_message(parent_folder, session_id)
     if msg == None:
@@ -158,6 +171,11 @@ class GMicHeadlessRunnerThread(threading.Thread):
 
         profile = mltprofiles.get_profile(self.profile_desc)
 
+        # When only video file is rendered frames are streamed without writing them on disk.
+        if self.render_data.do_video_render == True and STREAM_FRAMES == True:
+            self.run_streamed(profile)
+            return
+
         # Delete old clip frames
         for frame_file in os.listdir(clip_frames_folder):
             file_path = os.path.join(clip_frames_folder, frame_file)
@@ -241,6 +259,68 @@ class GMicHeadlessRunnerThread(threading.Thread):
         # Write out completed flag file.
         ccrutils.write_completed_message()
 
+    def run_streamed(self, profile):
+        script_file = open(self.script_path)
+        user_script = script_file.read()
+
+        self.script_renderer = gmicplayer.StreamedScriptRenderer(user_script, self.clip_path, profile, 
+                                                                 self.range_in, self.range_out,
+                                                                 self.script_render_update_callback)
+        self.script_renderer.start()
+
+        # Render consumer
+        args_vals_list = toolsencoding.get_args_vals_list_for_render_data(self.render_data)
+        render_profile = mltprofiles.get_profile_for_index(self.render_data.profile_index) 
+        
+        if self.render_data.save_internally == True:
+            file_path = ccrutils.session_folder_saved_global() + "/" + appconsts.CONTAINER_CLIP_VIDEO_CLIP_NAME + self.render_data.file_extension
+        else:
+            file_path = self.render_data.render_dir +  "/" + self.render_data.file_name + self.render_data.file_extension
+    
+        consumer = renderconsumer.get_mlt_render_consumer(file_path, render_profile, args_vals_list)
+
+        # Render producer reads script rendered frames from pipe.
+        producer = self.script_renderer.create_output_producer()
+
+        # G'MIC errors before first frame leave pipe empty and producer invalid.
+        if producer.is_valid() == False:
+            self.script_renderer.abort_rendering()
+            self.end_streamed()
+            return
+
+        self.render_player = renderconsumer.FileRenderPlayer("", producer, consumer, 0, self.length - 1)
+        self.render_player.wait_for_producer_end_stop = False
+        self.render_player.start()
+
+        while self.render_player.stopped == False:
+            self.abort_requested()
+            
+            if self.abort == True or self.script_renderer.error != None:
+                self.script_renderer.abort_rendering()
+                self.render_player.shutdown()
+                self.end_streamed()
+                return
+
+            # Script rendering and encoding happen at the same time, encoding is reported after all frames have been rendered.
+            if self.script_renderer.done == True:
+                fraction = self.render_player.get_render_fraction()
+                self.video_render_update_callback(fraction)
+            
+            time.sleep(0.3)
+
+        self.end_streamed()
+
+    def end_streamed(self):
+        self.script_renderer.cleanup()
+
+        range_render_data = {}
+        if self.script_renderer.error != None:
+            range_render_data[GMIC_ERROR_MSG] = str(self.script_renderer.error)
+        ccrutils.write_range_render_data(range_render_data)
+
+        # Write out completed flag file, also on abort and error so that job does not wait for render forever.
+        ccrutils.write_completed_message()
+
     def abort_requested(self):
         self.abort = ccrutils.abort_requested()
         return self.abort
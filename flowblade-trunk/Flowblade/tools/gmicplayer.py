@@ -27,22 +27,35 @@ try:
     import mlt7 as mlt
 except:
     import mlt
+import concurrent.futures
 import os
 from os import listdir
 from os.path import isfile, join
+import queue
 import re
+import shutil
 import sys
 import subprocess
+import tempfile
+import threading
 import time
 
 import editorstate
 import mltprofiles
+import renderconsumer
 import userfolders
 import utils
 
 TICKER_DELAY = 0.25
 RENDER_TICKER_DELAY = 0.05
 
+# FolderFramesScriptRenderer runs this many G'MIC processes at the same time, each rendering a batch of frames. 
+RENDER_PROCESSES = max(1, (os.cpu_count() or 2) // 2)
+FRAMES_BATCH_SIZE = 8
+
+# StreamedScriptRenderer keeps at most this many decoded frames waiting for G'MIC.
+STREAM_BUFFER_FRAMES = 16
+
 _current_profile = None
 
 def set_current_profile(clip_path):
@@ -362,55 +375,100 @@ class FolderFramesScriptRenderer:
         self.out_frame_offset = out_frame_offset
 
         self.abort = False
+        self.processes = []
+        self.processes_lock = threading.Lock()
 
     def write_frames(self):
-        clip_frames = os.listdir(self.folder)
-
-        frame_count = 1
+        # Get (input path, output path) pairs for frames that need rendering.
+        clip_frames = sorted(os.listdir(self.folder))
+        render_frames = []
+        skipped_count = 0
         for clip_frame in clip_frames:
-
-            if self.abort == True:
-                return
-            
-            self.do_update_callback(frame_count)
-
             file_numbers_list = re.findall(r'\d+', clip_frame)
             filled_number_str = str(int(file_numbers_list[0]) + self.out_frame_offset).zfill(4)
 
             clip_frame_path = str(os.path.join(self.folder, clip_frame))
             rendered_file_path = str(self.out_folder + self.frame_name + "_" + filled_number_str + ".png")
-            
-            # Create command list and launch process.
-            command_list = [editorstate.gmic_path, clip_frame_path]
-            user_script_commands = self.user_script.split(" ")
-            command_list.extend(user_script_commands)
-            command_list.append("-output")
-            command_list.append(rendered_file_path)
 
             if self.re_render_existing == False:
                 if os.path.exists(rendered_file_path) == True:
-                    frame_count = frame_count + 1
+                    skipped_count = skipped_count + 1
                     continue
+            
+            render_frames.append((clip_frame_path, rendered_file_path))
 
-            if frame_count == 1: # first frame displays shell output and does error checking
-                FLOG = open(userfolders.get_cache_dir() + "log_gmic_preview", 'w')
-                p = subprocess.Popen(command_list, stdin=FLOG, stdout=FLOG, stderr=FLOG)
-                p.wait()
-                FLOG.close()
- 
-                # read log
-                f = open(userfolders.get_cache_dir() + "log_gmic_preview", 'r')
-                out = f.read()
-                f.close()
-
-                self.do_render_output_callback(p, out)
-            else:
-                FLOG = open(userfolders.get_cache_dir() + "log_gmic_preview", 'w')
-                p = subprocess.Popen(command_list, stdin=FLOG, stdout=FLOG, stderr=FLOG)
-                p.wait()
-                FLOG.close()
+        if len(render_frames) == 0 or self.abort == True:
+            return
 
-            frame_count = frame_count + 1
+        # First frame is rendered alone, it displays shell output and does error checking.
+        frame_count = skipped_count + 1
+        self.do_update_callback(frame_count)
+        
+        FLOG = open(userfolders.get_cache_dir() + "log_gmic_preview", 'w')
+        p = self._launch_process(render_frames[0:1], FLOG)
+        p.wait()
+        FLOG.close()
+        with self.processes_lock:
+            self.processes.remove(p)
+
+        # read log
+        f = open(userfolders.get_cache_dir() + "log_gmic_preview", 'r')
+        out = f.read()
+        f.close()
+
+        self.do_render_output_callback(p, out)
+        
+        # Rest of the frames are rendered in batches with one G'MIC process per batch
+        # and RENDER_PROCESSES processes running at the same time.
+        batches = []
+        for i in range(1, len(render_frames), FRAMES_BATCH_SIZE):
+            batches.append(render_frames[i:i + FRAMES_BATCH_SIZE])
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=RENDER_PROCESSES) as executor:
+            futures = [executor.submit(self._render_batch, batch) for batch in batches]
+            for future in concurrent.futures.as_completed(futures):
+                if self.abort == True:
+                    for f in futures:
+                        f.cancel()
+                    return
+                frame_count = frame_count + future.result()
+                self.do_update_callback(frame_count)
+
+    def _render_batch(self, batch):
+        if self.abort == True:
+            return 0
+
+        p = self._launch_process(batch, subprocess.DEVNULL)
+        p.wait()
+        with self.processes_lock:
+            self.processes.remove(p)
+        return len(batch)
+
+    def _launch_process(self, frames, output_file):
+        # Script is applied to each input image separately, and each result
+        # is written to its own output file.
+        command_list = [editorstate.gmic_path]
+        for clip_frame_path, rendered_file_path in frames:
+            command_list.append(clip_frame_path)
+        user_script_commands = self.user_script.split(" ")
+        if len(frames) == 1:
+            command_list.extend(user_script_commands)
+            command_list.append("-output")
+            command_list.append(frames[0][1])
+        else:
+            command_list.extend(["-repeat", "$!", "-local[$>]"])
+            command_list.extend(user_script_commands)
+            command_list.extend(["-keep[0]", "-endlocal", "-done"])
+            for i in range(0, len(frames)):
+                command_list.append("-output[" + str(i) + "]")
+                command_list.append(frames[i][1])
+
+        with self.processes_lock:
+            p = subprocess.Popen(command_list, stdin=subprocess.DEVNULL, stdout=output_file, stderr=output_file)
+            self.processes.append(p)
+            if self.abort == True:
+                p.terminate()
+        return p
 
     def do_update_callback(self, frame_count):
         self.update_callback(frame_count)
@@ -419,7 +477,237 @@ class FolderFramesScriptRenderer:
         self.render_output_callback(process, out_text)
 
     def abort_rendering(self):
-        self.abort = True
+        with self.processes_lock:
+            self.abort = True
+            for p in self.processes:
+                p.terminate()
+
+
+class StreamedScriptRenderer:
+    """
+    Renders G'MIC script on clip frames range without writing frames to disk.
+
+    Decoded frames are written as binary PPM data into named pipes read by G'MIC processes,
+    and G'MIC results are read from named pipes and written in order as raw RGB frames into
+    output pipe read by producer from create_output_producer(). Number of frames in flight
+    is bounded by STREAM_BUFFER_FRAMES and G'MIC batches.
+    """
+    def __init__(self, user_script, clip_path, profile, mark_in, mark_out, update_callback):
+        self.user_script = user_script
+        self.clip_path = clip_path
+        self.profile = profile
+        self.mark_in = mark_in
+        self.mark_out = mark_out
+        self.update_callback = update_callback
+        self.width = profile.width()
+        self.height = profile.height()
+
+        self.pipes_folder = tempfile.mkdtemp(prefix="flowblade_gmic_stream_")
+        self.output_pipe_path = os.path.join(self.pipes_folder, "rendered.rgb")
+        os.mkfifo(self.output_pipe_path)
+
+        self.decoded_frames = queue.Queue(maxsize=STREAM_BUFFER_FRAMES)
+        self.frames_written = 0
+        self.error = None
+        self.done = False
+        self.abort = False
+        self.processes = []
+        self.processes_lock = threading.Lock()
+
+    def get_length(self):
+        return self.mark_out - self.mark_in + 1
+
+    def start(self):
+        decode_thread = threading.Thread(target=self._decode_frames, daemon=True)
+        decode_thread.start()
+        render_thread = threading.Thread(target=self._render_frames, daemon=True)
+        render_thread.start()
+
+    def create_output_producer(self):
+        """
+        Call after start(), creating producer blocks until first rendered frame is available.
+        """
+        return renderconsumer.get_rawvideo_pipe_producer(self.profile, self.output_pipe_path, self.width, self.height,
+                                                         "rgb24", self.get_length())
+
+    def _decode_frames(self):
+        producer = mlt.Producer(self.profile, str(self.clip_path))
+        producer.set_speed(0)
+        for frame_number in range(self.mark_in, self.mark_out + 1):
+            if self.abort == True:
+                break
+            producer.seek(frame_number)
+            frame = producer.get_frame()
+            frame.set("consumer_deinterlace", 1)
+            rgb = frame.get_image(mlt.mlt_image_rgb, self.width, self.height)
+            self.decoded_frames.put(bytes(rgb))
+
+        self.decoded_frames.put(None)
+
+    def _render_frames(self):
+        try:
+            output_pipe = open(self.output_pipe_path, "wb")
+        except OSError as e:
+            self.error = str(e)
+            return
+
+        # Batches are rendered RENDER_PROCESSES at the time and their results are written in order. 
+        with output_pipe, concurrent.futures.ThreadPoolExecutor(max_workers=RENDER_PROCESSES) as executor:
+            batch_index = 0
+            running_batches = []
+            last_batch = False
+            while last_batch == False or len(running_batches) > 0:
+                if last_batch == False and len(running_batches) < RENDER_PROCESSES:
+                    batch = []
+                    while len(batch) < FRAMES_BATCH_SIZE:
+                        rgb = self.decoded_frames.get()
+                        if rgb == None:
+                            last_batch = True
+                            break
+                        batch.append(rgb)
+                    if len(batch) > 0:
+                        running_batches.append(executor.submit(self._render_batch, batch_index, batch))
+                        batch_index += 1
+                    continue
+
+                try:
+                    rendered_frames = running_batches.pop(0).result()
+                    for rgb in rendered_frames:
+                        output_pipe.write(rgb)
+                        self.frames_written += 1
+                    output_pipe.flush()
+                    self.update_callback(self.frames_written)
+                except Exception as e:
+                    self.error = str(e)
+                    self.abort_rendering()
+
+                if self.abort == True:
+                    for future in running_batches:
+                        future.cancel()
+                    self._drain_decoded_frames()
+                    break
+
+        self.done = True
+
+    def _render_batch(self, batch_index, batch):
+        if self.abort == True:
+            return []
+
+        # Named pipes for batch inputs and outputs.
+        in_paths = []
+        out_paths = []
+        for i in range(0, len(batch)):
+            in_path = os.path.join(self.pipes_folder, "in_" + str(batch_index) + "_" + str(i) + ".ppm")
+            out_path = os.path.join(self.pipes_folder, "out_" + str(batch_index) + "_" + str(i) + ".ppm")
+            os.mkfifo(in_path)
+            os.mkfifo(out_path)
+            in_paths.append(in_path)
+            out_paths.append(out_path)
+
+        # Results are forced into same size 8-bit RGB frames that output producer expects.
+        command_list = [editorstate.gmic_path]
+        command_list.extend(in_paths)
+        command_list.extend(["-repeat", "$!", "-local[$>]"])
+        command_list.extend(self.user_script.split(" "))
+        command_list.extend(["-keep[0]", "-to_rgb", "-resize", str(self.width) + "," + str(self.height) + ",1,3,3",
+                             "-cut", "0,255", "-endlocal", "-done"])
+        for i in range(0, len(out_paths)):
+            command_list.append("-output[" + str(i) + "]")
+            command_list.append(out_paths[i])
+
+        with self.processes_lock:
+            p = subprocess.Popen(command_list, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            self.processes.append(p)
+
+        # G'MIC reads inputs and writes outputs in command line order.
+        header = ("P6\n" + str(self.width) + " " + str(self.height) + "\n255\n").encode("ascii")
+        writer_thread = threading.Thread(target=self._write_batch_inputs, args=(in_paths, batch, header), daemon=True)
+        writer_thread.start()
+        outputs_read = threading.Event()
+        unblock_thread = threading.Thread(target=self._unblock_pipes, args=(p, in_paths, out_paths, writer_thread, outputs_read), daemon=True)
+        unblock_thread.start()
+
+        try:
+            rendered_frames = []
+            for out_path in out_paths:
+                with open(out_path, "rb") as out_pipe:
+                    rendered_frames.append(out_pipe.read())
+        finally:
+            outputs_read.set()
+
+        err = p.communicate()[1]
+        unblock_thread.join()
+        with self.processes_lock:
+            self.processes.remove(p)
+        for path in in_paths + out_paths:
+            os.remove(path)
+
+        if self.abort == True:
+            return []
+        if p.returncode != 0:
+            raise RuntimeError("G'MIC failed: " + err.decode("utf-8", "replace"))
+
+        return [_get_ppm_rgb_data(data) for data in rendered_frames]
+
+    def _write_batch_inputs(self, in_paths, batch, header):
+        try:
+            for i in range(0, len(in_paths)):
+                with open(in_paths[i], "wb") as in_pipe:
+                    in_pipe.write(header)
+                    in_pipe.write(batch[i])
+        except OSError:
+            pass # G'MIC process failed or was terminated.
+
+    def _unblock_pipes(self, p, in_paths, out_paths, writer_thread, outputs_read):
+        # If G'MIC exits before opening all pipes, opening pipe ends from here
+        # releases writer thread and output reading blocked in open().
+        p.wait()
+        while writer_thread.is_alive() or outputs_read.is_set() == False:
+            for path in in_paths:
+                os.close(os.open(path, os.O_RDONLY | os.O_NONBLOCK))
+            for path in out_paths:
+                try:
+                    os.close(os.open(path, os.O_WRONLY | os.O_NONBLOCK))
+                except OSError:
+                    pass # No reader on pipe.
+            time.sleep(0.05)
+
+    def _drain_decoded_frames(self):
+        # Lets decode thread exit if it is blocked on full queue.
+        try:
+            while True:
+                self.decoded_frames.get_nowait()
+        except queue.Empty:
+            pass
+
+    def abort_rendering(self):
+        with self.processes_lock:
+            self.abort = True
+            for p in self.processes:
+                p.terminate()
+
+    def cleanup(self):
+        shutil.rmtree(self.pipes_folder, ignore_errors=True)
+
+
+def _get_ppm_rgb_data(data):
+    # Returns pixel data from binary 8-bit PPM file data.
+    fields = []
+    pos = 0
+    while len(fields) < 4:
+        while data[pos:pos + 1].isspace():
+            pos += 1
+        if data[pos:pos + 1] == b"#":
+            pos = data.index(b"\n", pos)
+            continue
+        start = pos
+        while not data[pos:pos + 1].isspace():
+            pos += 1
+        fields.append(data[start:pos])
+    if fields[0] != b"P6" or fields[3] != b"255":
+        raise ValueError("G'MIC output is not 8-bit RGB PPM")
+
+    return data[pos + 1:]
 
 
 # ---- Debug helper
@@ -1258,6 +1258,8 @@ def _get_range_render_messages(proc_fctx_dict):
     # Get error and log messages.
     if fluxity.FLUXITY_ERROR_MSG in proc_fctx_dict.keys():
         error_msg = proc_fctx_dict[fluxity.FLUXITY_ERROR_MSG]
+    elif _get_rendered_frame_file(proc_fctx_dict) == None:
+        error_msg = "No frames were rendered for frame range."
     else:
         error_msg = None
 
@@ -1268,6 +1270,13 @@ def _get_range_render_messages(proc_fctx_dict):
 
     return (error_msg, log_msg)
 
+def _get_rendered_frame_file(proc_fctx_dict):
+    # Processes that rendered frames have first written file saved with process number key.
+    for key in proc_fctx_dict.keys():
+        if key.isdigit():
+            return proc_fctx_dict[key]
+    return None
+
 
 class FluxityRangeRenderer(threading.Thread):
 
@@ -1348,7 +1357,7 @@ def _preview_range_render_complete(render_thread):
         error_msg, log_msg = _get_range_render_messages(proc_fctx_dict)
 
         if error_msg == None:
-            frame_file = proc_fctx_dict["0"] # First written file saved here.
+            frame_file = _get_rendered_frame_file(proc_fctx_dict)
             in_frame, out_frame = render_thread.in_frame, render_thread.out_frame
             resource_name_str = utils.get_img_seq_resource_name(frame_file)
             frames_folder = ccrutils.get_render_folder_for_session_id(parent_folder, SCRIPT_TOOL_SESSION_ID)
@@ -1480,7 +1489,7 @@ class FluxityPluginRenderer(threading.Thread):
             consumer = renderconsumer.get_mlt_render_consumer(file_path, profile, args_vals_list)
 
             # Render producer
-            frame_file = proc_fctx_dict["0"]
+            frame_file = _get_rendered_frame_file(proc_fctx_dict)
             resource_name_str = utils.get_img_seq_resource_name(frame_file)
             range_resourse_mlt_path = out_folder + resource_name_str
             producer = mlt.Producer(profile, str(range_resourse_mlt_path))
@@ -0,0 +1,310 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module handles rendering a batch render item in parallel segments.
+
+Render range is split into GOP aligned chunks that are rendered video only by
+headless processes from saved project copy. Audio is rendered in a single continuous
+pass by one more process to avoid seams. When all processes are done chunks are
+concatenated and audio muxed in with ffmpeg without re-encoding.
+
+SegmentedRenderPlayer has the same interface as renderconsumer.FileRenderPlayer
+as used by batchrendering.py render threads.
+"""
+
+try:
+    import mlt7 as mlt
+except:
+    import mlt
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import atomicfile
+import editorpersistance
+import editorstate
+import mltinit
+import mltprofiles
+import persistance
+import renderconsumer
+import respaths
+import userfolders
+import utils
+
+
+SEGMENTED_RENDER_DIR = "segmentedrender/"
+
+VIDEO_PASS = "video"
+AUDIO_PASS = "audio"
+
+STATUS_FILE_EXTENSION = ".status"
+COMPLETED_MSG = "completed"
+
+MIN_CHUNK_LENGTH = 750 # frames, shorter ranges do not gain enough to offset process startup and project load.
+DEFAULT_GOP = 12 # MLT avformat consumer default
+
+FRAME_SEQUENCE_VCODECS = ["png","bmp","dpx","ppm","targa","tiff"]
+
+
+# ------------------------------------------------------- render planning
+def get_render_processes_count():
+    return max(1, editorpersistance.prefs.segmented_render_processes)
+
+def segmented_render_possible(render_item, start_frame, end_frame):
+    if get_render_processes_count() < 2:
+        return False
+    if shutil.which("ffmpeg") == None:
+        return False
+    if _get_argval(render_item.args_vals_list, "vcodec") in FRAME_SEQUENCE_VCODECS:
+        return False
+    if _get_argval(render_item.args_vals_list, "vn") != None: # audio only render
+        return False
+
+    return len(get_chunk_ranges(render_item, start_frame, end_frame)) > 1
+
+def get_chunk_ranges(render_item, start_frame, end_frame):
+    """
+    Returns list of (chunk_start, chunk_end) inclusive frame ranges.
+
+    Chunk boundaries are at GOP length multiples from range start so that
+    keyframes are placed where a single continuous render would place them.
+    """
+    length = end_frame - start_frame + 1
+    gop = _get_gop(render_item.args_vals_list)
+    chunks_count = max(1, min(get_render_processes_count(), length // MIN_CHUNK_LENGTH))
+    gops_count = -(-length // gop) # ceil division
+    chunk_gops = -(-gops_count // chunks_count)
+    chunk_length = chunk_gops * gop
+
+    ranges = []
+    for chunk_start in range(start_frame, end_frame + 1, chunk_length):
+        ranges.append((chunk_start, min(chunk_start + chunk_length - 1, end_frame)))
+    return ranges
+
+def _get_gop(args_vals_list):
+    gop = _get_argval(args_vals_list, "g")
+    try:
+        return max(1, int(gop))
+    except:
+        return DEFAULT_GOP
+
+def _get_argval(args_vals_list, arg_key):
+    for arg, val in args_vals_list:
+        if arg == arg_key:
+            return val
+    return None
+
+def _audio_pass_needed(args_vals_list):
+    if _get_argval(args_vals_list, "an") != None:
+        return False
+    if _get_argval(args_vals_list, "acodec") == None:
+        return False
+    return True
+
+def get_session_folder(identifier):
+    return userfolders.get_cache_dir() + SEGMENTED_RENDER_DIR + identifier + "/"
+
+
+# ------------------------------------------------------- render coordination, used by batchrendering.py
+class SegmentedRenderPlayer(threading.Thread):
+    def __init__(self, render_item, project_file_path, item_file_path, start_frame, end_frame, wait_for_stop_render):
+        threading.Thread.__init__(self)
+        self.render_item = render_item
+        self.project_file_path = project_file_path
+        self.item_file_path = item_file_path
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.wait_for_stop_render = wait_for_stop_render
+
+        self.session_folder = get_session_folder(render_item.generate_identifier())
+        self.ext = os.path.splitext(render_item.render_path)[1]
+        self.chunk_ranges = get_chunk_ranges(render_item, start_frame, end_frame)
+        self.do_audio_pass = _audio_pass_needed(render_item.args_vals_list)
+        self.processes = []
+        self.running = False
+        self.has_started_running = False
+        self.stopped = False
+        self.aborted = False
+        self.error = None
+
+    def run(self):
+        self.running = True
+        self.has_started_running = True
+
+        if os.path.exists(self.session_folder):
+            shutil.rmtree(self.session_folder)
+        os.makedirs(self.session_folder)
+
+        print("Segmented render started, chunks: " + str(self.chunk_ranges) + ", audio pass: " + str(self.do_audio_pass))
+
+        # Audio pass is launched first because it is the single longest job.
+        if self.do_audio_pass == True:
+            last_frame_wait = self.wait_for_stop_render
+            self._launch_pass(AUDIO_PASS, self._get_audio_path(), self.start_frame, self.end_frame, last_frame_wait)
+
+        for i in range(0, len(self.chunk_ranges)):
+            chunk_start, chunk_end = self.chunk_ranges[i]
+            last_frame_wait = (i == len(self.chunk_ranges) - 1) and self.wait_for_stop_render
+            self._launch_pass(VIDEO_PASS, self._get_chunk_path(i), chunk_start, chunk_end, last_frame_wait)
+
+        for process, output_path in self.processes:
+            process.wait()
+            if self.aborted == True:
+                break
+            if process.returncode != 0 or self._read_status(output_path) != COMPLETED_MSG:
+                self.error = "Segmented render process failed for " + output_path
+                self.aborted = True
+                self._terminate_processes()
+                break
+
+        if self.aborted == False:
+            self._concat_chunks()
+
+        if self.error != None:
+            print(self.error)
+
+        shutil.rmtree(self.session_folder, ignore_errors=True)
+
+        print("Segmented render stopped")
+        self.running = False
+        self.stopped = True
+
+    def _launch_pass(self, pass_type, output_path, range_start, range_end, last_frame_wait):
+        log_file = open(output_path + ".log", 'w')
+        process = subprocess.Popen([sys.executable, respaths.LAUNCH_DIR + "flowbladesegmentrender",
+                                    respaths.ROOT_PATH, self.project_file_path, self.item_file_path,
+                                    output_path, pass_type, str(range_start), str(range_end), str(last_frame_wait)],
+                                    stdin=log_file, stdout=log_file, stderr=log_file)
+        self.processes.append((process, output_path))
+
+    def _concat_chunks(self):
+        list_file_path = self.session_folder + "chunks.txt"
+        with atomicfile.AtomicFileWriter(list_file_path, "w") as afw:
+            list_file = afw.get_file()
+            for i in range(0, len(self.chunk_ranges)):
+                list_file.write("file '" + self._get_chunk_path(i).replace("'", "'\\''") + "'\n")
+
+        args = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", list_file_path]
+        if self.do_audio_pass == True:
+            args += ["-i", self._get_audio_path(), "-map", "0:v:0", "-map", "1:a:0"]
+        args += ["-c", "copy", str(self.render_item.render_path)]
+
+        result = subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+        if result.returncode != 0:
+            self.error = "Segmented render concat failed: " + result.stderr[-2000:]
+
+    def _terminate_processes(self):
+        for process, output_path in self.processes:
+            if process.poll() == None:
+                process.terminate()
+
+    def _get_chunk_path(self, index):
+        return self.session_folder + "chunk_" + str(index).zfill(4) + self.ext
+
+    def _get_audio_path(self):
+        return self.session_folder + "audio" + self.ext
+
+    def _read_status(self, output_path):
+        try:
+            with open(output_path + STATUS_FILE_EXTENSION) as f:
+                return f.read()
+        except:
+            return None
+
+    def shutdown(self):
+        self.aborted = True
+        self._terminate_processes()
+        self.running = False
+
+    def get_render_fraction(self):
+        # Fraction of rendered video frames, audio pass runs concurrently and is not counted.
+        if self.running == False:
+            return 1.0
+        rendered = 0.0
+        total = 0.0
+        for i in range(0, len(self.chunk_ranges)):
+            chunk_start, chunk_end = self.chunk_ranges[i]
+            chunk_length = chunk_end - chunk_start + 1
+            total += chunk_length
+            status = self._read_status(self._get_chunk_path(i))
+            if status == COMPLETED_MSG:
+                rendered += chunk_length
+            else:
+                try:
+                    rendered += float(status) * chunk_length
+                except:
+                    pass
+
+        return min(rendered / total, 1.0)
+
+
+# ------------------------------------------------------- headless chunk render process
+def main():
+    # called from .../launch/flowbladesegmentrender script
+    root_path, project_file_path, item_file_path, output_path, pass_type, range_start, range_end, last_frame_wait = sys.argv[1:9]
+
+    respaths.set_paths(root_path)
+    try:
+        editorstate.mlt_version = mlt.LIBMLT_VERSION
+    except:
+        editorstate.mlt_version = "0.0.99" # magic string for "not found"
+
+    userfolders.init()
+    editorpersistance.load()
+    mltinit.init_with_translations()
+
+    render_item = utils.unpickle(item_file_path)
+
+    persistance.show_messages = False
+    project = persistance.load_project(project_file_path, False)
+    project.c_seq.fix_v1_for_render()
+
+    args_vals_list = list(render_item.args_vals_list)
+    if pass_type == VIDEO_PASS:
+        args_vals_list.append(("an", "1"))
+    else:
+        args_vals_list.append(("vn", "1"))
+
+    profile = mltprofiles.get_profile(render_item.render_data.profile_name)
+    consumer = renderconsumer.get_mlt_render_consumer(output_path, profile, args_vals_list)
+
+    render_player = renderconsumer.FileRenderPlayer(None, project.c_seq.tractor, consumer, int(range_start), int(range_end))
+    render_player.wait_for_producer_end_stop = (last_frame_wait == "True")
+    render_player.start()
+
+    while render_player.has_started_running == False:
+        time.sleep(0.05)
+
+    while render_player.stopped == False:
+        _write_status(output_path, str(render_player.get_render_fraction()))
+        time.sleep(0.5)
+
+    _write_status(output_path, COMPLETED_MSG)
+
+def _write_status(output_path, msg):
+    try:
+        with atomicfile.AtomicFileWriter(output_path + STATUS_FILE_EXTENSION, "w") as afw:
+            afw.get_file().write(msg)
+    except:
+        pass # Status write failing only shows as progress hickup.
@@ -812,32 +812,25 @@ class RippleData:
                 else:
                     # Case: frame is on media clip
                     
-                    # Get closest blank clip index
+                    # Get closest blank clip index, it is the first blank before or after clip.
+                    # Distances grow moving away from clip, so search stops at first blank found in both directions.
                     closest_blank_index = -1
                     closest_blank_distance = MAX_DELTA
-                    for i in range(0, len(track.clips)):
-                        blank =  track.clips[i]
-                        if blank.is_blanck_clip == False:
-                            continue #  Clip is media clip, we're looking for closest blank
-                        
-                        blank_first_frame = track.clip_start(i)
-                        blank_last_frame = blank_first_frame + blank.clip_length()
-                        
-                        # Clip before trimmed timeline frame, distance is from blank last frame
-                        if blank_last_frame <= self.trim_frame:
-                            if self.trim_frame - blank_last_frame < closest_blank_distance:
-                                closest_blank_distance = self.trim_frame - blank_last_frame
-                                closest_blank_index = i
-
-                        # Clip after trimmed timeline frame, distance is from blank first frame
-                        elif blank_first_frame >= self.trim_frame: 
+                    for i in range(clip_index - 1, -1, -1):
+                        if track.clips[i].is_blanck_clip == True:
+                            # Clip before trimmed timeline frame, distance is from blank last frame
+                            closest_blank_distance = self.trim_frame - current_sequence().get_clip_start(track, i + 1)
+                            closest_blank_index = i
+                            break
+                    for i in range(clip_index + 1, len(track.clips)):
+                        if track.clips[i].is_blanck_clip == True:
+                            # Clip after trimmed timeline frame, distance is from blank last frame
+                            blank_last_frame = current_sequence().get_clip_start(track, i + 1)
                             if blank_last_frame - self.trim_frame < closest_blank_distance:
                                 closest_blank_distance = blank_last_frame - self.trim_frame 
                                 closest_blank_index = i
-                        else:
-                            print("_build_ripple_data(): supposedly unreachable case hit")
-                        
-                    
+                            break
+
                     # Case: no blanks found on track
                     if closest_blank_index == -1:
                         track_max_deltas.append(0)
@@ -901,7 +894,7 @@ class RippleData:
             for j in range(0, len(compositors)):
                 comp = compositors[j]
                 first_affected_blank_index = self.trim_blank_indexes[i - 1]
-                first_affected_frame = tracks[i].clip_start(first_affected_blank_index + 1)
+                first_affected_frame = current_sequence().get_clip_start(tracks[i], first_affected_blank_index + 1)
                 if comp.clip_in >= first_affected_frame:
                     affected_compositors_destroy_ids.append(comp.destroy_id)
         
@@ -909,7 +902,7 @@ class RippleData:
         
 
     def get_track_blank_end_offset(self, track, blank_index):
-        blank_end_frame = track.clip_start(blank_index + 1)
+        blank_end_frame = current_sequence().get_clip_start(track, blank_index + 1)
         return blank_end_frame - self.trim_frame
 
     def get_tracks_compositors_list(self):
@@ -22,19 +22,37 @@
 Module manages undo and redo stacks and executes edit actions from them
 on user requests.
 """
+try:
+    import mlt7 as mlt
+except:
+    import mlt
+import sys
 import time
+import types
+
 import editorstate
 
 set_post_undo_redo_edit_mode = None # This is set at startup to avoid circular imports.
 repaint_tline = None
 
-# Max stack size.
-MAX_UNDOS = 35
+# Oldest undos are dropped when approximate memory retained by
+# EditActions in stack exceeds this, see set_memory_budget_mb().
+memory_budget = 128 * 1024 * 1024
+
+# This many latest undos are kept even if they exceed memory budget.
+MIN_UNDOS = 10
+
+# Rough size of native MLT object data not visible to sys.getsizeof().
+MLT_OBJECT_SIZE = 4096
 
 # EditActions are placed in this stack after their do_edit()
 # method has been called.
 undo_stack = []
 
+# Approximate retained sizes of EditActions in undo_stack, and their sum.
+undo_sizes = []
+stack_size = 0
+
 # Index is the stack pointer that tracks done undos and redos.
 # The value of index is index of next undo + 1
 # The value of index is index of next redo or == stack size if
@@ -47,10 +65,17 @@ undo_item = None
 redo_item = None
 
 def clear_undos():
-    global undo_stack, index
+    global undo_stack, undo_sizes, stack_size, index
     undo_stack = []
+    undo_sizes = []
+    stack_size = 0
     index = 0
 
+def set_memory_budget_mb(budget_mb):
+    global memory_budget
+    memory_budget = int(budget_mb) * 1024 * 1024
+    _drop_undos_over_budget()
+
 def set_post_undo_redo_callback(undo_redo_callback):
     global set_post_undo_redo_edit_mode
     set_post_undo_redo_edit_mode = undo_redo_callback
@@ -65,20 +90,23 @@ def register_edit(undo_edit):
     """
     Adds a performed EditAction into undo stack
     """
-    global index
+    global index, stack_size
     
     # New edit action clears all redos(== undos after index)
     if index != len(undo_stack) and (len(undo_stack) != 0):
         del undo_stack[index:]
- 
-    # Keep stack in size, if too big remove undo at 0
-    if len(undo_stack) > MAX_UNDOS:
-        del undo_stack[0]
-        index = index - 1
+        stack_size = stack_size - sum(undo_sizes[index:])
+        del undo_sizes[index:]
         
     # Add to stack and grow index
     undo_stack.append(undo_edit)
+    edit_size = _get_retained_size(undo_edit)
+    undo_sizes.append(edit_size)
+    stack_size = stack_size + edit_size
     index = index + 1
+
+    # Keep stack in memory budget, if too big remove undos from bottom
+    _drop_undos_over_budget()
     
     if editorstate.PROJECT().last_save_path != None:
         save_item.set_sensitive(True) # Disabled at load and save, first edit enables if project has been saved.
@@ -143,6 +171,47 @@ def do_redo():
 
     undo_item.set_sensitive(True)
 
+def _drop_undos_over_budget():
+    global index, stack_size
+    while stack_size > memory_budget and len(undo_stack) > MIN_UNDOS and index > 0:
+        del undo_stack[0]
+        stack_size = stack_size - undo_sizes.pop(0)
+        index = index - 1
+
+def _get_retained_size(undo_edit):
+    """
+    Returns approximate number of bytes retained by EditAction data.
+    Tracks, sequence and project are shared with current state and not counted.
+    """
+    seq = editorstate.current_sequence()
+    seen = set([id(editorstate.PROJECT()), id(seq)])
+    for track in seq.tracks:
+        seen.add(id(track))
+
+    size = 0
+    objs = [undo_edit]
+    while len(objs) > 0:
+        obj = objs.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, (type, types.ModuleType, types.FunctionType, types.MethodType)):
+            continue
+
+        size += sys.getsizeof(obj)
+        if isinstance(obj, mlt.Service):
+            size += MLT_OBJECT_SIZE
+
+        if isinstance(obj, dict):
+            objs.extend(obj.keys())
+            objs.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            objs.extend(obj)
+        elif hasattr(obj, "__dict__"):
+            objs.append(obj.__dict__)
+
+    return size
+
 def _set_post_edit_mode():
     if editorstate.edit_mode != editorstate.INSERT_MOVE:
         set_post_undo_redo_edit_mode()